@@ -1,5 +1,23 @@
 """Initializing package classes."""
 from .outlookpy import OutlookPy
 from .outlookitem import OutlookItem
-from .outlookfolder import OutlookFolder
-from .outlookenumerations import OutlookItemImportance, OutlookItemBodyFormat
+from .outlookfolder import OutlookFolder, FolderView
+from .outlooktable import OutlookTable, OutlookTableRow
+from .outlookquery import OutlookQuery
+from .outlookcontact import OutlookContact, AddressCache
+from .outlooksnapshot import OutlookItemSnapshot
+from .outlookchanges import ChangeToken, FileTokenStore, SQLiteTokenStore
+from .outlookmirror import OutlookMirror
+from .outlookasync import EventBridge, OutlookEvent
+from .outlookhandlers import HandlerPool
+from .outlooksubscription import OutlookSubscription
+from .outlooksession import OutlookSession, OutlookSessionPool
+from .outlookscan import OutlookScan, ScanUnit
+from .outlookrules import Rule, RuleEngine
+from .outlookbulk import BulkResult
+from .outlookattachment import OutlookAttachment, AttachmentStore
+from .outlookbody import BodyCache, BODY_CACHE, BODY_KEY_PROPERTIES
+from .outlookexport import ExportResult
+from .outlookprofile import ComProfiler
+from .outlooksimulated import SimulatedOutlook, SimulatedBackend
+from .outlookenumerations import OutlookItemImportance, OutlookItemBodyFormat, OutlookAttachmentType
@@ -4,8 +4,11 @@ from win32com.client import Dispatch
 from win32com.client import gencache
 from win32com.client import getevents
 from win32com.client import EventsProxy
+import logging
 import pythoncom
 
+logger = logging.getLogger(__name__)
+
 def _event_setattr_(self, attr, val):
     try:
         # Does the COM object have an attribute of this name?
@@ -50,6 +53,10 @@ def DispatchWithEvents(clsid, user_event_class, arguments):
         user_event_class.__init__(*args)
     return EventsProxy(instance)
 
+# the classes WithEvents generates, by (event source CLSID, user class)
+# hooking many objects of the same kind then shares one class instead of building a new one each time
+_event_classes = {}
+
 def WithEvents(disp, user_event_class, arguments):
     disp = Dispatch(disp)
     if not disp.__class__.__dict__.get("CLSID"): # Eeek - no makepy support - try and build it.
@@ -62,7 +69,7 @@ def WithEvents(disp, user_event_class, arguments):
             # Get the class from the module.
             disp_class = gencache.GetClassForProgID(str(disp_clsid))
         except pythoncom.com_error as e:
-            print(e)
+            logger.error("makepy support could not be generated: %s", e)
             raise TypeError("This COM object can not automate the makepy process - please run makepy manually for this object")
     else:
         disp_class = disp.__class__
@@ -70,14 +77,17 @@ def WithEvents(disp, user_event_class, arguments):
     clsid = disp_class.CLSID
     # Create a new class that derives from 2 classes - the event sink
     # class and the user class.
-    try:
-        from types import ClassType as new_type
-    except ImportError:
-        new_type = type # py3k
-    events_class = getevents(clsid)
-    if events_class is None:
-        raise ValueError("This COM object does not support events.")
-    result_class = new_type("COMEventClass", (events_class, user_event_class), {})
+    result_class = _event_classes.get((clsid, user_event_class))
+    if result_class is None:
+        try:
+            from types import ClassType as new_type
+        except ImportError:
+            new_type = type # py3k
+        events_class = getevents(clsid)
+        if events_class is None:
+            raise ValueError("This COM object does not support events.")
+        result_class = new_type("COMEventClass", (events_class, user_event_class), {})
+        _event_classes[(clsid, user_event_class)] = result_class
     instance = result_class(disp) # This only calls the first base class __init__.
     args = [instance] + arguments
     if hasattr(user_event_class, "__init__"):
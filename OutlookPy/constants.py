@@ -1,3 +1,4 @@
+PROPTAG_PREFIX = "http://schemas.microsoft.com/mapi/proptag/"
 PR_SMTP_ADDRESS = "http://schemas.microsoft.com/mapi/proptag/0x39FE001E"
 PR_SENDER_SMTP_ADDRESS = "http://schemas.microsoft.com/mapi/proptag/0x5D01001F"
 PR_MEETING_SENDER_SMTP_ADDRESS = "http://schemas.microsoft.com/mapi/proptag/0x5D0A001F"
@@ -7,3 +8,13 @@ PR_SENT_REPRESENTING_EMAIL_ADDRESS_W = "http://schemas.microsoft.com/mapi/propta
 PR_SENDER_ADDRTYPE_W = "http://schemas.microsoft.com/mapi/proptag/0x0C1E001F"
 EntityExtraction_Sentiment1_0 = "http://schemas.microsoft.com/mapi/string/{00062008-0000-0000-C000-000000000046}/EntityExtraction/Sentiment1.0"
 PR_NATIVE_BODY_INFO = "http://schemas.microsoft.com/mapi/proptag/0x10160003"
+PR_MESSAGE_CLASS_W = "http://schemas.microsoft.com/mapi/proptag/0x001A001F"
+PR_MESSAGE_SIZE = "http://schemas.microsoft.com/mapi/proptag/0x0E080003"
+PR_SENDER_ENTRYID = "http://schemas.microsoft.com/mapi/proptag/0x0C190102"
+PR_SENT_REPRESENTING_ENTRYID = "http://schemas.microsoft.com/mapi/proptag/0x00410102"
+PR_STORE_ENTRYID = "http://schemas.microsoft.com/mapi/proptag/0x0FFB0102"
+PR_ENTRYID = "http://schemas.microsoft.com/mapi/proptag/0x0FFF0102"
+PR_LAST_MODIFICATION_TIME = "http://schemas.microsoft.com/mapi/proptag/0x30080040"
+PR_ATTACH_MIME_TAG_W = "http://schemas.microsoft.com/mapi/proptag/0x370E001F"
+PR_ATTACH_CONTENT_ID_W = "http://schemas.microsoft.com/mapi/proptag/0x3712001F"
+PR_ATTACHMENT_HIDDEN = "http://schemas.microsoft.com/mapi/proptag/0x7FFE000B"
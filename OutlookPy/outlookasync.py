@@ -0,0 +1,206 @@
+"""Folder events delivered to asyncio, pumped on a dedicated STA thread."""
+import asyncio
+import logging
+import threading
+from typing import AsyncIterator, Iterable, Optional, TYPE_CHECKING
+
+from .outlookbackend import get_backend
+from .outlookitem import com_to_python
+from .outlooksnapshot import OutlookItemSnapshot
+
+if TYPE_CHECKING:
+    from .outlookfolder import OutlookFolder
+
+logger = logging.getLogger(__name__)
+
+EVENT_KINDS = frozenset(("add", "change", "remove"))
+
+# how long the pump thread sleeps between checks when nothing at all is happening, in seconds
+_PUMP_TIMEOUT = 0.5
+
+_STOPPED = object()
+
+
+class OutlookEvent(object):
+    """
+    One folder event. item is a detached snapshot of the item (see OutlookItemSnapshot),
+    or None for removals, which outlook reports without saying what was removed.
+    """
+    __slots__ = ("kind", "folder_id", "folder_name", "item")
+    def __init__(self, kind: str, folder_id: str, folder_name: str, item: Optional[OutlookItemSnapshot]):
+        self.kind = kind
+        self.folder_id = folder_id
+        self.folder_name = folder_name
+        self.item = item
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.kind}, {self.folder_name}, {self.item})"
+
+
+class _BridgeSink(object):
+    """event sink living on the pump thread, names are hard-wired for the exchange API"""
+    def __init__(self, bridge, folder_id, folder_name, kinds):
+        self._bridge = bridge
+        self._folder_id = folder_id
+        self._folder_name = folder_name
+        self._kinds = kinds
+    def _deliver(self, kind, item):
+        if kind not in self._kinds:
+            return
+        # items can't leave this apartment, so a snapshot crosses over instead
+        snapshot = com_to_python(item).snapshot() if item is not None else None
+        self._bridge._deliver(OutlookEvent(kind, self._folder_id, self._folder_name, snapshot))
+    def OnItemAdd(self, item):
+        self._deliver("add", item)
+    def OnItemChange(self, item):
+        self._deliver("change", item)
+    def OnItemRemove(self):
+        self._deliver("remove", None)
+
+
+class EventBridge(object):
+    """
+    Runs the COM message pump on its own thread and hands folder events to an asyncio queue.
+
+        bridge = EventBridge()
+        bridge.watch(outlook.inbox, kinds={"add"})
+        async with bridge:
+            async for event in bridge:
+                ...
+
+    Folders are marshalled over to the pump thread, so they can be watched from the thread that made them
+    while the bridge is running. stop() ends the pump without PostQuitMessage, aclose() does the same
+    without blocking the event loop.
+    """
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None, maxsize: int = 0):
+        self._loop = loop
+        self._maxsize = maxsize
+        self._queue = None
+        self._pending = [] # (marshalled folder stream, folder id, folder name, kinds) waiting for the pump thread
+        self._pending_lock = threading.Lock()
+        self._sinks = []
+        self._backend = get_backend()
+        self._wake = self._backend.create_wake()
+        self._stopping = False
+        self._closed = False
+        self._thread = None
+        self.dropped = 0 # events lost to a full queue
+    def __repr__(self):
+        return f"{self.__class__.__name__}(running={self.running}, watching={len(self._sinks)})"
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    def watch(self, folder: "OutlookFolder", kinds: Iterable[str] = EVENT_KINDS):
+        """deliver the events of folder, call this from the thread the folder was made on"""
+        kinds = frozenset(kinds)
+        if not kinds <= EVENT_KINDS:
+            raise ValueError(f"{sorted(kinds - EVENT_KINDS)} are not event kinds, expected some of {sorted(EVENT_KINDS)}")
+        stream = self._backend.marshal(folder._folder)
+        with self._pending_lock:
+            self._pending.append((stream, folder.entry_id, folder.name, kinds))
+        self._backend.wake(self._wake)
+    def start(self):
+        if self.running:
+            return
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self._maxsize)
+        self._closed = False
+        self._stopping = False
+        self._thread = threading.Thread(target=self._pump, name="outlookpy-event-bridge", daemon=True)
+        self._thread.start()
+    def stop(self, timeout: Optional[float] = 5.0):
+        """stop pumping, unhook every folder, and end iteration for consumers, waiting up to timeout for the pump"""
+        thread = self._stop_pump()
+        if thread is None:
+            return
+        if threading.current_thread() is not thread:
+            thread.join(timeout)
+        self._close()
+    async def aclose(self, timeout: Optional[float] = 5.0):
+        """stop() for coroutines, the pump thread is waited for on an executor so the event loop keeps running"""
+        thread = self._stop_pump()
+        if thread is None:
+            return
+        await asyncio.get_running_loop().run_in_executor(None, thread.join, timeout)
+        self._close()
+    def _stop_pump(self) -> Optional[threading.Thread]:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping = True
+            self._backend.wake(self._wake)
+        return thread
+    def _close(self):
+        def close():
+            # the sentinel can't be dropped like an event: with no room for it consumers aren't waiting,
+            # they drain the queue and see the closed flag once it is empty
+            self._closed = True
+            if not self._queue.full():
+                self._queue.put_nowait(_STOPPED)
+        try:
+            self._loop.call_soon_threadsafe(close)
+        except RuntimeError:
+            # the loop is closed, nobody is listening anymore
+            pass
+    async def __aenter__(self) -> "EventBridge":
+        self.start()
+        return self
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+    def __aiter__(self) -> AsyncIterator[OutlookEvent]:
+        return self._events()
+    async def _events(self) -> AsyncIterator[OutlookEvent]:
+        while not (self._closed and self._queue.empty()):
+            event = await self._queue.get()
+            if event is _STOPPED:
+                # left for the next consumer, there was room for it a moment ago
+                self._queue.put_nowait(_STOPPED)
+                return
+            yield event
+    def _deliver(self, event: OutlookEvent):
+        def put():
+            if self._closed:
+                return
+            try:
+                self._queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.dropped += 1
+        try:
+            self._loop.call_soon_threadsafe(put)
+        except RuntimeError:
+            # the loop is closed, nobody is listening anymore
+            pass
+    def _attach_pending(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+        for stream, folder_id, folder_name, kinds in pending:
+            folder = self._backend.unmarshal(stream)
+            sink = self._backend.with_events(folder.Items, _BridgeSink, [self, folder_id, folder_name, kinds])
+            self._sinks.append(sink)
+    def _pump(self):
+        self._backend.initialize()
+        try:
+            while not self._stopping:
+                self._attach_pending()
+                # 0 is the wake event, 1 is messages waiting
+                if self._backend.wait([self._wake], _PUMP_TIMEOUT) == 1:
+                    # pump is true when it saw WM_QUIT
+                    if self._backend.pump():
+                        break
+        except Exception:
+            logger.exception("the event bridge stopped pumping")
+        finally:
+            # sinks hold COM objects of this apartment, let go of them before leaving it
+            self._sinks = []
+            self._backend.uninitialize()
+
+
+async def folder_events(folder: "OutlookFolder", kinds: Iterable[str] = EVENT_KINDS, maxsize: int = 0) -> AsyncIterator[OutlookEvent]:
+    """the events of a single folder as an async iterator, the bridge is stopped when iteration ends"""
+    bridge = EventBridge(asyncio.get_running_loop(), maxsize)
+    bridge.watch(folder, kinds)
+    bridge.start()
+    try:
+        async for event in bridge:
+            yield event
+    finally:
+        await bridge.aclose()
@@ -0,0 +1,275 @@
+"""Attachments of items, and a content-addressed store that keeps each distinct file once."""
+import hashlib
+import mimetypes
+import mmap
+import os
+import sqlite3
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .constants import PR_ATTACH_MIME_TAG_W, PR_ATTACH_CONTENT_ID_W, PR_ATTACHMENT_HIDDEN
+from .outlookenumerations import OutlookAttachmentType
+
+# read in one PropertyAccessor call per attachment, none of them fetch the content
+ATTACHMENT_PROPERTIES = (PR_ATTACH_MIME_TAG_W, PR_ATTACH_CONTENT_ID_W, PR_ATTACHMENT_HIDDEN)
+
+# how much of a saved file is hashed at a time, so big attachments never sit in memory whole
+_HASH_BLOCK_SIZE = 1 << 20
+
+# outlook's size of an attachment is the content's plus at most about this much
+_SIZE_OVERHEAD = 4096
+
+
+class OutlookAttachment(object):
+    """
+    Wrapper for an attachment of an item. Name, size, MIME type and whether it's inline are metadata,
+    reading them never downloads the file, only save and AttachmentStore.put do.
+    size is outlook's, which counts a little overhead on top of the content.
+    """
+    def __init__(self, attachment, entry_id: Optional[str] = None):
+        self._attachment = attachment
+        self._entry_id = entry_id # of the item it's attached to, when known
+        self._metadata = None
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.name}, {self.size} bytes)"
+    def _properties(self) -> Dict[str, object]:
+        if self._metadata is None:
+            values = self._attachment.PropertyAccessor.GetProperties(ATTACHMENT_PROPERTIES)
+            # a missing property comes back as an integer SCODE, never a valid string or bool here
+            self._metadata = {schema: None if isinstance(value, int) and not isinstance(value, bool) else value
+                              for schema, value in zip(ATTACHMENT_PROPERTIES, values)}
+        return self._metadata
+    @property
+    def index(self) -> int:
+        """1-based position in the item's Attachments"""
+        return self._attachment.Index
+    @property
+    def name(self) -> str:
+        return self._attachment.FileName or self._attachment.DisplayName
+    @property
+    def size(self) -> int:
+        return self._attachment.Size
+    @property
+    def type(self) -> OutlookAttachmentType:
+        return OutlookAttachmentType(self._attachment.Type)
+    @property
+    def mime_type(self) -> str:
+        """as the sender labelled it, or guessed from the name when they didn't"""
+        labelled = self._properties()[PR_ATTACH_MIME_TAG_W]
+        if labelled:
+            return labelled
+        return mimetypes.guess_type(self.name or "")[0] or "application/octet-stream"
+    @property
+    def content_id(self) -> Optional[str]:
+        return self._properties()[PR_ATTACH_CONTENT_ID_W] or None
+    @property
+    def inline(self) -> bool:
+        """shown in the body (pictures in HTML mail) rather than listed as an attachment"""
+        return bool(self._properties()[PR_ATTACHMENT_HIDDEN]) or self.content_id is not None
+    @property
+    def fingerprint(self) -> str:
+        """
+        What this attachment looks like from its metadata alone: name, size and MIME type.
+        A reply or forward carries the same file with the same fingerprint.
+        """
+        return hashlib.sha256(f"{(self.name or '').lower()}\0{self.size}\0{self.mime_type}".encode("utf-8")).hexdigest()
+    def save(self, path: str):
+        """download the content to path"""
+        self._attachment.SaveAsFile(os.path.abspath(path))
+
+
+def attachments_of(com_item, entry_id: Optional[str] = None) -> List[OutlookAttachment]:
+    attachments = com_item.Attachments
+    return [OutlookAttachment(attachments.Item(index), entry_id) for index in range(1, attachments.Count + 1)]
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fingerprints (
+    fingerprint TEXT PRIMARY KEY,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS attachments (
+    entry_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT,
+    mime_type TEXT,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (entry_id, position)
+);
+CREATE INDEX IF NOT EXISTS attachments_digest ON attachments (digest);
+"""
+
+
+class AttachmentStore(object):
+    """
+    Attachment content on disk under root, one file per distinct SHA-256 of the content however many items carry it,
+    with an SQLite index of which item's attachment is which content.
+
+    The attachment's fingerprint is looked up first, so the same file on every reply in a thread is only fetched
+    the first time. It is only taken when the stored file is there and its real size fits outlook's size.
+    That is still a heuristic, a fingerprint only describes metadata and two different files with the same name,
+    size and MIME type would be stored as whichever was seen first. trust_fingerprints=False downloads every
+    attachment and dedupes by the hash of its content alone.
+    max_size skips single attachments bigger than it (by outlook's size, then by the real one),
+    max_total stops the store growing past that many bytes of content, also with puts running on several threads.
+    """
+    def __init__(self, root: str, max_size: Optional[int] = None, max_total: Optional[int] = None, trust_fingerprints: bool = True):
+        self.root = os.path.abspath(root)
+        self.max_size = max_size
+        self.max_total = max_total
+        self.trust_fingerprints = trust_fingerprints
+        os.makedirs(os.path.join(self.root, "objects"), exist_ok=True)
+        self._connection = sqlite3.connect(os.path.join(self.root, "index.sqlite"), check_same_thread=False)
+        self._connection.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        # kept as content is added, so checking max_total doesn't sum the whole index on every put
+        self._total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        self._reserved = 0 # bytes of new content being moved into place, counted against max_total already
+        self.downloads = 0 # attachments fetched from outlook
+        self.downloaded_bytes = 0
+        self.fingerprint_hits = 0 # attachments not fetched because their fingerprint was known
+        self.content_hits = 0 # attachments fetched but already stored under their hash
+        self.skipped = 0 # attachments over a size limit
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.root}, {self.count()} files, {self.total_size()} bytes)"
+    def __enter__(self) -> "AttachmentStore":
+        return self
+    def __exit__(self, *exc_info):
+        self.close()
+    def close(self):
+        self._connection.close()
+    def path(self, digest: str) -> str:
+        """where the content with this digest lives, fanned out by its first two characters"""
+        return os.path.join(self.root, "objects", digest[:2], digest[2:])
+    def __contains__(self, digest: str) -> bool:
+        with self._lock:
+            return self._connection.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone() is not None
+    def count(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+    def total_size(self) -> int:
+        with self._lock:
+            return self._total
+    def _remember(self, attachment: OutlookAttachment, digest: str, fingerprint: str, size: Optional[int] = None,
+                  reserved: int = 0):
+        with self._lock, self._connection:
+            # the reservation turns into total in the same step, so no put sees the size counted twice or not at all
+            self._reserved -= reserved
+            if size is not None:
+                if self._connection.execute("INSERT OR IGNORE INTO blobs (digest, size) VALUES (?, ?)", (digest, size)).rowcount:
+                    self._total += size
+            # the first content seen under a fingerprint keeps it, a later file with the same metadata doesn't take it over
+            self._connection.execute("INSERT OR IGNORE INTO fingerprints (fingerprint, digest) VALUES (?, ?)", (fingerprint, digest))
+            if attachment._entry_id is not None:
+                self._connection.execute("INSERT OR REPLACE INTO attachments (entry_id, position, name, mime_type, digest) VALUES (?, ?, ?, ?, ?)",
+                                         (attachment._entry_id, attachment.index, attachment.name, attachment.mime_type, digest))
+    def _reserve(self, size: int) -> bool:
+        """count size against the limits, False when it doesn't fit"""
+        if self.max_size is not None and size > self.max_size:
+            return False
+        with self._lock:
+            # checked and taken under one lock, so puts running together can't all fit into the same room
+            if self.max_total is not None and self._total + self._reserved + size > self.max_total:
+                return False
+            self._reserved += size
+            return True
+    def _release(self, size: int):
+        with self._lock:
+            self._reserved -= size
+    def _known(self, fingerprint: str, reported: int) -> Optional[str]:
+        """the digest stored under the fingerprint, when the file is there and its size fits outlook's reported one"""
+        with self._lock:
+            known = self._connection.execute("SELECT f.digest, b.size FROM fingerprints f JOIN blobs b ON b.digest = f.digest WHERE f.fingerprint = ?",
+                                             (fingerprint,)).fetchone()
+        if known is None:
+            return None
+        digest, size = known
+        if not size <= reported <= size + _SIZE_OVERHEAD:
+            return None
+        try:
+            if os.path.getsize(self.path(digest)) != size:
+                return None
+        except OSError:
+            return None
+        return digest
+    def put(self, attachment: OutlookAttachment) -> Optional[str]:
+        """the SHA-256 of the attachment's content, downloading it only if the store doesn't have it, None when over a limit"""
+        fingerprint = attachment.fingerprint
+        reported = attachment.size
+        if self.trust_fingerprints:
+            known = self._known(fingerprint, reported)
+            if known is not None:
+                with self._lock:
+                    self.fingerprint_hits += 1
+                self._remember(attachment, known, fingerprint)
+                return known
+        # outlook's size is a little over the content's, so this can only skip attachments that really are too big
+        if self.max_size is not None and reported > self.max_size + _SIZE_OVERHEAD:
+            with self._lock:
+                self.skipped += 1
+            return None
+        handle, temporary_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        os.close(handle)
+        try:
+            attachment.save(temporary_path)
+            digest, size = _hash_file(temporary_path)
+            # puts run on several threads at once, the counters only change under the lock
+            with self._lock:
+                self.downloads += 1
+                self.downloaded_bytes += size
+            if digest in self:
+                with self._lock:
+                    self.content_hits += 1
+                self._remember(attachment, digest, fingerprint, size)
+                return digest
+            if not self._reserve(size):
+                with self._lock:
+                    self.skipped += 1
+                return None
+            try:
+                os.makedirs(os.path.dirname(self.path(digest)), exist_ok=True)
+                os.replace(temporary_path, self.path(digest))
+            except BaseException:
+                self._release(size)
+                raise
+            self._remember(attachment, digest, fingerprint, size, reserved=size)
+            return digest
+        finally:
+            if os.path.exists(temporary_path):
+                os.unlink(temporary_path)
+    def open(self, digest: str):
+        """
+        The stored content as a read-only memory map, use it as a context manager or close it when done.
+        Empty files can't be mapped, they come back as empty bytes.
+        """
+        with open(self.path(digest), "rb") as stored:
+            if os.fstat(stored.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(stored.fileno(), 0, access=mmap.ACCESS_READ)
+    def digests(self, entry_id: str) -> List[Tuple[int, str, str]]:
+        """(position, name, digest) of every stored attachment of the item with this EntryID"""
+        with self._lock:
+            return self._connection.execute("SELECT position, name, digest FROM attachments WHERE entry_id = ? ORDER BY position",
+                                            (entry_id,)).fetchall()
+    def statistics(self) -> Dict[str, int]:
+        files = self.count()
+        with self._lock:
+            return {"files": files, "bytes": self._total, "downloads": self.downloads,
+                    "downloaded_bytes": self.downloaded_bytes, "fingerprint_hits": self.fingerprint_hits,
+                    "content_hits": self.content_hits, "skipped": self.skipped}
+
+
+def _hash_file(path: str) -> Tuple[str, int]:
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as saved:
+        for block in iter(lambda: saved.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+            size += len(block)
+    return digest.hexdigest(), size
+
@@ -0,0 +1,125 @@
+"""
+Where COM comes from. Wrappers ask the active backend for everything that isn't a plain member access
+(attaching, event sinks, message pumping, marshalling), so the same code runs against a real Outlook through pywin32
+or against the in-memory Outlook of outlooksimulated.
+"""
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+try:
+    import pythoncom
+except ImportError:
+    # not on windows, only the simulated backend is available
+    pythoncom = None
+
+HAVE_PYWIN32 = pythoncom is not None
+
+if HAVE_PYWIN32:
+    com_error = pythoncom.com_error
+else:
+    class com_error(Exception):
+        """stands in for pythoncom.com_error without pywin32, with the same arguments and attributes"""
+        def __init__(self, hresult, strerror=None, excepinfo=None, argerror=None):
+            super().__init__(hresult, strerror, excepinfo, argerror)
+            self.hresult = hresult
+            self.strerror = strerror
+            self.excepinfo = excepinfo
+            self.argerror = argerror
+
+
+class Win32Backend(object):
+    """Outlook over COM with pywin32, the backend used unless another one is chosen."""
+    name = "win32"
+    def __init__(self):
+        if not HAVE_PYWIN32:
+            raise RuntimeError("pywin32 is not installed, use_backend(SimulatedBackend(...)) to run without outlook")
+    def __repr__(self):
+        return f"{self.__class__.__name__}()"
+    def attach(self, timings: Optional[Dict[str, float]] = None):
+        """
+        The Outlook.Application object, the running instance when there is one.
+        Wrappers are only generated when the makepy cache has none yet, seconds spent go into timings.
+        """
+        import win32com.client
+        from win32com.client import gencache
+        timings = {} if timings is None else timings
+        started = time.perf_counter()
+        if gencache.GetClassForProgID("Outlook.Application") is None:
+            gencache.EnsureDispatch("Outlook.Application")
+            timings["wrappers"] = time.perf_counter() - started
+        started = time.perf_counter()
+        try:
+            # GetActiveObject skips the activation round trip through the service control manager
+            application = win32com.client.GetActiveObject("Outlook.Application")
+        except com_error:
+            # nothing running, start it
+            application = win32com.client.Dispatch("Outlook.Application")
+        timings["attach"] = time.perf_counter() - started
+        return application
+    def dispatch(self, com_object):
+        from win32com.client import Dispatch
+        return Dispatch(com_object)
+    def with_events(self, com_object, sink_class, arguments: Sequence):
+        """hook sink_class up to com_object's events, sink_class.__init__ gets arguments, the sink is returned"""
+        from win32com.client import Dispatch
+        from .alternatedispatch import WithEvents
+        return WithEvents(Dispatch(com_object), sink_class, list(arguments))
+    def unhook(self, sink):
+        """stop the events of a sink with_events returned, rather than waiting for it to be collected"""
+        sink.close()
+    def post_quit(self):
+        """end the message pump of the calling thread"""
+        import ctypes
+        ctypes.windll.user32.PostQuitMessage(0)
+    def initialize(self):
+        pythoncom.CoInitialize()
+    def uninitialize(self):
+        pythoncom.CoUninitialize()
+    def marshal(self, com_object):
+        """a token another thread can turn back into com_object with unmarshal"""
+        return pythoncom.CoMarshalInterThreadInterfaceInStream(pythoncom.IID_IDispatch, com_object._oleobj_)
+    def unmarshal(self, token):
+        from win32com.client import Dispatch
+        return Dispatch(pythoncom.CoGetInterfaceAndReleaseStream(token, pythoncom.IID_IDispatch))
+    def create_wake(self):
+        import win32event
+        return win32event.CreateEvent(None, False, False, None)
+    def wake(self, handle):
+        import win32event
+        win32event.SetEvent(handle)
+    def wait(self, handles: Sequence, timeout: Optional[float]) -> Optional[int]:
+        """
+        Block until a handle is set or messages arrive for this thread.
+        The position of the handle that was set, len(handles) for messages, None on timeout.
+        """
+        import win32event
+        milliseconds = win32event.INFINITE if timeout is None else max(0, int(timeout * 1000))
+        result = win32event.MsgWaitForMultipleObjects(list(handles), False, milliseconds, win32event.QS_ALLINPUT)
+        if result == win32event.WAIT_TIMEOUT:
+            return None
+        return result - win32event.WAIT_OBJECT_0
+    def pump(self) -> bool:
+        """deliver waiting messages, True when one of them was WM_QUIT"""
+        return bool(pythoncom.PumpWaitingMessages())
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """the backend in use, pywin32 unless use_backend chose another"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = Win32Backend()
+        return _backend
+
+
+def use_backend(backend):
+    """make backend the one every wrapper uses from now on, the previous one is returned"""
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+    return previous
@@ -0,0 +1,190 @@
+"""Item bodies: cheap previews, reading only the format a body was written in, and a bounded cache of bodies read."""
+from collections import OrderedDict
+import sys
+import threading
+from typing import Any, Dict, Iterator, Optional, Tuple, Union, TYPE_CHECKING
+
+from .constants import PR_ENTRYID, PR_LAST_MODIFICATION_TIME, PR_NATIVE_BODY_INFO
+from .outlooksnapshot import plain_datetime
+
+if TYPE_CHECKING:
+    from .outlookitem import OutlookItem
+    from .outlooktable import OutlookTable
+
+# the item member holding the body in each format, asking for a format the body wasn't written in makes outlook convert it
+BODY_FORMATS = {"plain": "Body", "html": "HTMLBody", "rtf": "RTFBody"}
+
+# https://docs.microsoft.com/en-us/office/client-developer/outlook/mapi/pidtagnativebody-canonical-property
+NATIVE_BODY_FORMATS = {1: "plain", 2: "rtf", 3: "html"}
+
+# tables carry the start of the plain text body under this name, cut at PREVIEW_LENGTH characters
+PREVIEW_COLUMN = "urn:schemas:httpmail:textdescription"
+PREVIEW_LENGTH = 255
+
+# bodies are cached under these, read along with an item's other properties (folder.iter(prefetch=...), snapshot)
+BODY_KEY_PROPERTIES = (PR_ENTRYID, PR_LAST_MODIFICATION_TIME)
+
+_PREVIEW = "preview" # the cache's format name for previews
+_CACHED_FORMATS = tuple(BODY_FORMATS) + (_PREVIEW,)
+
+
+def _size(value: Union[str, bytes]) -> int:
+    return sys.getsizeof(value)
+
+
+class BodyCache(object):
+    """
+    Bodies already read, keyed by EntryID and format, shared by every item.
+    Each entry remembers the item's LastModificationTime when it was read and is only used while that still matches,
+    so an edited item is read again. Deleting or moving an item through OutlookPy discards its bodies.
+    Least recently used bodies are dropped once the cache holds more than max_bytes,
+    bodies bigger than max_body_bytes are never kept.
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_body_bytes: Optional[int] = None):
+        self._max_bytes = max_bytes
+        self._max_body_bytes = max_bytes // 8 if max_body_bytes is None else max_body_bytes
+        self._bodies = OrderedDict() # (entry id, format) to (modified, body, size), least recently used first
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    def __repr__(self):
+        return f"{self.__class__.__name__}(size={len(self)}, bytes={self.bytes}, hits={self.hits}, misses={self.misses})"
+    def __len__(self):
+        return len(self._bodies)
+    def get(self, entry_id: str, format: str, modified: Any) -> Optional[Union[str, bytes]]:
+        key = (entry_id, format)
+        with self._lock:
+            cached = self._bodies.get(key)
+            if cached is not None and cached[0] == modified:
+                self._bodies.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            if cached is not None:
+                del self._bodies[key]
+                self.bytes -= cached[2]
+            self.misses += 1
+            return None
+    def put(self, entry_id: str, format: str, modified: Any, body: Union[str, bytes]):
+        size = _size(body)
+        if size > self._max_body_bytes:
+            return
+        key = (entry_id, format)
+        with self._lock:
+            previous = self._bodies.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[2]
+            self._bodies[key] = (modified, body, size)
+            self.bytes += size
+            while self.bytes > self._max_bytes:
+                _, (_, _, evicted) = self._bodies.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+    def discard(self, entry_id: str):
+        """forget every body of an item"""
+        with self._lock:
+            for format in _CACHED_FORMATS:
+                cached = self._bodies.pop((entry_id, format), None)
+                if cached is not None:
+                    self.bytes -= cached[2]
+    def statistics(self) -> Dict[str, int]:
+        return {"size": len(self), "bytes": self.bytes, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+    def clear(self):
+        with self._lock:
+            self._bodies.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+# shared by every item in the process
+BODY_CACHE = BodyCache()
+
+
+def native_format(item: "OutlookItem") -> str:
+    """the format the body was written in, plain when outlook doesn't say"""
+    try:
+        native = item._get_property(PR_NATIVE_BODY_INFO)
+    except Exception:
+        native = None
+    return NATIVE_BODY_FORMATS.get(native, "plain")
+
+
+def _cache_key(item: "OutlookItem", cache: Optional[BodyCache]) -> Tuple[Optional[str], Any]:
+    """
+    (EntryID, LastModificationTime) the item's bodies are cached under, from its prefetched BODY_KEY_PROPERTIES
+    so that looking in the cache costs no COM call. No EntryID, and so no caching, when they weren't prefetched.
+    """
+    if cache is None:
+        return None, None
+    entry_id = item._prefetched_value(PR_ENTRYID)
+    modified = item._prefetched_value(PR_LAST_MODIFICATION_TIME)
+    # a new item has no EntryID yet
+    if not entry_id or modified is None:
+        return None, None
+    return bytes(entry_id).hex().upper(), plain_datetime(modified)
+
+
+def _read_body(item: "OutlookItem", format: str, cache: Optional[BodyCache], entry_id: Optional[str], modified: Any) -> Union[str, bytes]:
+    if entry_id:
+        body = cache.get(entry_id, format, modified)
+        if body is not None:
+            return body
+    body = getattr(item._internal_item, BODY_FORMATS[format])
+    if format == "rtf":
+        body = bytes(body or b"")
+    elif body is None:
+        body = ""
+    if entry_id:
+        cache.put(entry_id, format, modified, body)
+    return body
+
+
+def read_body(item: "OutlookItem", format: Optional[str] = None, cache: Optional[BodyCache] = BODY_CACHE) -> Union[str, bytes]:
+    """
+    The body of item in format, "plain", "html" or "rtf" (bytes), or in its native format when format is None.
+    Items whose BODY_KEY_PROPERTIES were prefetched are answered from cache while they weren't modified before that
+    prefetch, everything else costs the one read of the body it always did. The prefetched key is the item as of the
+    prefetch: later edits, saved or not, are seen by a new wrapper or with cache=None.
+    """
+    if format is None:
+        format = native_format(item)
+    if format not in BODY_FORMATS:
+        raise ValueError(f"format must be one of {tuple(BODY_FORMATS)}, not {format!r}")
+    return _read_body(item, format, cache, *_cache_key(item, cache))
+
+
+def preview(item: "OutlookItem", n: int = PREVIEW_LENGTH, cache: Optional[BodyCache] = BODY_CACHE) -> str:
+    """
+    The first n characters of the plain text body. A plain body or a preview already in the cache is used
+    (previews come from table reads, see previews), otherwise the whole plain body is read and cached:
+    outlook has no cheaper way to the start of one item's body, previews covers many items with one table read.
+    """
+    if n < 0:
+        raise ValueError("n must not be negative")
+    if cache is not None:
+        # two small property reads to find a cached preview, against reading the whole body
+        item.prefetch(BODY_KEY_PROPERTIES)
+    entry_id, modified = _cache_key(item, cache)
+    if entry_id:
+        body = cache.get(entry_id, "plain", modified)
+        if body is not None:
+            return body[:n]
+        start = cache.get(entry_id, _PREVIEW, modified)
+        # a preview shorter than outlook's cut off is the whole body
+        if start is not None and (n <= len(start) or len(start) < PREVIEW_LENGTH):
+            return start[:n]
+    return _read_body(item, "plain", cache, entry_id, modified)[:n]
+
+
+def previews(table: "OutlookTable", n: int = PREVIEW_LENGTH, cache: Optional[BodyCache] = BODY_CACHE) -> Iterator[Tuple[str, str]]:
+    """
+    (EntryID, first n characters of the plain body) for every row of a table that has entry_id, modified and preview columns,
+    read in bulk without opening any item. Each preview is also cached, for item.preview afterwards.
+    """
+    for row in table:
+        start = row["preview"] or ""
+        if cache is not None:
+            cache.put(row.entry_id, _PREVIEW, plain_datetime(row["modified"]), start)
+        yield row.entry_id, start[:n]
@@ -0,0 +1,156 @@
+"""Moving, deleting and flagging many items at once, against EntryIDs taken before anything changes."""
+import time
+from typing import Callable, Iterable, List, Optional, TYPE_CHECKING
+
+from .outlookattachment import AttachmentStore, attachments_of
+from .outlookbody import BODY_CACHE
+from .outlookquery import OutlookQuery
+from .outlooktable import OutlookTable
+
+if TYPE_CHECKING:
+    from .outlookfolder import OutlookFolder
+
+# without a batch_size, batches grow or shrink so that each one takes about this many seconds
+TARGET_BATCH_SECONDS = 0.5
+MIN_BATCH_SIZE = 10
+MAX_BATCH_SIZE = 1000
+
+Progress = Callable[[int, int], None]
+
+
+class BulkResult(object):
+    """
+    What a bulk operation did: EntryIDs it succeeded on, (EntryID, error) pairs it failed on,
+    and for moves the EntryID each item has in its new folder, which can differ from the old one.
+    """
+    def __init__(self, operation: str, total: int):
+        self.operation = operation
+        self.total = total
+        self.succeeded = []
+        self.failed = []
+        self.moved = {} # old entry id to new entry id
+        self.skipped = 0 # items that were already as asked, for set_flags_many
+        self.batches = 0
+        self.elapsed = 0.0
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.operation}, succeeded={len(self.succeeded)}, failed={len(self.failed)}, total={self.total})"
+    def __bool__(self):
+        return not self.failed
+    @property
+    def rate(self) -> float:
+        """items per second"""
+        return len(self.succeeded) / self.elapsed if self.elapsed else 0.0
+
+
+def target_ids(folder: "OutlookFolder", targets) -> List[str]:
+    """
+    The EntryIDs of whatever a bulk operation was given, read in full before the operation starts
+    so acting on items can't shift what is left to act on. None means every item in the folder.
+    """
+    if targets is None:
+        return folder.table([]).entry_ids()
+    if isinstance(targets, (OutlookQuery, OutlookTable)):
+        return targets.entry_ids()
+    if isinstance(targets, str):
+        raise TypeError("targets must be a query, a table, or an iterable of items or EntryIDs, not a single string")
+    return [target if isinstance(target, str) else target.entry_id for target in targets]
+
+
+def _run(folder: "OutlookFolder", operation: str, entry_ids: List[str], action: Callable, batch_size: Optional[int],
+         progress: Optional[Progress]) -> BulkResult:
+    result = BulkResult(operation, len(entry_ids))
+    # the session and store are looked up once, not once per item
+    session = folder._folder.Session
+    store_id = folder._folder.StoreID
+    size = batch_size or MIN_BATCH_SIZE
+    started = time.perf_counter()
+    position = 0
+    while position < len(entry_ids):
+        batch = entry_ids[position:position + size]
+        batch_started = time.perf_counter()
+        for entry_id in batch:
+            try:
+                item = session.GetItemFromID(entry_id, store_id)
+                action(entry_id, item, result)
+            except Exception as e:
+                # gone already, locked by another client, no permission, a bad value... one item doesn't stop the rest
+                result.failed.append((entry_id, e))
+        position += len(batch)
+        result.batches += 1
+        if progress is not None:
+            progress(position, len(entry_ids))
+        if batch_size is None:
+            took = time.perf_counter() - batch_started
+            per_item = took / len(batch) if took > 0 else 0
+            wanted = int(TARGET_BATCH_SECONDS / per_item) if per_item else MAX_BATCH_SIZE
+            size = max(MIN_BATCH_SIZE, min(MAX_BATCH_SIZE, wanted))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def move_many(folder: "OutlookFolder", targets, destination: "OutlookFolder", batch_size: Optional[int] = None,
+              progress: Optional[Progress] = None) -> BulkResult:
+    destination_folder = destination._folder
+    def move(entry_id, item, result):
+        BODY_CACHE.discard(entry_id)
+        moved = item.Move(destination_folder)
+        result.succeeded.append(entry_id)
+        result.moved[entry_id] = moved.EntryID
+    return _run(folder, "move", target_ids(folder, targets), move, batch_size, progress)
+
+
+def delete_many(folder: "OutlookFolder", targets=None, batch_size: Optional[int] = None,
+                progress: Optional[Progress] = None) -> BulkResult:
+    def delete(entry_id, item, result):
+        BODY_CACHE.discard(entry_id)
+        item.Delete()
+        result.succeeded.append(entry_id)
+    return _run(folder, "delete", target_ids(folder, targets), delete, batch_size, progress)
+
+
+def _category_set(categories: Optional[str]) -> frozenset:
+    return frozenset(category.strip() for category in (categories or "").split(",") if category.strip())
+
+
+def set_flags_many(folder: "OutlookFolder", targets=None, read: Optional[bool] = None, categories: Optional[Iterable[str]] = None,
+                   batch_size: Optional[int] = None, progress: Optional[Progress] = None) -> BulkResult:
+    """
+    Mark items read or unread and/or replace their categories. The object model has no bulk edit,
+    every changed item is still saved on its own, batches only decide how often progress is reported.
+    Categories compare as sets, "A, B" is already "B, A" and isn't saved again.
+    """
+    if read is None and categories is None:
+        raise ValueError("nothing to set, give read and/or categories")
+    joined = ", ".join(categories) if categories is not None else None
+    wanted = _category_set(joined)
+    def set_flags(entry_id, item, result):
+        changed = False
+        if read is not None and item.UnRead == read:
+            item.UnRead = not read
+            changed = True
+        if joined is not None and _category_set(item.Categories) != wanted:
+            item.Categories = joined
+            changed = True
+        if changed:
+            # one save per item for however many flags changed
+            item.Save()
+            result.succeeded.append(entry_id)
+        else:
+            result.skipped += 1
+    return _run(folder, "set_flags", target_ids(folder, targets), set_flags, batch_size, progress)
+
+
+def save_attachments_many(folder: "OutlookFolder", store: AttachmentStore, targets=None, include_inline: bool = True,
+                          batch_size: Optional[int] = None, progress: Optional[Progress] = None) -> BulkResult:
+    if targets is None:
+        # only items that have something to save
+        targets = folder.where(has_attachments=True)
+    def save(entry_id, item, result):
+        for attachment in attachments_of(item, entry_id):
+            if attachment.inline and not include_inline:
+                result.skipped += 1
+                continue
+            if store.put(attachment) is None:
+                result.skipped += 1
+        result.succeeded.append(entry_id)
+    return _run(folder, "save_attachments", target_ids(folder, targets), save, batch_size, progress)
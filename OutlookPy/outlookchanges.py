@@ -0,0 +1,161 @@
+"""Incremental change feeds for folders, built on LastModificationTime watermarks and EntryID diffs."""
+from datetime import datetime, timedelta, timezone
+import json
+import os
+import sqlite3
+import tempfile
+from typing import Iterable, Iterator, List, Optional, TYPE_CHECKING
+
+from .outlookitem import OutlookItem
+
+if TYPE_CHECKING:
+    from .outlookfolder import OutlookFolder
+
+# DASL dates only go down to the minute, so each delta scan looks back a little past the previous one
+# items modified in that overlap are reported again, the feed delivers changes at least once
+WATERMARK_OVERLAP = timedelta(minutes=2)
+
+
+class ChangeToken(object):
+    """
+    Where a folder's change feed left off: when the last scan started and which items the folder held then.
+    Tokens are plain data and can be persisted with a FileTokenStore or SQLiteTokenStore.
+    """
+    __slots__ = ("folder_id", "watermark", "entry_ids")
+    def __init__(self, folder_id: str, watermark: datetime, entry_ids: Iterable[str]):
+        if watermark.tzinfo is None:
+            raise ValueError("the watermark must be timezone aware")
+        self.folder_id = folder_id
+        self.watermark = watermark
+        self.entry_ids = frozenset(entry_ids)
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.watermark.isoformat()}, {len(self.entry_ids)} items)"
+    def __eq__(self, other):
+        if not isinstance(other, ChangeToken):
+            return NotImplemented
+        return (self.folder_id, self.watermark, self.entry_ids) == (other.folder_id, other.watermark, other.entry_ids)
+    def to_dict(self) -> dict:
+        return {"folder_id": self.folder_id, "watermark": self.watermark.isoformat(), "entry_ids": sorted(self.entry_ids)}
+    @classmethod
+    def from_dict(cls, data: dict) -> "ChangeToken":
+        return cls(data["folder_id"], datetime.fromisoformat(data["watermark"]), data["entry_ids"])
+
+
+class FolderChanges(object):
+    """The result of a delta scan, EntryIDs that were added, modified and removed, and the token to resume from."""
+    def __init__(self, folder: "OutlookFolder", added: List[str], modified: List[str], removed: List[str], token: ChangeToken, full: bool):
+        self.folder = folder
+        self.added = added
+        self.modified = modified
+        self.removed = removed
+        self.token = token
+        self.full = full # True when there was no usable token and every item counts as added
+    def __repr__(self):
+        return f"{self.__class__.__name__}(added={len(self.added)}, modified={len(self.modified)}, removed={len(self.removed)})"
+    def __bool__(self):
+        return bool(self.added or self.modified or self.removed)
+    def items(self) -> Iterator[OutlookItem]:
+        """the added and modified items, fetched one at a time by EntryID"""
+        for entry_id in self.added + self.modified:
+            yield self.folder._item_from_id(entry_id)
+
+
+def changes_since(folder: "OutlookFolder", token: Optional[ChangeToken] = None, detect_deletions: bool = True) -> FolderChanges:
+    """
+    Items added, modified or removed in a folder since a token was issued.
+    Without a token every item is reported as added. Additions and modifications come from a
+    LastModificationTime restriction, deletions from diffing the folder's EntryIDs against the token's.
+    """
+    folder_id = folder._local_id
+    if token is not None and token.folder_id != folder_id:
+        raise ValueError(f"this token belongs to a different folder than {folder.name}")
+    scan_started = datetime.now(timezone.utc)
+    if token is None:
+        current = folder.table([]).entry_ids()
+        return FolderChanges(folder, current, [], [], ChangeToken(folder_id, scan_started, current), full=True)
+    changed = folder.where(modified__gt=token.watermark - WATERMARK_OVERLAP).entry_ids()
+    known = token.entry_ids
+    added = [entry_id for entry_id in changed if entry_id not in known]
+    modified = [entry_id for entry_id in changed if entry_id in known]
+    removed = []
+    if detect_deletions:
+        current = set(folder.table([]).entry_ids())
+        removed = sorted(known - current)
+        # items moved in keep their old modification time, so they only show up in the diff
+        already_added = set(added)
+        added.extend(sorted(entry_id for entry_id in current - known if entry_id not in already_added))
+        entry_ids = current
+    else:
+        entry_ids = known.union(added)
+    return FolderChanges(folder, added, modified, removed, ChangeToken(folder_id, scan_started, entry_ids), full=False)
+
+
+class FileTokenStore(object):
+    """Change tokens of any number of folders in one JSON file, rewritten atomically on every save."""
+    def __init__(self, path: str):
+        self._path = path
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._path})"
+    def _read(self) -> dict:
+        try:
+            with open(self._path, "r", encoding="utf-8") as token_file:
+                return json.load(token_file)
+        except FileNotFoundError:
+            return {}
+    def load(self, folder_id: str) -> Optional[ChangeToken]:
+        data = self._read().get(folder_id)
+        if data is None:
+            return None
+        return ChangeToken.from_dict(data)
+    def _write(self, tokens: dict):
+        directory = os.path.dirname(os.path.abspath(self._path))
+        handle, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "w", encoding="utf-8") as token_file:
+                json.dump(tokens, token_file)
+            os.replace(temporary_path, self._path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+    def save(self, token: ChangeToken):
+        tokens = self._read()
+        tokens[token.folder_id] = token.to_dict()
+        self._write(tokens)
+    def delete(self, folder_id: str):
+        tokens = self._read()
+        if tokens.pop(folder_id, None) is not None:
+            self._write(tokens)
+
+
+class SQLiteTokenStore(object):
+    """Change tokens kept in SQLite, EntryIDs one per row so large folders don't make for large blobs."""
+    def __init__(self, path_or_connection):
+        if isinstance(path_or_connection, sqlite3.Connection):
+            self._connection = path_or_connection
+        else:
+            self._connection = sqlite3.connect(path_or_connection)
+        with self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS change_tokens (folder_id TEXT PRIMARY KEY, watermark TEXT NOT NULL)")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS change_token_items (folder_id TEXT NOT NULL, entry_id TEXT NOT NULL, PRIMARY KEY (folder_id, entry_id))")
+    def __repr__(self):
+        return f"{self.__class__.__name__}()"
+    def load(self, folder_id: str) -> Optional[ChangeToken]:
+        row = self._connection.execute("SELECT watermark FROM change_tokens WHERE folder_id = ?", (folder_id,)).fetchone()
+        if row is None:
+            return None
+        entry_ids = [entry_id for (entry_id,) in self._connection.execute(
+            "SELECT entry_id FROM change_token_items WHERE folder_id = ?", (folder_id,))]
+        return ChangeToken(folder_id, datetime.fromisoformat(row[0]), entry_ids)
+    def save(self, token: ChangeToken):
+        with self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO change_tokens (folder_id, watermark) VALUES (?, ?)",
+                                     (token.folder_id, token.watermark.isoformat()))
+            self._connection.execute("DELETE FROM change_token_items WHERE folder_id = ?", (token.folder_id,))
+            self._connection.executemany("INSERT INTO change_token_items (folder_id, entry_id) VALUES (?, ?)",
+                                         ((token.folder_id, entry_id) for entry_id in token.entry_ids))
+    def delete(self, folder_id: str):
+        with self._connection:
+            self._connection.execute("DELETE FROM change_tokens WHERE folder_id = ?", (folder_id,))
+            self._connection.execute("DELETE FROM change_token_items WHERE folder_id = ?", (folder_id,))
+    def close(self):
+        self._connection.close()
@@ -1,42 +1,211 @@
+from collections import OrderedDict
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
 
-from outlookpy.constants import *
+from .outlookbackend import com_error
+from .constants import *
+
+logger = logging.getLogger(__name__)
+
+# https://docs.microsoft.com/en-us/office/vba/api/outlook.olobjectclass
+OL_RECIPIENT = 4
+OL_ADDRESS_ENTRY = 8
 
 class OutlookContact(object):
-    """https://docs.microsoft.com/en-us/dotnet/api/microsoft.office.interop.outlook.recipient"""
+    """
+    https://docs.microsoft.com/en-us/dotnet/api/microsoft.office.interop.outlook.recipient
+    Wraps a Recipient or an AddressEntry, whatever represents an individual on an item.
+    Values are read lazily, resolve() reads them all and lets go of the COM object.
+    """
     def __init__(self, wrapper_source):
-        self._internal_object = None
+        self._internal_object = wrapper_source
         self._friendly_name = None
         self._smtp_address = None
+        self._internal = None
+    @classmethod
+    def detached(cls, name: Optional[str], address: Optional[str], internal: Optional[bool]) -> "OutlookContact":
+        """a contact from values already known, holding no COM object"""
+        contact = cls(None)
+        contact._friendly_name = name
+        contact._smtp_address = address
+        contact._internal = internal
+        return contact
+    def _address_entry(self):
+        # recipients have address entries, address entries are their own
+        if self._internal_object.Class == OL_RECIPIENT:
+            return self._internal_object.AddressEntry
+        return self._internal_object
+    def _resolve_address(self) -> Optional[str]:
+        try:
+            return self._internal_object.PropertyAccessor.GetProperty(PR_SMTP_ADDRESS)
+        except com_error:
+            pass
+        # exchange users that don't expose the property directly still know their primary address
+        try:
+            address_entry = self._address_entry()
+            exchange_user = address_entry.GetExchangeUser()
+            if exchange_user is not None:
+                return exchange_user.PrimarySmtpAddress
+            if "@" in (address_entry.Address or ""):
+                return address_entry.Address
+        except com_error:
+            pass
+        logger.warning("could not retrieve SMTP address for name '%s'", self.name)
+        return None
     @property
-    def address(self) -> str:
+    def address(self) -> Optional[str]:
         """The SMTP address of the recipient, if it can be acquired."""
-        if self._smtp_address is not None:
-            self._smtp_address = self._internal_object.PropertyAccessor.GetProperty(PR_SMTP_ADDRESS)
+        if self._smtp_address is None and self._internal_object is not None:
+            self._smtp_address = self._resolve_address()
         return self._smtp_address
     @property
-    def name(self) -> str:
+    def name(self) -> Optional[str]:
         """The friendly name of the recipient, if it can be acquired."""
-        if self._friendly_name is not None:
+        if self._friendly_name is None and self._internal_object is not None:
             self._friendly_name = self._internal_object.Name
         return self._friendly_name
     @property
-    def iternal(self) -> bool:
-        return False
+    def internal(self) -> Optional[bool]:
+        """If an exchange user is not wrapped and cannot be determined it is external."""
+        if self._internal is None and self._internal_object is not None:
+            try:
+                # 'EX' stands for 'EXchange' not 'external'
+                self._internal = self._address_entry().Type == "EX"
+            except com_error:
+                self._internal = False
+        return self._internal
+    @property
+    def external(self) -> Optional[bool]:
+        internal = self.internal
+        if internal is None:
+            return None
+        return not internal
+    def resolve(self) -> "OutlookContact":
+        """read everything now and release the COM object, so the contact can be kept around"""
+        if self._internal_object is not None:
+            self.name
+            self.address
+            self.internal
+            self._internal_object = None
+        return self
+    def __eq__(self, other):
+        if not isinstance(other, OutlookContact):
+            return NotImplemented
+        return (self.address or "").lower() == (other.address or "").lower() and self.name == other.name
+    def __hash__(self):
+        return hash(((self.address or "").lower(), self.name))
     def __repr__(self) -> str:
         # an alternative __repr__ could just return the address
         # i should consider what str(recipient_instance) represents
         return f"{self.__class__.__name__}({self.name}, {self.address})"
 
 
-"""
-contacts should check if they are wrapping a:
-    recipient
-    address entry
-    contact?
-    exchange user
-    if an exchange user is not wrapped and cannot be determined it is external
-    recipients have address entries
+def _address_entry_id(wrapper_source, object_class: Optional[int] = None) -> str:
+    if (object_class or wrapper_source.Class) == OL_ADDRESS_ENTRY:
+        return wrapper_source.ID
+    return wrapper_source.EntryID
+
 
+class AddressCache(object):
+    """
+    Resolved contacts keyed by the store they were seen from and their AddressEntry ID, shared by every item.
+    The store keeps profiles and mailboxes opened in one process from answering for each other.
+    Least recently used contacts are dropped past max_size, and any contact older than ttl seconds is resolved again,
+    so a changed display name or address shows up eventually.
+
+    Whole recipient lists are kept too, by item and modification time, so reading the recipients of an item
+    seen before costs one property read instead of two calls per recipient.
+    """
+    def __init__(self, max_size: int = 5000, ttl: float = 3600.0):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._contacts = OrderedDict() # (store id, address entry id) to (expires, contact), least recently used first
+        self._items = OrderedDict() # (store id, item entry id) to (expires, modified, contacts)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.item_hits = 0
+        self.evictions = 0
+    def __repr__(self):
+        return f"{self.__class__.__name__}(size={len(self)}, hits={self.hits}, misses={self.misses})"
+    def __len__(self):
+        return len(self._contacts)
+    def get(self, entry_id: str, store_id: Optional[str] = None) -> Optional[OutlookContact]:
+        key = (store_id, entry_id)
+        with self._lock:
+            cached = self._contacts.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                self._contacts.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            if cached is not None:
+                del self._contacts[key]
+            self.misses += 1
+            return None
+    def put(self, entry_id: str, contact: OutlookContact, store_id: Optional[str] = None):
+        key = (store_id, entry_id)
+        with self._lock:
+            self._contacts[key] = (time.monotonic() + self._ttl, contact)
+            self._contacts.move_to_end(key)
+            while len(self._contacts) > self._max_size:
+                self._contacts.popitem(last=False)
+                self.evictions += 1
+    def resolve(self, wrapper_source, store_id: Optional[str] = None, object_class: Optional[int] = None) -> OutlookContact:
+        """
+        The contact for a Recipient or AddressEntry seen from store_id, only going to exchange the first time we see them.
+        object_class (OL_RECIPIENT, OL_ADDRESS_ENTRY) saves reading it when the caller already knows.
+        """
+        try:
+            entry_id = _address_entry_id(wrapper_source, object_class)
+        except com_error:
+            entry_id = None
+        if not entry_id:
+            # nothing to key on, e.g. an unresolved recipient typed in by hand
+            return OutlookContact(wrapper_source).resolve()
+        contact = self.get(entry_id, store_id)
+        if contact is None:
+            contact = OutlookContact(wrapper_source).resolve()
+            self.put(entry_id, contact, store_id)
+        return contact
+    def recipients(self, com_item, store_id: Optional[str], entry_id: Optional[str], modified) -> List[OutlookContact]:
+        """
+        The contacts of every recipient of an item, whose store, EntryID and modification time the caller has read.
+        Unsaved items have no EntryID and are never kept.
+        """
+        key = (store_id, entry_id)
+        if entry_id:
+            with self._lock:
+                cached = self._items.get(key)
+                if cached is not None and cached[0] > time.monotonic() and cached[1] == modified:
+                    self._items.move_to_end(key)
+                    self.item_hits += 1
+                    return list(cached[2])
+        contacts = [self.resolve(recipient, store_id, OL_RECIPIENT) for recipient in com_item.Recipients]
+        if entry_id:
+            with self._lock:
+                self._items[key] = (time.monotonic() + self._ttl, modified, tuple(contacts))
+                self._items.move_to_end(key)
+                while len(self._items) > self._max_size:
+                    self._items.popitem(last=False)
+        return contacts
+    def statistics(self) -> Dict[str, int]:
+        return {"size": len(self), "hits": self.hits, "misses": self.misses, "item_hits": self.item_hits, "evictions": self.evictions}
+    def clear(self):
+        with self._lock:
+            self._contacts.clear()
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+            self.item_hits = 0
+            self.evictions = 0
+
+# shared by every item in the process
+ADDRESS_CACHE = AddressCache()
+
+
+"""
     modify the item's _try_get_sender to be more dynamic
     make it into a try_get_smtp or something
     that way recipients, senders, originators, etc... any object that represents an individual can be unified here
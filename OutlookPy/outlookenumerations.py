@@ -61,3 +61,10 @@ class OutlookShowAs(Enum):
     BUSY = 2
     OUT_OF_OFFICE = 3
     WORKING_ELSEWHERE = 4
+
+class OutlookAttachmentType(Enum):
+    """https://docs.microsoft.com/en-us/office/vba/api/outlook.olattachmenttype"""
+    BY_VALUE = 1
+    BY_REFERENCE = 4
+    EMBEDDED_ITEM = 5
+    OLE = 6
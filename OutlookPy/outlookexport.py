@@ -0,0 +1,289 @@
+"""Streaming folders out to JSON lines, mbox or Parquet files a chunk at a time, with resumable checkpoints."""
+from abc import ABC, abstractmethod
+from datetime import datetime
+from email.generator import BytesGenerator
+from email.message import EmailMessage
+import email.policy
+import email.utils
+import itertools
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+from .outlookbackend import com_error
+from .outlookbody import read_body
+from .outlookbulk import Progress
+from .outlookitem import OutlookItem
+from .outlookquery import OutlookQuery
+from .outlooksnapshot import SNAPSHOT_FIELDS, plain_datetime
+
+if TYPE_CHECKING:
+    from .outlookfolder import OutlookFolder
+
+# every field an export can carry, body is the only one not read through a snapshot
+EXPORT_FIELDS = SNAPSHOT_FIELDS + ("body",)
+EXPORT_FORMATS = ("jsonl", "mbox", "parquet")
+
+# what an mbox message is built from, whatever fields were asked for
+_MBOX_FIELDS = ("entry_id", "store_id", "subject", "sender", "received", "categories", "body")
+
+DEFAULT_EXPORT_CHUNK_SIZE = 500
+
+# mbox has no room for anything but text, lines are \n like every other mbox
+_MBOX_POLICY = email.policy.default.clone(linesep="\n")
+
+
+class ExportResult(object):
+    """What an export wrote: how many items, in how many chunks, and the (EntryID, error) pairs it couldn't read."""
+    def __init__(self, path: str, format: str, total: int):
+        self.path = path
+        self.format = format
+        self.total = total
+        self.written = 0
+        self.failed = []
+        self.chunks = 0
+        self.resumed_from = 0 # items an earlier, interrupted run had written already
+        self.complete = False
+        self.elapsed = 0.0
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.path}, {self.format}, written={self.written}, failed={len(self.failed)}, complete={self.complete})"
+    @property
+    def rate(self) -> float:
+        """items per second written by this run"""
+        return (self.written - self.resumed_from) / self.elapsed if self.elapsed else 0.0
+
+
+def _record(item: OutlookItem, fields: Tuple[str, ...]) -> Tuple[Dict[str, Any], Optional[datetime]]:
+    """the record of an item and its received time, which places it in the export whether or not it is a field"""
+    snapshot_fields = [field for field in fields if field != "body"]
+    if "received" not in snapshot_fields:
+        snapshot_fields.append("received")
+    values = item.snapshot(snapshot_fields).as_dict()
+    received = plain_datetime(values["received"])
+    record = {field: values[field] for field in fields if field != "body"}
+    if "received" in fields:
+        record["received"] = received
+    if "body" in fields:
+        # exports read every body once, keeping them would only push out the ones worth caching
+        record["body"] = read_body(item, "plain", cache=None)
+    return record, received
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, tuple):
+        return list(value)
+    return value
+
+
+def _mbox_message(record: Dict[str, Any]) -> EmailMessage:
+    message = EmailMessage(policy=_MBOX_POLICY)
+    if record.get("sender"):
+        message["From"] = record["sender"]
+    message["Subject"] = record.get("subject") or ""
+    if record.get("received") is not None:
+        message["Date"] = email.utils.format_datetime(record["received"].astimezone())
+    message["X-Outlook-EntryID"] = record["entry_id"]
+    if record.get("categories"):
+        message["Keywords"] = ", ".join(record["categories"])
+    message.set_content(record.get("body") or "")
+    return message
+
+
+class _Writer(ABC):
+    """where an export's chunks go, flush returns how far the output is known to be good"""
+    @abstractmethod
+    def write(self, records: List[Dict[str, Any]]):
+        pass
+    @abstractmethod
+    def flush(self) -> int:
+        pass
+    @abstractmethod
+    def close(self):
+        pass
+
+
+class _FileWriter(_Writer):
+    """appends chunks of records to one file, offset is how far the file is known to be good"""
+    def __init__(self, path: str, offset: Optional[int]):
+        mode = "r+b" if offset is not None and os.path.exists(path) else "wb"
+        self._file = open(path, mode)
+        # whatever an interrupted run wrote after its last checkpoint goes
+        self._file.truncate(offset or 0)
+        self._file.seek(0, os.SEEK_END)
+    def flush(self) -> int:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+    def close(self):
+        self._file.close()
+
+
+class _JsonLinesWriter(_FileWriter):
+    def write(self, records: List[Dict[str, Any]]):
+        lines = (json.dumps({field: _json_value(value) for field, value in record.items()}, ensure_ascii=False) + "\n" for record in records)
+        self._file.write("".join(lines).encode("utf-8"))
+
+
+class _MboxWriter(_FileWriter):
+    def write(self, records: List[Dict[str, Any]]):
+        generator = BytesGenerator(self._file, mangle_from_=True, policy=_MBOX_POLICY)
+        for record in records:
+            received = record.get("received") or datetime.now()
+            sender = email.utils.parseaddr(record.get("sender") or "")[1] or "MAILER-DAEMON"
+            self._file.write(f"From {sender} {received.strftime('%a %b %d %H:%M:%S %Y')}\n".encode("ascii", "replace"))
+            generator.flatten(_mbox_message(record))
+            self._file.write(b"\n")
+
+
+class _ParquetWriter(_Writer):
+    """
+    One part file per chunk in the directory path, part-00000.parquet and on,
+    so nothing has to be held open or rewritten and readers can take the directory as one dataset.
+    """
+    def __init__(self, path: str, parts: int, fields: Tuple[str, ...]):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("pyarrow is required for parquet exports")
+        self._pyarrow = pyarrow
+        self._path = path
+        self.parts = parts
+        types = {"entry_id": pyarrow.string(), "store_id": pyarrow.string(), "item_class": pyarrow.int64(),
+                 "subject": pyarrow.string(), "sender": pyarrow.string(), "received": pyarrow.timestamp("us"),
+                 "unread": pyarrow.bool_(), "importance": pyarrow.int64(), "categories": pyarrow.list_(pyarrow.string()),
+                 "body": pyarrow.string()}
+        self._schema = pyarrow.schema([(field, types[field]) for field in fields])
+        os.makedirs(path, exist_ok=True)
+        # parts an interrupted run wrote after its last checkpoint go
+        for name in os.listdir(path):
+            if name.startswith("part-") and name.endswith(".parquet") and int(name[5:-8]) >= parts:
+                os.unlink(os.path.join(path, name))
+    def write(self, records: List[Dict[str, Any]]):
+        table = self._pyarrow.Table.from_pylist(records, schema=self._schema)
+        self._pyarrow.parquet.write_table(table, os.path.join(self._path, f"part-{self.parts:05d}.parquet"))
+        self.parts += 1
+    def flush(self) -> int:
+        return 0
+    def close(self):
+        pass
+
+
+class _Checkpoint(object):
+    """
+    The sidecar JSON file of an export, path + ".checkpoint", rewritten atomically after every chunk.
+    Items are exported oldest first, so what has been written is everything received before a minute
+    plus the listed items received in that minute. Items without a received time come last,
+    they are listed on their own.
+    """
+    def __init__(self, path: str):
+        self.path = path + ".checkpoint"
+    def load(self) -> Optional[dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as checkpoint_file:
+                return json.load(checkpoint_file)
+        except FileNotFoundError:
+            return None
+    def save(self, state: dict):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        handle, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "w", encoding="utf-8") as checkpoint_file:
+                json.dump(state, checkpoint_file)
+            os.replace(temporary_path, self.path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+
+def export_folder(folder: "OutlookFolder", path: str, format: str = "jsonl", fields: Optional[Iterable[str]] = None,
+                  chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE, progress: Optional[Progress] = None,
+                  resume: bool = True) -> ExportResult:
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {EXPORT_FORMATS}, not {format!r}")
+    fields = EXPORT_FIELDS if fields is None else tuple(fields)
+    unknown = set(fields) - set(EXPORT_FIELDS)
+    if unknown:
+        raise ValueError(f"{sorted(unknown)} are not export fields, expected some of {EXPORT_FIELDS}")
+    if "entry_id" not in fields:
+        fields = ("entry_id",) + fields
+    if format == "mbox":
+        fields = _MBOX_FIELDS
+    checkpoint = _Checkpoint(path)
+    state = checkpoint.load() if resume else None
+    if state is not None and (state["format"] != format or tuple(state["fields"]) != fields):
+        raise ValueError(f"{path} is part of a {state['format']} export of {state['fields']}, resume=False starts over")
+    if state is None:
+        state = {"format": format, "fields": list(fields), "written": 0, "offset": None, "parts": 0,
+                 "minute": None, "minute_ids": [], "undated_ids": [], "complete": False}
+    dated = OutlookQuery(folder).where(received__ne=None)
+    if state["minute"] is not None:
+        dated = dated.where(received__gte=datetime.fromisoformat(state["minute"]))
+    dated = dated.sorted("received")
+    # items without a received time can't be placed by a minute, they follow the dated ones
+    undated = OutlookQuery(folder).where(received=None)
+    minute_ids = set(state["minute_ids"])
+    undated_ids = set(state.get("undated_ids", ()))
+    # what the queries find again that the interrupted run wrote already isn't left to do
+    result = ExportResult(path, format, state["written"] + len(dated) - len(minute_ids) + len(undated) - len(undated_ids))
+    result.written = result.resumed_from = state["written"]
+    if state["complete"]:
+        result.total = result.written
+        result.complete = True
+        return result
+    if format == "parquet":
+        writer = _ParquetWriter(path, state["parts"], fields)
+    elif format == "mbox":
+        writer = _MboxWriter(path, state["offset"])
+    else:
+        writer = _JsonLinesWriter(path, state["offset"])
+    started = time.perf_counter()
+    def write(chunk: List[Dict[str, Any]]):
+        writer.write(chunk)
+        state["offset"] = writer.flush()
+        state["parts"] = getattr(writer, "parts", 0)
+        state["written"] += len(chunk)
+        state["minute_ids"] = sorted(minute_ids)
+        state["undated_ids"] = sorted(undated_ids)
+        checkpoint.save(state)
+        result.written = state["written"]
+        result.chunks += 1
+        if progress is not None:
+            progress(result.written, result.total)
+    try:
+        chunk = []
+        for item in itertools.chain(dated, undated):
+            try:
+                record, received = _record(item, fields)
+            except com_error as e:
+                result.failed.append((item.entry_id, e))
+                continue
+            if received is None:
+                if record["entry_id"] in undated_ids:
+                    continue # written by the run that was interrupted
+                undated_ids.add(record["entry_id"])
+            else:
+                minute = received.replace(second=0, microsecond=0).isoformat()
+                if minute == state["minute"] and record["entry_id"] in minute_ids:
+                    continue # written by the run that was interrupted
+                if minute != state["minute"]:
+                    state["minute"] = minute
+                    minute_ids = set()
+                minute_ids.add(record["entry_id"])
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                write(chunk)
+                chunk = []
+        if chunk:
+            write(chunk)
+        state["complete"] = True
+        checkpoint.save(state)
+        result.complete = True
+    finally:
+        writer.close()
+        result.elapsed = time.perf_counter() - started
+    return result
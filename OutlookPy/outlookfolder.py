@@ -1,12 +1,25 @@
 from __future__ import annotations
-from typing import List, Dict
-import ctypes
-import win32com.client
-from win32com.client import Dispatch
-import pythoncom
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import logging
+import operator
+import re
+from collections.abc import Mapping
 
-from outlookpy.alternatedispatch import WithEvents
-from outlookpy.outlookitem import OutlookItem, com_to_python
+from .outlookbackend import com_error, get_backend
+from .outlookitem import OutlookItem, com_to_python
+from .outlooktable import OutlookTable, DEFAULT_CHUNK_SIZE
+from .outlookquery import OutlookQuery
+from .outlooksnapshot import OutlookItemSnapshot
+from .outlookchanges import ChangeToken, FolderChanges, changes_since
+from .outlookasync import EVENT_KINDS, OutlookEvent, folder_events
+from .outlookhandlers import ChangeCoalescer, HandlerPool
+from .outlookrules import RuleEngine
+from .outlookbulk import BulkResult, move_many, delete_many, set_flags_many, save_attachments_many
+from .outlookattachment import AttachmentStore
+from .outlookbody import PREVIEW_LENGTH
+from .outlookexport import DEFAULT_EXPORT_CHUNK_SIZE, ExportResult, export_folder
+
+logger = logging.getLogger(__name__)
 
 class OutlookFolder(list):
     """
@@ -20,11 +33,22 @@ class OutlookFolder(list):
         # OnItemAdd is not an event on the folder, but for the wrapper i'm binding a folder and its items
         # so our folder wrapper needs to understand what that item being listened to is, so it can make the user
         # seem like its the folder that has the event, beause that makes more sense (ya here that, microsoft!?)
-        self._MAPI_items = folder.Items # used for attaching events
-        # sub folders are a dictionary, keys being folder names and values being the folder objects
-        self._folders = {sub_folder.Name:OutlookFolder(sub_folder) for sub_folder in folder.Folders}
+        self._items = None # folder.Items, read the first time it is needed, see _MAPI_items
+        # sub folders act like a dictionary, keys being folder names and values being the folder objects
+        # they are only looked up and wrapped when asked for, so wrapping the root doesn't walk the whole tree
+        self._folders = OutlookFolderCollection(self)
         self._attached_handlers = {"add":[],"remove":[],"change":[]}
+        self._handler_pool = None
+        self._pooled_kinds = frozenset()
+        self._coalescers = []
+        self._rules = None
         self._internal_proxy = None
+    @property
+    def _MAPI_items(self):
+        # wrapping a folder only to reach its sub folders (root.folders["Inbox"]) doesn't read Items at all
+        if self._items is None:
+            self._items = self._folder.Items
+        return self._items
     def __eq__(self, other):
         return self._local_id == other._local_id
     def __ne__(self, other):
@@ -32,10 +56,40 @@ class OutlookFolder(list):
     def __iter__(self):
         for item in self._MAPI_items:
             yield com_to_python(item)
+    def iter(self, prefetch: Optional[Iterable[str]] = None) -> Iterator[OutlookItem]:
+        """
+        Iterate the items of this folder, reading the given schema properties of each in one call.
+        folder.iter(prefetch=TRIAGE_PROPERTIES) makes sender, external and sentiment free to read afterwards.
+        """
+        return OutlookQuery(self).iter(prefetch)
+    def snapshots(self, fields: Optional[Iterable[str]] = None) -> Iterator[OutlookItemSnapshot]:
+        """detached, picklable snapshots of every item in this folder, see OutlookItem.snapshot"""
+        return OutlookQuery(self).snapshots(fields)
+    def previews(self, n: int = PREVIEW_LENGTH) -> Iterator[Tuple[str, str]]:
+        """
+        (EntryID, first n characters of the plain body) of every item from one table read, no item is opened.
+        Outlook cuts previews at PREVIEW_LENGTH characters, they are cached for item.preview afterwards.
+        """
+        return OutlookQuery(self).previews(n)
     def __getitem__(self, key):
-        return com_to_python(list(self._MAPI_items)[key])
+        if isinstance(key, slice):
+            return FolderView(self, key)
+        return com_to_python(self._MAPI_items.Item(self._item_position(key)))
     def __len__(self):
-        return len(self._MAPI_items)
+        # Count is read every time, so the length follows items arriving and leaving
+        return self._MAPI_items.Count
+    def _item_position(self, index: int) -> int:
+        """the 1-based Items.Item position of a python index, negative indexes count from the end"""
+        try:
+            index = operator.index(index)
+        except TypeError:
+            raise TypeError(f"{self.__class__.__name__} indices must be integers or slices, not {type(index).__name__}")
+        count = len(self)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError(f"{self.__class__.__name__} index out of range")
+        return index + 1
     def __repr__(self):
         return f"{self.__class__.__name__}({self.name})"
     def __hash__(self):
@@ -45,80 +99,354 @@ class OutlookFolder(list):
         """the closest thing to a unqiue ID we have"""
         return self._folder.EntryID
     @property
+    def entry_id(self) -> str:
+        return self._local_id
+    @property
     def name(self) -> str:
         """given or well-known folder name, only unque amongst its parent folder"""
         return self._folder.Name     
-    def OnItemAdd(self, mail):
-        """mandatory event, name is hard-wired for exchange API"""
-        # wrap the mail item, then use it
-        mail = com_to_python(mail)
-        for handler in self._attached_handlers["add"]:
+    def _run_handlers(self, kind: str, *args):
+        if not self._attached_handlers[kind]:
+            # nobody listens for this kind, don't snapshot or submit anything
+            return
+        if self._handler_pool is not None and kind in self._pooled_kinds:
+            # items can't leave this thread, so pooled handlers get detached snapshots of them
+            args = tuple(arg.snapshot() for arg in args)
+            self._handler_pool.submit(self.entry_id, self._attached_handlers[kind], args)
+            return
+        for handler in self._attached_handlers[kind]:
             try:
-                result = handler(mail)
+                result = handler(*args)
                 if not result: # if the response is falsey
                     break # stop processing more rules/handlers
-            except Exception as e:
-                print(e)
-                ctypes.windll.user32.PostQuitMessage(0)
+            except Exception:
+                logger.exception("a handler for %s events of %s failed, stopping the message pump", kind, self.name)
+                get_backend().post_quit()
+    def OnItemAdd(self, mail):
+        """mandatory event, name is hard-wired for exchange API"""
+        # wrap the mail item, then use it, unless nobody would
+        if self._attached_handlers["add"]:
+            self._run_handlers("add", com_to_python(mail))
     def OnItemRemove(self):
-        for handler in self._attached_handlers["remove"]:
-            try:
-                result = handler()
-                if not result:
-                    break
-            except Exception as e:
-                print(e)
-                ctypes.windll.user32.PostQuitMessage(0)
+        self._run_handlers("remove")
     def OnItemChange(self, mail):
-        mail = com_to_python(mail)
-        for handler in self._attached_handlers["change"]:
-            try:
-                result = handler(mail)
-                if not result:
-                    break
-            except Exception as e:
-                print(e)
-                ctypes.windll.user32.PostQuitMessage(0)
+        if self._attached_handlers["change"]:
+            self._run_handlers("change", com_to_python(mail))
+    def use_handler_pool(self, pool: Optional[HandlerPool], kinds: Iterable[str] = ("add", "change", "remove")):
+        """
+        Run this folder's handlers on a HandlerPool instead of on the thread pumping messages.
+        Handlers then receive OutlookItemSnapshot records rather than live items, and run in order per folder,
+        batches of coalesced change handlers included.
+        Passing None goes back to running them inline.
+        A process pool needs handlers it can pickle, TypeError names the first one it can't, see HandlerPool.check.
+        """
+        if pool is not None:
+            for kind in kinds:
+                pool.check(self._attached_handlers[kind])
+        self._handler_pool = pool
+        self._pooled_kinds = frozenset(kinds)
+        for coalescer in self._coalescers:
+            self._pool_coalescer(coalescer)
+        if self._internal_proxy is not None:
+            self._internal_proxy._handler_pool = self._handler_pool
+            self._internal_proxy._pooled_kinds = self._pooled_kinds
     def on_item_added(self):
         return self.on_item_received(self, config)
-    def on_item_received(self):
+    def _check_pooled(self, kind: str, handler):
+        # a handler added after the pool can't be allowed to fail on every dispatch instead
+        if self._handler_pool is not None and kind in self._pooled_kinds:
+            self._handler_pool.check([handler])
+    def _pool_coalescer(self, coalescer: ChangeCoalescer):
+        # the pump closes the windows, the batches go back to the pool that ran the change events
+        pool = self._handler_pool if "change" in self._pooled_kinds else None
+        coalescer.use_pool(pool, self.entry_id)
+    def _register(self, kind: str, handler, first: bool):
+        self._check_pooled(kind, handler)
+        # the proxy shares _attached_handlers (see hook_events), so it sees the handler too
+        if first:
+            self._attached_handlers[kind].insert(0, handler)
+        else:
+            self._attached_handlers[kind].append(handler)
+    def on_item_received(self, first: bool = False):
+        """first puts the handler ahead of those already registered, so one that stops the chain can't hide items from it"""
         def decorator(callback):
-            self._attached_handlers["add"].append(callback)
-            if self._internal_proxy is not None:
-                self._internal_proxy._attached_handlers["add"].append(callback)
+            self._register("add", callback, first)
             return callback
         return decorator
-    def on_item_removed(self):
+    def on_item_removed(self, first: bool = False):
         def decorator(callback):
-            self._attached_handlers["remove"].append(callback)
-            if self._internal_proxy is not None:
-                self._internal_proxy._attached_handlers["remove"].append(callback)
+            self._register("remove", callback, first)
             return callback
         return decorator
-    def on_item_changed(self):
+    def on_item_changed(self, coalesce: Optional[float] = None, max_batch: Optional[int] = None, first: bool = False):
+        """
+        With coalesce, changes are collected for that many seconds, merged per item,
+        and the handler is called with a list of the changed items instead of once per event, see ChangeCoalescer.
+        """
         def decorator(callback):
-            self._attached_handlers["change"].append(callback)
-            if self._internal_proxy is not None:
-                self._internal_proxy._attached_handlers["change"].append(callback)
+            handler = callback
+            if coalesce is not None:
+                handler = ChangeCoalescer(callback, coalesce, max_batch)
+            self._register("change", handler, first)
+            if coalesce is not None:
+                self._pool_coalescer(handler)
+                self._coalescers.append(handler)
             return callback
         return decorator
+    def remove_handler(self, handler):
+        """
+        Stop calling a handler for every kind of event it was registered for.
+        Coalesced handlers are removed through their ChangeCoalescer, see coalescers.
+        """
+        for handlers in self._attached_handlers.values():
+            while handler in handlers:
+                handlers.remove(handler)
+        if handler in self._coalescers:
+            self._coalescers.remove(handler)
+    def use_rules(self, engine: Optional[RuleEngine], kinds: Iterable[str] = ("add",)):
+        """
+        Run a RuleEngine ahead of the other handlers of the given kinds, for live events and dispatch_unread alike.
+        Passing None removes the engine again.
+        """
+        kinds = frozenset(kinds)
+        if not kinds <= {"add", "change"}:
+            raise ValueError("rules need an item to look at, they can only run for 'add' and 'change' events")
+        if engine is not None:
+            for kind in kinds:
+                self._check_pooled(kind, engine)
+        for handlers in self._attached_handlers.values():
+            if self._rules is not None and self._rules in handlers:
+                handlers.remove(self._rules)
+        self._rules = engine
+        if engine is not None:
+            for kind in kinds:
+                self._attached_handlers[kind].insert(0, engine)
+        # the proxy shares _attached_handlers, so it sees the engine too
+    @property
+    def coalescers(self) -> List[ChangeCoalescer]:
+        """the coalescers of handlers registered with on_item_changed(coalesce=...), for their counters"""
+        return list(self._coalescers)
     def dispatch_events(self):
-        client = Dispatch(self._folder.Items)
+        client = get_backend().dispatch(self._folder.Items)
         return client
     def hook_events(self, client):
-        proxy = WithEvents( client, OutlookFolder, [self._folder])
+        proxy = get_backend().with_events(client, OutlookFolder, [self._folder])
         self._internal_proxy = proxy
         # the init-ed things will all be the same in the proxy object (application, namespace, session)
         # anything in this object that is modified on the fly needs to be mirrored in the proxy object
         self._internal_proxy._attached_handlers = self._attached_handlers
+        self._internal_proxy._handler_pool = self._handler_pool
+        self._internal_proxy._pooled_kinds = self._pooled_kinds
+    def events(self, kinds: Iterable[str] = EVENT_KINDS, maxsize: int = 0) -> AsyncIterator[OutlookEvent]:
+        """
+        This folder's events as an async iterator, pumped on a dedicated thread so the event loop stays free.
+        async for event in folder.events({"add"}): event.item is a detached snapshot, see outlookasync.EventBridge
+        """
+        return folder_events(self, kinds, maxsize)
     def dispatch_unread(self):
-        for mail_item in self:
-            if not mail_item.read:
-                result = None
-                for handler in self._attached_handlers["add"]:
-                    result = handler(mail_item)
-                    if not result:
-                        break
+        """run the "add" handlers for every unread item, the same way (and on the same pool) as for arriving ones"""
+        if not self._attached_handlers["add"]:
+            return
+        # the restriction is done by outlook, so only unread items are ever wrapped
+        # the ids are read up front because handlers marking items read would shrink the restriction under us
+        for entry_id in self.where(unread=True).entry_ids():
+            self._run_handlers("add", self._item_from_id(entry_id))
     @property
-    def folders(self) -> Dict[str,OutlookFolder]:
-        return self._folders
\ No newline at end of file
+    def folders(self) -> OutlookFolderCollection:
+        return self._folders
+    def find(self, path: str) -> OutlookFolder:
+        """
+        Look up a descendant folder by its path relative to this folder, "Inbox/Projects/2026".
+        Only the folders along the path are resolved.
+        """
+        folder = self
+        for name in re.split(r"[/\\]", path):
+            if not name:
+                continue
+            try:
+                folder = folder.folders[name]
+            except KeyError:
+                raise KeyError(f"no folder '{name}' in '{folder.name}' while resolving '{path}'")
+        return folder
+    def prefetch_folders(self, depth: int = 1, breadth: Optional[int] = None):
+        """
+        Resolve and cache sub folders ahead of time, level by level.
+        depth limits how many levels down are resolved, breadth how many children of each folder.
+        """
+        level = [self]
+        for _ in range(depth):
+            next_level = []
+            for folder in level:
+                for position, name in enumerate(folder.folders):
+                    if breadth is not None and position >= breadth:
+                        break
+                    next_level.append(folder.folders[name])
+            level = next_level
+    def watch_folders(self):
+        """
+        Invalidate the cached sub folders of this folder whenever outlook adds, removes or renames one.
+        Like item events, this needs messages to be pumped (OutlookPy.listen_for_events).
+        """
+        self._folders.watch()
+    def changes_since(self, token: Optional[ChangeToken] = None, detect_deletions: bool = True) -> FolderChanges:
+        """
+        Items added, modified or removed since token was issued, and a new token, see outlookchanges.changes_since.
+        changes = folder.changes_since(store.load(folder.entry_id)); ...; store.save(changes.token)
+        """
+        return changes_since(self, token, detect_deletions)
+    def where(self, **lookups) -> OutlookQuery:
+        """
+        Server-side selection of this folder's items, see OutlookQuery.
+        folder.where(unread=True, received__gte=dt, sender__domain="x.com", categories__contains="Billing")
+        """
+        return OutlookQuery(self).where(**lookups)
+    def sorted(self, by: str = "received", reverse: bool = False) -> OutlookQuery:
+        """every item in this folder, ordered by outlook rather than in python"""
+        return OutlookQuery(self).sorted(by, reverse)
+    def head(self, n: int) -> List[OutlookItem]:
+        """the first n items of this folder, costs n item fetches regardless of folder size"""
+        return OutlookQuery(self).head(n)
+    def top(self, n: int, by: str = "received") -> List[OutlookItem]:
+        """the n items with the greatest value of by, folder.top(5) is the five most recent items"""
+        return OutlookQuery(self).top(n, by)
+    def table(self, columns: List[str], where: Union[OutlookQuery, str, None] = None, chunk_size: int = DEFAULT_CHUNK_SIZE, sort: Optional[Tuple[str, bool]] = None) -> OutlookTable:
+        """
+        Columnar bulk read of this folder's items, see OutlookTable.
+        where is an OutlookQuery or a Jet or DASL ("@SQL=...") filter string.
+        """
+        if isinstance(where, OutlookQuery):
+            if sort is None:
+                sort = where._sort
+            where = where.filter
+        return OutlookTable(self, columns, where=where, chunk_size=chunk_size, sort=sort)
+    def move_many(self, targets, destination: OutlookFolder, batch_size: Optional[int] = None, progress=None) -> BulkResult:
+        """
+        Move items of this folder to destination. targets is a query, a table, or items or EntryIDs,
+        their EntryIDs are all read before the first move. progress(done, total) is called after every batch.
+        """
+        return move_many(self, targets, destination, batch_size, progress)
+    def delete_many(self, targets=None, batch_size: Optional[int] = None, progress=None) -> BulkResult:
+        """delete items of this folder, every item when targets is None, see move_many"""
+        return delete_many(self, targets, batch_size, progress)
+    def set_flags_many(self, targets=None, read: Optional[bool] = None, categories: Optional[Iterable[str]] = None,
+                       batch_size: Optional[int] = None, progress=None) -> BulkResult:
+        """mark items read or unread and/or replace their categories, items already that way aren't saved, see set_flags_many"""
+        return set_flags_many(self, targets, read, categories, batch_size, progress)
+    def save_attachments(self, store: AttachmentStore, targets=None, include_inline: bool = True,
+                         batch_size: Optional[int] = None, progress=None) -> BulkResult:
+        """
+        Put the attachments of items into store, every item that has any when targets is None, see move_many.
+        Content the store already has isn't downloaded again, attachments over its limits count as skipped.
+        """
+        return save_attachments_many(self, store, targets, include_inline, batch_size, progress)
+    def export(self, path: str, format: str = "jsonl", fields: Optional[Iterable[str]] = None,
+               chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE, progress=None, resume: bool = True) -> ExportResult:
+        """
+        Write this folder's items to path, oldest first, chunk_size items at a time, as JSON lines, mbox,
+        or a directory of Parquet part files (needs pyarrow). Only one chunk is ever held in memory.
+        fields are some of EXPORT_FIELDS, mbox always writes what a message needs. progress(written, total) follows every chunk.
+        A checkpoint next to path lets an interrupted export carry on where it stopped, resume=False starts over.
+        """
+        return export_folder(self, path, format, fields, chunk_size, progress, resume)
+    def _item_from_id(self, entry_id: str) -> OutlookItem:
+        return com_to_python(self._folder.Session.GetItemFromID(entry_id, self._folder.StoreID))
+
+
+class _FolderCollectionEvents(object):
+    """event sink for a Folders collection, names are hard-wired for the exchange API"""
+    def __init__(self, collection):
+        self._collection = collection
+    def OnFolderAdd(self, folder):
+        self._collection.invalidate()
+    def OnFolderRemove(self):
+        self._collection.invalidate()
+    def OnFolderChange(self, folder):
+        self._collection.invalidate()
+
+
+class OutlookFolderCollection(Mapping):
+    """
+    The sub folders of a folder, by name.
+    Folders are looked up and wrapped the first time they are asked for and cached after that,
+    listing every name only happens when the collection is iterated or measured.
+    """
+    def __init__(self, parent: OutlookFolder):
+        self._parent = parent
+        self._listing = None # name to COM folder, filled the first time the names are needed
+        self._wrapped = {} # name to OutlookFolder, filled as folders are asked for
+        self._stale = False
+        self._events = None
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._parent.name})"
+    def _names(self) -> Dict[str, object]:
+        if self._listing is None or self._stale:
+            self._listing = {sub_folder.Name: sub_folder for sub_folder in self._parent._folder.Folders}
+            # drop wrappers of folders that were removed or renamed since we last looked
+            self._wrapped = {name: folder for name, folder in self._wrapped.items() if name in self._listing}
+            self._stale = False
+        return self._listing
+    def __getitem__(self, name: str) -> OutlookFolder:
+        if self._stale:
+            self._names()
+        if name in self._wrapped:
+            return self._wrapped[name]
+        if self._listing is not None:
+            if name not in self._listing:
+                raise KeyError(name)
+            sub_folder = self._listing[name]
+        else:
+            # one lookup by name is cheaper than listing every sibling
+            try:
+                sub_folder = self._parent._folder.Folders.Item(name)
+            except com_error:
+                raise KeyError(name)
+        folder = OutlookFolder(sub_folder)
+        self._wrapped[name] = folder
+        return folder
+    def __iter__(self):
+        return iter(list(self._names()))
+    def __len__(self):
+        return len(self._names())
+    def __contains__(self, name):
+        try:
+            self[name]
+        except KeyError:
+            return False
+        return True
+    def invalidate(self):
+        """forget the listing, the next access asks outlook again and keeps wrappers that still exist"""
+        self._stale = True
+    def watch(self):
+        if self._events is None:
+            self._events = get_backend().with_events(self._parent._folder.Folders, _FolderCollectionEvents, [self])
+
+
+class FolderView(object):
+    """
+    A lazy slice of a folder.
+    Positions are resolved against the folder the first time the view is used, with one Items.Count read,
+    and kept from then on. Only the items actually iterated or indexed are fetched.
+    """
+    def __init__(self, folder: OutlookFolder, key: slice, positions: Optional[range] = None):
+        self._folder = folder
+        self._slice = key
+        self._resolved = positions
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._folder.name}, {self._slice})"
+    def _positions(self) -> range:
+        if self._resolved is None:
+            self._resolved = range(*self._slice.indices(len(self._folder)))
+        return self._resolved
+    def _item(self, position: int) -> OutlookItem:
+        return com_to_python(self._folder._MAPI_items.Item(position + 1))
+    def __len__(self):
+        return len(self._positions())
+    def __iter__(self):
+        for position in self._positions():
+            yield self._item(position)
+    def __getitem__(self, key):
+        positions = self._positions()
+        if isinstance(key, slice):
+            sliced = positions[key]
+            return FolderView(self._folder, slice(sliced.start, sliced.stop if sliced.stop >= 0 else None, sliced.step), sliced)
+        return self._item(positions[key])
@@ -0,0 +1,271 @@
+"""Running folder handlers off the thread that pumps COM messages."""
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+import logging
+import pickle
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+import weakref
+
+from .outlooksnapshot import OutlookItemSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+def run_handler_chain(handlers: Sequence[Callable], args: Tuple) -> Any:
+    """
+    Call handlers in order with args, stopping at the first falsey result, the same as a folder's own events.
+    Module level so process pools can pickle it.
+    """
+    result = None
+    for handler in handlers:
+        result = handler(*args)
+        if not result: # if the response is falsey
+            break # stop processing more rules/handlers
+    return result
+
+
+class HandlerPool(object):
+    """
+    Runs handler chains on a thread or process pool instead of on the pumping thread.
+
+    Chains submitted under the same key (a folder) run one at a time in the order they were submitted,
+    chains under different keys run concurrently. At most max_pending chains are queued or running;
+    past that submit() blocks the caller, which is the pump, until a chain finishes (block=True),
+    or waits up to timeout seconds and then drops the chain and counts it as rejected.
+
+    Process pools need handlers that can be pickled, module level functions rather than closures,
+    and arguments that can be pickled, which is why folders hand over item snapshots.
+    Folders check their handlers with check() when a process pool is attached and as handlers are added,
+    Coalesced handlers hold locks and pending items, they only run on thread pools or inline.
+    """
+    def __init__(self, workers: int = 4, kind: str = "thread", max_pending: int = 1000, block: bool = True, timeout: Optional[float] = None):
+        if kind == "thread":
+            self._executor = ThreadPoolExecutor(workers, thread_name_prefix="outlookpy-handler")
+        elif kind == "process":
+            self._executor = ProcessPoolExecutor(workers)
+        else:
+            raise ValueError(f"kind must be 'thread' or 'process', not {kind!r}")
+        self._kind = kind
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._block = block
+        self._timeout = timeout
+        self._strands = {} # key to the chains waiting behind the one running for that key
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.errors = deque(maxlen=100) # the most recent (key, exception) pairs
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._kind}, submitted={self.submitted}, completed={self.completed}, failed={self.failed})"
+    def __enter__(self) -> "HandlerPool":
+        return self
+    def __exit__(self, *exc_info):
+        self.shutdown()
+    def check(self, handlers: Iterable[Callable]):
+        """raise TypeError for handlers this pool can't run, the ones a process pool can't pickle"""
+        if self._kind != "process":
+            return
+        for handler in handlers:
+            try:
+                pickle.dumps(handler)
+            except Exception as error:
+                raise TypeError(f"{handler!r} can't be pickled for a process pool ({error}), use a module level "
+                                f"function, or a thread pool") from None
+    def submit(self, key: Hashable, handlers: Sequence[Callable], args: Tuple = ()) -> bool:
+        """queue a chain behind any other chain for the same key, False if it was rejected"""
+        if not self._slots.acquire(self._block, self._timeout if self._block else None):
+            with self._lock:
+                self.rejected += 1
+            return False
+        with self._lock:
+            self.submitted += 1
+            if key in self._strands:
+                # something is running for this key already, it will start ours when it is done
+                self._strands[key].append((tuple(handlers), args))
+                return True
+            self._strands[key] = deque()
+        self._launch(key, tuple(handlers), args)
+        return True
+    def _launch(self, key: Hashable, handlers: Tuple, args: Tuple):
+        future = self._executor.submit(run_handler_chain, handlers, args)
+        future.add_done_callback(lambda finished: self._finished(key, finished))
+    def _finished(self, key: Hashable, future: Future):
+        self._slots.release()
+        exception = future.exception()
+        if exception is not None:
+            logger.error("a pooled handler chain for %r failed", key, exc_info=exception)
+        with self._lock:
+            if exception is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+                self.errors.append((key, exception))
+            strand = self._strands[key]
+            if not strand:
+                del self._strands[key]
+                if not self._strands:
+                    self._idle.notify_all()
+                return
+            handlers, args = strand.popleft()
+        self._launch(key, handlers, args)
+    def statistics(self) -> Dict[str, int]:
+        with self._lock:
+            return {"submitted": self.submitted, "completed": self.completed, "failed": self.failed,
+                    "rejected": self.rejected, "pending": self.submitted - self.completed - self.failed}
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """wait for every queued chain to finish, False if timeout ran out first"""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._strands, timeout)
+    def shutdown(self, wait: bool = True):
+        """stop the pool, with wait every chain already submitted runs first"""
+        if wait:
+            self.join()
+        self._executor.shutdown(wait)
+
+
+# coalescers holding changes that still have to be delivered and periodic tasks, see flush_due_coalescers
+_WAITING_COALESCERS = weakref.WeakSet()
+_WAITING_LOCK = threading.Lock()
+
+
+class ChangeCoalescer(object):
+    """
+    Collects change events and delivers them to a handler in batches, one entry per item.
+    The first change opens a window of window seconds, further changes to the same item inside it are merged
+    into one (the latest version wins, the position of the first is kept), and when it closes the handler
+    gets the list of changed items. max_batch closes the window early once that many distinct items are waiting.
+
+    Windows are closed by whatever pumps messages on the thread the live items came from
+    (OutlookPy.listen_for_events), or by calling flush(). Snapshots aren't tied to a thread,
+    unless thread pins every window to the pump of that thread.
+    With use_pool, closed windows are handed to a HandlerPool rather than delivered on the pumping thread.
+    """
+    def __init__(self, handler: Callable[[List[Any]], Any], window: float, max_batch: Optional[int] = None,
+                 thread: Optional[int] = None):
+        if window <= 0:
+            raise ValueError("the coalescing window must be a positive number of seconds")
+        self._handler = handler
+        self._window = window
+        self._max_batch = max_batch
+        self._pending = OrderedDict() # entry id to the latest version of that item
+        self._deadline = None
+        self._pinned = thread
+        self._thread = thread # the thread live items came from, None when only snapshots are waiting
+        self._pool = None # (HandlerPool, key) batches are submitted to, see use_pool
+        self._lock = threading.Lock()
+        self.raw = 0 # change events received
+        self.delivered = 0 # items handed to the handler
+        self.batches = 0
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._window}s, raw={self.raw}, delivered={self.delivered}, merged={self.merged})"
+    @property
+    def merged(self) -> int:
+        """change events that were folded into another event for the same item"""
+        with self._lock:
+            return self.raw - self.delivered - len(self._pending)
+    def __call__(self, item) -> bool:
+        with self._lock:
+            self.raw += 1
+            self._pending[item.entry_id] = item
+            if self._thread is None and not isinstance(item, OutlookItemSnapshot):
+                self._thread = threading.get_ident()
+            if self._deadline is None:
+                self._deadline = time.monotonic() + self._window
+                with _WAITING_LOCK:
+                    _WAITING_COALESCERS.add(self)
+            full = self._max_batch is not None and len(self._pending) >= self._max_batch
+        if full:
+            # called where the chain runs, on the pool already when there is one
+            self._flush(self._handler)
+        # a coalesced handler never stops the chain, it hasn't seen the item yet
+        return True
+    def use_pool(self, pool: Optional["HandlerPool"], key: Hashable = None):
+        """submit batches to pool under key (the folder, so they queue behind its chains), None delivers them inline"""
+        self._pool = None if pool is None else (pool, key)
+    def due(self, now: float, thread: int) -> Optional[float]:
+        """seconds until this window closes for the given thread, None if it has nothing for that thread"""
+        with self._lock:
+            if self._deadline is None or self._thread not in (None, thread):
+                return None
+            return self._deadline - now
+    def flush(self):
+        """deliver whatever is waiting now, on the pool if there is one"""
+        self._flush(self._submit if self._pool is not None else self._handler)
+    def _submit(self, batch: List[Any]):
+        pool, key = self._pool
+        pool.submit(key, [self._handler], (batch,))
+    def _flush(self, deliver: Callable[[List[Any]], Any]):
+        with self._lock:
+            batch = list(self._pending.values())
+            self._pending.clear()
+            self._deadline = None
+            self._thread = self._pinned
+            self.delivered += len(batch)
+            if batch:
+                self.batches += 1
+        with _WAITING_LOCK:
+            _WAITING_COALESCERS.discard(self)
+        if batch:
+            deliver(batch)
+    def statistics(self) -> Dict[str, int]:
+        return {"raw": self.raw, "delivered": self.delivered, "merged": self.merged, "batches": self.batches}
+
+
+class PeriodicTask(object):
+    """
+    Calls function every interval seconds on the thread that made the task, from that thread's pump
+    (OutlookPy.listen_for_events), so it can use COM objects and connections owned by that thread.
+    """
+    def __init__(self, function: Callable[[], Any], interval: float):
+        if interval <= 0:
+            raise ValueError("the interval must be a positive number of seconds")
+        self._function = function
+        self._interval = interval
+        self._thread = threading.get_ident()
+        self._deadline = time.monotonic() + interval
+        self.runs = 0
+        with _WAITING_LOCK:
+            _WAITING_COALESCERS.add(self)
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._interval}s, runs={self.runs})"
+    def due(self, now: float, thread: int) -> Optional[float]:
+        if thread != self._thread:
+            return None
+        return self._deadline - now
+    def flush(self):
+        """run the function now, the next run is interval seconds after this one"""
+        self._deadline = time.monotonic() + self._interval
+        self.runs += 1
+        self._function()
+    def cancel(self):
+        with _WAITING_LOCK:
+            _WAITING_COALESCERS.discard(self)
+
+
+def flush_due_coalescers() -> Optional[float]:
+    """
+    Deliver every batch whose window has closed and whose items belong to the calling thread,
+    and run the calling thread's periodic tasks that are due.
+    Returns the seconds until the next window closes, None if nothing is waiting, for use as a pump timeout.
+    """
+    now = time.monotonic()
+    thread = threading.get_ident()
+    with _WAITING_LOCK:
+        waiting = list(_WAITING_COALESCERS)
+    next_due = None
+    for coalescer in waiting:
+        remaining = coalescer.due(now, thread)
+        if remaining is not None and remaining <= 0:
+            try:
+                coalescer.flush()
+            except Exception:
+                logger.exception("delivering a coalesced batch failed")
+            # a periodic task is due again later, a flushed coalescer is done until the next change
+            remaining = coalescer.due(now, thread) if isinstance(coalescer, PeriodicTask) else None
+        if remaining is not None and (next_due is None or remaining < next_due):
+            next_due = remaining
+    return next_due
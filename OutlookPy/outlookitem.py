@@ -1,40 +1,167 @@
 """All outlook item wrappers."""
 from datetime import datetime
 import json
-from typing import List, Tuple, Dict, Optional, TYPE_CHECKING
+import logging
+from typing import Iterable, List, Tuple, Dict, Optional, Union, TYPE_CHECKING
 
-import pythoncom
+from .outlookbackend import com_error
 
-from outlookpy.constants import *
+from .constants import *
+from .outlooksender import SenderResolver
+from .outlookcontact import OutlookContact, ADDRESS_CACHE, OL_RECIPIENT
+from .outlookattachment import OutlookAttachment, attachments_of
+from .outlookbody import BODY_CACHE, PREVIEW_LENGTH, native_format, preview, read_body
+from .outlooksnapshot import OutlookItemSnapshot, SNAPSHOT_FIELDS, plain_datetime
 #import outlookpy.helpers
 if TYPE_CHECKING:
-    from outlookpy.outlookfolder import OutlookFolder
+    from .outlookfolder import OutlookFolder
 
-import outlookpy.outlookenumerations
-from outlookpy.outlookenumerations import OutlookResponse, OutlookItemImportance, OutlookItemBodyFormat, OutlookTaskResponse, OutlookTaskStatus, OutlookRecipientType, OutlookShowAs
+from .outlookenumerations import OutlookResponse, OutlookItemImportance, OutlookItemBodyFormat, OutlookTaskResponse, OutlookTaskStatus, OutlookRecipientType, OutlookShowAs
+
+logger = logging.getLogger(__name__)
+
+# Any given property could be the one that has the SMTP we want.
+# I have tried to order these properties from most to least likely to be the one we need.
+SENDER_PROPERTIES = (
+    PR_SENT_REPRESENTING_EMAIL_ADDRESS_W,
+    PR_SENT_REPRESENTING_SMTP_ADDRESS,
+    PR_MEETING_SENDER_SMTP_ADDRESS,
+    PR_SMTP_ADDRESS,
+    PR_SENDER_SMTP_ADDRESS,
+    PR_LAST_MODIFIER_NAME_W)
+
+# the address entry each of those describes, the sent representing ones are who the mail was sent on behalf of
+SENDER_PROPERTY_KEYS = {
+    PR_SENT_REPRESENTING_EMAIL_ADDRESS_W: PR_SENT_REPRESENTING_ENTRYID,
+    PR_SENT_REPRESENTING_SMTP_ADDRESS: PR_SENT_REPRESENTING_ENTRYID,
+    PR_MEETING_SENDER_SMTP_ADDRESS: PR_SENDER_ENTRYID,
+    PR_SMTP_ADDRESS: PR_SENDER_ENTRYID,
+    PR_SENDER_SMTP_ADDRESS: PR_SENDER_ENTRYID,
+    PR_LAST_MODIFIER_NAME_W: PR_SENDER_ENTRYID}
+
+# shared by every item, see OutlookItem._try_get_sender_remote
+SENDER_RESOLVER = SenderResolver(SENDER_PROPERTIES, SENDER_PROPERTY_KEYS)
+
+# the entry IDs resolved senders are cached under
+SENDER_ENTRY_IDS = SENDER_RESOLVER.entry_id_properties
+
+# everything the sender, external/internal and sentiment properties read through the PropertyAccessor
+TRIAGE_PROPERTIES = SENDER_ENTRY_IDS + SENDER_PROPERTIES + (PR_SENDER_ADDRTYPE_W, EntityExtraction_Sentiment1_0)
+
+# the store, item and version recipient lists are cached under, read in one call
+RECIPIENT_KEY_PROPERTIES = (PR_STORE_ENTRYID, PR_ENTRYID, PR_LAST_MODIFICATION_TIME)
+
+# proptag types that legitimately hold integers, anything else coming back as an int from GetProperties is an error code
+_INTEGER_PROPERTY_TYPES = ("0002", "0003", "0014")
+MAPI_E_NOT_FOUND = -2147221233 # 0x8004010F as a signed SCODE
+
+def _is_property_error(schema: str, value) -> bool:
+    """GetProperties reports a failed property as an SCODE in that property's slot instead of raising"""
+    if isinstance(value, bool) or not isinstance(value, int):
+        return False
+    if schema.startswith(PROPTAG_PREFIX) and schema[-4:].upper() in _INTEGER_PROPERTY_TYPES:
+        return value == MAPI_E_NOT_FOUND
+    return True
+
+_PROPERTY_MISSING = object()
+
+# how each snapshot field is read off a wrapper, entry_id and store_id are handled separately
+_SNAPSHOT_READERS = {
+    "item_class": lambda item: item._internal_item.Class,
+    "subject": lambda item: item.subject,
+    "sender": lambda item: item.sender,
+    "received": lambda item: plain_datetime(item.received),
+    "unread": lambda item: item.unread,
+    "importance": lambda item: item._internal_item.Importance,
+    "categories": lambda item: tuple(item.categories),
+}
 
 class OutlookItem(object):
     """
     Base wrapping class for outlook items.
     Represents the common functions of all other outlook item types.
     """
+    _sender_kind = "item" # groups sender resolution statistics, see SenderResolver
     def __init__(self, outlook_item):
         self._internal_item = outlook_item
         self._sender = None
         self._recipients = None
         self._parent = None
+        self._prefetched = {}
+    def prefetch(self, properties: Iterable[str]) -> "OutlookItem":
+        """
+        Read a set of schema properties in one PropertyAccessor.GetProperties call and keep them on the wrapper.
+        Properties that read these afterwards (sender, external, sentiment...) don't go back to outlook.
+        """
+        schemas = [schema for schema in dict.fromkeys(properties) if schema not in self._prefetched]
+        if not schemas:
+            return self
+        values = self._internal_item.PropertyAccessor.GetProperties(schemas)
+        for schema, value in zip(schemas, values):
+            self._prefetched[schema] = _PROPERTY_MISSING if _is_property_error(schema, value) else value
+        return self
+    def _prefetched_value(self, schema: str):
+        """a prefetched property, None when it wasn't prefetched or is missing, never goes to outlook"""
+        value = self._prefetched.get(schema, _PROPERTY_MISSING)
+        return None if value is _PROPERTY_MISSING else value
+    def _get_property(self, schema: str):
+        """PropertyAccessor.GetProperty, answered from prefetched properties when we have them"""
+        if schema in self._prefetched:
+            value = self._prefetched[schema]
+            if value is _PROPERTY_MISSING:
+                raise com_error(MAPI_E_NOT_FOUND, f"property {schema} is unavailable", None, None)
+            return value
+        return self._internal_item.PropertyAccessor.GetProperty(schema)
     @property
     def _local_id(self):
         """Closest thing to a unique ID we're going to get for an outlook item"""
         return self._internal_item.EntryID
+    @property
+    def entry_id(self) -> str:
+        return self._local_id
+    def _store_id(self) -> str:
+        # StoreID is the hex of the store's entry ID, which can come from a prefetch instead of a trip through Parent
+        store_id = self._prefetched_value(PR_STORE_ENTRYID)
+        if store_id:
+            return bytes(store_id).hex().upper()
+        return self._internal_item.Parent.StoreID
+    def snapshot(self, fields: Optional[Iterable[str]] = None) -> OutlookItemSnapshot:
+        """
+        A detached, immutable, picklable copy of this item, see OutlookItemSnapshot.
+        fields limits what is read, by default every field in SNAPSHOT_FIELDS is.
+        """
+        fields = SNAPSHOT_FIELDS if fields is None else tuple(fields)
+        unknown = set(fields) - set(SNAPSHOT_FIELDS)
+        if unknown:
+            raise ValueError(f"{sorted(unknown)} are not snapshot fields, expected some of {SNAPSHOT_FIELDS}")
+        # one property read up front covers the store, the keys of cached bodies and recipients, and every sender probe
+        wanted = list(RECIPIENT_KEY_PROPERTIES)
+        if "sender" in fields:
+            wanted.extend(SENDER_ENTRY_IDS)
+            wanted.extend(SENDER_PROPERTIES)
+        self.prefetch(wanted)
+        values = {"entry_id": self._local_id, "store_id": self._store_id()}
+        for field in fields:
+            if field in values:
+                continue
+            try:
+                values[field] = _SNAPSHOT_READERS[field](self)
+            except (com_error, AttributeError):
+                # not every item type has every field
+                values[field] = None
+        return OutlookItemSnapshot(**values)
     def delete(self):
         """moves the item to the Deleted Items folder, does not permanently delete unless it's already in that folder"""
+        BODY_CACHE.discard(self.entry_id)
         self._internal_item.Delete()
     def move(self, folder):
-        self._internal_item = self._internal_item.Move(folder._folder) 
+        # a moved item can come back with a new EntryID, the bodies under the old one would never be read again
+        BODY_CACHE.discard(self.entry_id)
+        self._internal_item = self._internal_item.Move(folder._folder)
     @property
     def containing_folder(self):
-        return outlookpy.OutlookFolder(self._internal_item.Parent)
+        from .outlookfolder import OutlookFolder
+        return OutlookFolder(self._internal_item.Parent)
     @property
     def parent(self):
         """
@@ -56,26 +183,28 @@ class OutlookItem(object):
         this_convo = self._internal_item.GetConversation()
         children = [com_to_python(obj) for obj in this_convo.GetChildren(self._internal_item)._dispobj_]
         return children
+    def _recipient_key(self) -> Tuple[Optional[str], Optional[str], object]:
+        """store id, entry id and modification time, what ADDRESS_CACHE keeps this item's recipients under"""
+        values = self._read_properties(RECIPIENT_KEY_PROPERTIES)
+        store_id, entry_id, modified = (values[schema] for schema in RECIPIENT_KEY_PROPERTIES)
+        return (bytes(store_id).hex().upper() if store_id else None, bytes(entry_id).hex().upper() if entry_id else None, modified)
     @property
-    def recipients(self) -> List[str]:
+    def recipients(self) -> List[OutlookContact]:
         """
-            A list of those that were intended to recieve this item.
-            Currently a list of SMTP addresses, in the future an OutlookContact object.
+            A list of those that were intended to recieve this item, as OutlookContact objects.
+            Contacts come from the shared ADDRESS_CACHE, so each person is only looked up once per store.
         """
         # recipeints might have to make an external call to get this information
         # if we already have it for this mail item, we don't need to call the server again
         # the recipients aren't going to spontaneously change
         if self._recipients is not None:
             return self._recipients
-        recipient_addresses = []
-        for recipient in self._internal_item.Recipients:
-            try:
-                recipient_addresses.append(recipient.PropertyAccessor.GetProperty(PR_SMTP_ADDRESS))
-            except pythoncom.com_error:
-                print(f"ERROR - could not retrieve SMTP address for name '{recipient.Name}''")
-                recipient_addresses.append(None)
-        self._recipients = recipient_addresses
-        return recipient_addresses
+        self._recipients = ADDRESS_CACHE.recipients(self._internal_item, *self._recipient_key())
+        return self._recipients
+    @property
+    def attachments(self) -> List[OutlookAttachment]:
+        """metadata of every attachment, no content is downloaded until one is saved"""
+        return attachments_of(self._internal_item, self.entry_id)
     @property
     def categories(self) -> List[str]:
         categories = self._internal_item.Categories.split(", ")
@@ -94,41 +223,23 @@ class OutlookItem(object):
     @unread.setter
     def unread(self, unread_status: bool):
         self._internal_item.UnRead = unread_status
+    def _read_properties(self, schemas: Iterable[str]) -> Dict[str, object]:
+        """schema properties read together in one call (none for prefetched ones), missing ones as None"""
+        schemas = tuple(schemas)
+        self.prefetch(schemas)
+        return {schema: None if self._prefetched[schema] is _PROPERTY_MISSING else self._prefetched[schema] for schema in schemas}
+    def _sender_ids(self) -> Dict[str, Optional[str]]:
+        """the sent representing and sender address entry IDs as hex, the keys resolved senders are cached under"""
+        return {schema: bytes(value).hex().upper() if value else None
+                for schema, value in self._read_properties(SENDER_ENTRY_IDS).items()}
     def _try_get_sender_remote(self):
         """
         Attempt to get the SMTP that sent this item.
         Sadly, this kludge of a solution works more reliably than the most sophisticated 'proper' log I could create.
+        The shared SENDER_RESOLVER tries SENDER_PROPERTIES in order, batching the reads the way that has worked best
+        for this kind of item, and remembers the answer for the address entry that gave it.
         """
-        # Any given property could be the one that has the SMTP we want.
-        # I have tried to order these properties from most to least likely to be the one we need.
-        # In the far future I imagine running some speed tests on these to see what the distribution of
-        #   properties looks like, in order to order these in as optimal a way as possible.
-        remote_properties = [
-            PR_SENT_REPRESENTING_EMAIL_ADDRESS_W,
-            PR_SENT_REPRESENTING_SMTP_ADDRESS,
-            PR_MEETING_SENDER_SMTP_ADDRESS,
-            PR_SMTP_ADDRESS,
-            PR_SENDER_SMTP_ADDRESS,
-            PR_LAST_MODIFIER_NAME_W]
-        core_internal_item = self._internal_item
-        sender_sample = None
-        for remote_property in remote_properties:
-            try:
-                # try to get each property in our list
-                sender_sample = core_internal_item.PropertyAccessor.GetProperty(remote_property)
-            except Exception:
-                # if there is an error, supress it.
-                sender_sample = None
-            finally:
-                # if there was not an error, does its format meet our criteria for an 'acceptable' SMTP address?
-                if sender_sample is None or not sender_sample:
-                    pass
-                elif "@" not in sender_sample:
-                    pass
-                else:
-                    # if we have met all criteria (no error, contains an @ symbol) stop trying more properties
-                    break
-        return sender_sample
+        return SENDER_RESOLVER.resolve(self._sender_kind, self._read_properties, self._sender_ids())
     @property
     def sender(self) -> Optional[str]:
         if self._sender is not None:
@@ -143,7 +254,7 @@ class OutlookItem(object):
     @property
     def sentiment(self) -> Optional[Dict[str, float]]:
         try:
-            sentiment_object = self._internal_item.PropertyAccessor.GetProperty(EntityExtraction_Sentiment1_0)
+            sentiment_object = self._get_property(EntityExtraction_Sentiment1_0)
         except Exception:
             sentiment_object = None
         if sentiment_object is None:
@@ -154,19 +265,38 @@ class OutlookItem(object):
         return {"polarity":polarity,"confidence":confidence}
     @property
     def body(self) -> str:
-        return self._internal_item.Body
+        """the plain text body, kept in BODY_CACHE until the item changes"""
+        return read_body(self, "plain")
+    @property
+    def native_body_format(self) -> str:
+        """plain, html or rtf, whichever the body was written in"""
+        return native_format(self)
+    def get_body(self, format: Optional[str] = None) -> Union[str, bytes]:
+        """
+        The body as written, or converted by outlook when format ("plain", "html", "rtf") asks for another one.
+        RTF comes back as bytes.
+        """
+        return read_body(self, format)
+    def preview(self, n: int = PREVIEW_LENGTH) -> str:
+        """the first n characters of the plain text body, from a cached body or table preview when there is one, see outlookbody.preview"""
+        return preview(self, n)
     @property
     def subject(self) -> str:
         return self._internal_item.Subject
+    def _sender_email_type(self) -> str:
+        # SenderEmailType and PR_SENDER_ADDRTYPE_W are the same value, the latter can be prefetched
+        if self._prefetched.get(PR_SENDER_ADDRTYPE_W, _PROPERTY_MISSING) is not _PROPERTY_MISSING:
+            return self._prefetched[PR_SENDER_ADDRTYPE_W]
+        return self._internal_item.SenderEmailType
     @property
     def external(self) -> bool:
         # Sender Email Type 'EX' stands for 'EXchange' not 'external
         # i have only ever seen the SenderEmailType be either "EX" or "SMTP"
-        return self._internal_item.SenderEmailType != "EX"
+        return self._sender_email_type() != "EX"
     @property
     def internal(self) -> bool:
         # Sender Email Type 'EX' stands for 'EXchange' not 'external
-        return self._internal_item.SenderEmailType == "EX"
+        return self._sender_email_type() == "EX"
     @property
     def importance(self) -> Optional[OutlookItemImportance]:
         for item_importance in OutlookItemImportance:
@@ -201,6 +331,7 @@ class OutlookItem(object):
 
 class OutlookMailItem(OutlookItem):
     """https://docs.microsoft.com/en-us/dotnet/api/microsoft.office.interop.outlook.mailitem?view=outlook-pia"""
+    _sender_kind = "mail"
     @property
     def alternate_recipient_allowed(self) -> bool:
         return self._internal_item.AlternateRecipientAllowed
@@ -229,35 +360,41 @@ class OutlookReportItem(OutlookItem):
     usually a non-delivery report
     I can't find any special properties or members that seem to apply only to reports
     """
+    _sender_kind = "report"
     @property
     def received(self) -> datetime:
         return self._internal_item.CreationTime
     @property
-    def recipients(self):
-        return [self._internal_item.Session.CurrentUser.PropertyAccessor.GetProperty(PR_SMTP_ADDRESS)]
+    def recipients(self) -> List[OutlookContact]:
+        return [ADDRESS_CACHE.resolve(self._internal_item.Session.CurrentUser, self._store_id())]
     @property
     def external(self) -> bool:
-        return self._internal_item.PropertyAccessor.GetProperty(PR_SENDER_ADDRTYPE_W) == "SMTP"
+        return self._get_property(PR_SENDER_ADDRTYPE_W) == "SMTP"
     @property
     def internal(self) -> bool:
-        return self._internal_item.PropertyAccessor.GetProperty(PR_SENDER_ADDRTYPE_W) != "SMTP"
+        return self._get_property(PR_SENDER_ADDRTYPE_W) != "SMTP"
     @property
     def body_format(self) -> str:
-        body_format = self._internal_item.PropertyAccessor.GetProperty(PR_NATIVE_BODY_INFO)
+        body_format = self._get_property(PR_NATIVE_BODY_INFO)
         return OutlookItemBodyFormat(body_format).name
 
 
 class OutlookMeetingItem(OutlookItem):
     """https://docs.microsoft.com/en-us/dotnet/api/microsoft.office.interop.outlook.meetingitem?view=outlook-pia"""
+    _sender_kind = "meeting"
     MeetingResponse = Tuple[str, OutlookResponse]
     MeetingResponses = List[MeetingResponse]
+    def __init__(self, outlook_item):
+        super().__init__(outlook_item)
+        self._responses = None
     @property
     def responses(self) -> MeetingResponses:
         if self._responses is not None:
             return self._responses
         responses = []
+        store_id = self._store_id()
         for recipient in self._internal_item.Recipients:
-            responses.append(recipient.PropertyAccessor.GetProperty(PR_SMTP_ADDRESS), OutlookResponse(recipient.MeetingResponseStatus))
+            responses.append((ADDRESS_CACHE.resolve(recipient, store_id, OL_RECIPIENT).address, OutlookResponse(recipient.MeetingResponseStatus)))
         self._responses = responses
         return responses
 
@@ -415,8 +552,10 @@ def com_to_python(COMObject):
         If not, no wrapper has yet been written, so we attempt to fall back to the generic OutlookItem superclass.
         If even that does not work, the object is truly niche and I don't feel bad about not having gotten around to it yet.
     """
-    if COMObject.Class in CLASS_LOOKUP:
-        return CLASS_LOOKUP[COMObject.Class](COMObject)
+    # Class is a round trip, so it is only read once
+    item_class = COMObject.Class
+    if item_class in CLASS_LOOKUP:
+        return CLASS_LOOKUP[item_class](COMObject)
     else:
-        print(f"WARNING - Item Class {COMObject.Class} not a designated wrappable object.")
+        logger.warning("Item Class %s not a designated wrappable object.", item_class)
         return OutlookItem(COMObject)
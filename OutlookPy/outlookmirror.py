@@ -0,0 +1,247 @@
+"""A local SQLite copy of folders' item metadata and bodies, with full-text search."""
+from datetime import date, datetime
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Union, TYPE_CHECKING
+
+from .outlookbackend import com_error
+from .outlookbody import read_body
+from .outlookchanges import SQLiteTokenStore
+from .outlookhandlers import ChangeCoalescer, PeriodicTask
+from .outlookitem import OutlookItem
+
+if TYPE_CHECKING:
+    from .outlookfolder import OutlookFolder
+    from .outlookpy import OutlookPy
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    entry_id TEXT NOT NULL UNIQUE,
+    store_id TEXT,
+    folder_id TEXT NOT NULL,
+    subject TEXT,
+    sender TEXT,
+    received TEXT,
+    unread INTEGER,
+    importance INTEGER,
+    categories TEXT,
+    body TEXT
+);
+CREATE INDEX IF NOT EXISTS items_sender ON items (sender COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS items_received ON items (received);
+CREATE INDEX IF NOT EXISTS items_folder ON items (folder_id);
+CREATE TABLE IF NOT EXISTS item_categories (
+    category TEXT NOT NULL,
+    entry_id TEXT NOT NULL,
+    PRIMARY KEY (category, entry_id)
+);
+CREATE INDEX IF NOT EXISTS item_categories_entry ON item_categories (entry_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5 (subject, body, content='items', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN
+    INSERT INTO items_fts (rowid, subject, body) VALUES (new.id, new.subject, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN
+    INSERT INTO items_fts (items_fts, rowid, subject, body) VALUES ('delete', old.id, old.subject, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS items_fts_update AFTER UPDATE ON items BEGIN
+    INSERT INTO items_fts (items_fts, rowid, subject, body) VALUES ('delete', old.id, old.subject, old.body);
+    INSERT INTO items_fts (rowid, subject, body) VALUES (new.id, new.subject, new.body);
+END;
+"""
+
+_UPSERT = """
+INSERT INTO items (entry_id, store_id, folder_id, subject, sender, received, unread, importance, categories, body)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (entry_id) DO UPDATE SET
+    store_id = excluded.store_id, folder_id = excluded.folder_id, subject = excluded.subject, sender = excluded.sender,
+    received = excluded.received, unread = excluded.unread, importance = excluded.importance,
+    categories = excluded.categories, body = excluded.body
+"""
+
+_RESULT_COLUMNS = ("entry_id", "store_id", "folder_id", "subject", "sender", "received", "unread", "importance", "categories")
+
+
+def _timestamp(value: Union[date, datetime, None]) -> Optional[str]:
+    # naive local ISO strings sort the same way the dates do
+    if value is None:
+        return None
+    return value.isoformat(sep=" ")
+
+
+class MirrorResult(object):
+    """A row of the mirror. .item fetches the live item it was copied from."""
+    __slots__ = ("_mirror",) + _RESULT_COLUMNS
+    def __init__(self, mirror: "OutlookMirror", row: Iterable):
+        self._mirror = mirror
+        for column, value in zip(_RESULT_COLUMNS, row):
+            setattr(self, column, value)
+        self.received = datetime.fromisoformat(self.received) if self.received else None
+        self.categories = tuple(self.categories.split(", ")) if self.categories else ()
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.subject!r}, {self.entry_id})"
+    @property
+    def item(self) -> OutlookItem:
+        return self._mirror._outlook.item_from_id(self.entry_id, self.store_id)
+
+
+class OutlookMirror(object):
+    """
+    Keeps a SQLite copy of the items in a set of folders: metadata, bodies, an FTS5 index over subject and body,
+    and indexes on sender, received time and categories, so searching doesn't go to exchange at all.
+
+    sync() brings the copy up to date with a delta scan per folder (see OutlookFolder.changes_since),
+    the change tokens live in the same database. follow() additionally copies items as folder events arrive.
+    The SQLite connection belongs to the thread that made the mirror, use the mirror on that thread only.
+    """
+    def __init__(self, outlook: "OutlookPy", path: str, folders: Optional[Iterable[Union["OutlookFolder", str]]] = None):
+        self._outlook = outlook
+        if folders is None:
+            folders = [outlook.inbox]
+        # folders may be given as paths below the root folder, "Inbox/Projects"
+        self._folders = [outlook.root.find(folder) if isinstance(folder, str) else folder for folder in folders]
+        self._connection = sqlite3.connect(path)
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+        self._tokens = SQLiteTokenStore(self._connection)
+        self._thread = threading.get_ident()
+        self._followers = {} # folder to the ChangeCoalescer copying its items
+        self._schedule = None
+    def __repr__(self):
+        return f"{self.__class__.__name__}({[folder.name for folder in self._folders]})"
+    @property
+    def folders(self) -> List["OutlookFolder"]:
+        return list(self._folders)
+    def __len__(self):
+        return self._connection.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+    def _store(self, item: OutlookItem, folder_id: str):
+        snapshot = item.snapshot()
+        categories = snapshot.categories or ()
+        self._connection.execute(_UPSERT, (
+            snapshot.entry_id, snapshot.store_id, folder_id, snapshot.subject, snapshot.sender,
+            _timestamp(snapshot.received), snapshot.unread, snapshot.importance, ", ".join(categories),
+            read_body(item, "plain", cache=None)))
+        self._connection.execute("DELETE FROM item_categories WHERE entry_id = ?", (snapshot.entry_id,))
+        self._connection.executemany("INSERT INTO item_categories (category, entry_id) VALUES (?, ?)",
+                                     ((category, snapshot.entry_id) for category in categories))
+    def _remove(self, entry_ids: Iterable[str], folder_id: str):
+        # an item moved into another mirrored folder is that folder's row now, the old folder can't remove it
+        for entry_id in entry_ids:
+            if self._connection.execute("DELETE FROM items WHERE entry_id = ? AND folder_id = ?", (entry_id, folder_id)).rowcount:
+                self._connection.execute("DELETE FROM item_categories WHERE entry_id = ?", (entry_id,))
+    def store(self, item: OutlookItem, folder: "OutlookFolder"):
+        """copy a single item into the mirror right away"""
+        with self._connection:
+            self._store(item, folder.entry_id)
+    def sync(self) -> Dict[str, int]:
+        """
+        Bring every folder up to date with a delta scan, a full scan the first time.
+        Returns how many items were copied or removed per folder.
+        """
+        counts = {}
+        for folder in self._folders:
+            changes = folder.changes_since(self._tokens.load(folder.entry_id))
+            with self._connection:
+                copied = 0
+                for entry_id in changes.added + changes.modified:
+                    try:
+                        item = folder._item_from_id(entry_id)
+                    except com_error:
+                        # gone again since the scan, the next scan will report it removed
+                        continue
+                    self._store(item, folder.entry_id)
+                    copied += 1
+                self._remove(changes.removed, folder.entry_id)
+                # the token is saved in the same transaction as the items it covers
+                self._tokens.save(changes.token)
+            counts[folder.name] = copied + len(changes.removed)
+        return counts
+    def _copy(self, items: List, folder: "OutlookFolder"):
+        with self._connection:
+            for item in items:
+                if not isinstance(item, OutlookItem):
+                    # a snapshot from a pooled handler chain has no body, read the item again here
+                    try:
+                        item = folder._item_from_id(item.entry_id)
+                    except com_error:
+                        continue
+                self._store(item, folder.entry_id)
+    def follow(self, window: float = 1.0, sync_every: Optional[float] = None):
+        """
+        Copy items into the mirror as they arrive or change. Events still need to be hooked and pumped as usual
+        (OutlookPy.listen_for_events), on the thread that made the mirror.
+        Events are collected for window seconds and written by the pump in one transaction, also when the folder's
+        handlers run on a thread HandlerPool. Removals are only seen by sync(): sync_every runs it from the pump
+        that many seconds apart, without it sync() has to be called by hand.
+        Calling it again leaves folders that are already followed as they are and only replaces sync_every.
+        """
+        if threading.get_ident() != self._thread:
+            raise RuntimeError("follow() has to be called on the thread that made the mirror")
+        for folder in self._folders:
+            if folder in self._followers:
+                continue
+            pool = folder._handler_pool
+            if pool is not None and pool._kind == "process":
+                raise ValueError(f"'{folder.name}' runs its handlers in other processes, the mirror can't follow it")
+            copy = ChangeCoalescer(lambda items, folder=folder: self._copy(items, folder), window, thread=self._thread)
+            # first in line, so a handler that stops the chain can't keep the mirror from seeing the item
+            folder.on_item_received(first=True)(copy)
+            folder.on_item_changed(first=True)(copy)
+            self._followers[folder] = copy
+        if sync_every is not None:
+            if self._schedule is not None:
+                self._schedule.cancel()
+            self._schedule = PeriodicTask(self.sync, sync_every)
+    def flush(self):
+        """write the items follow() is still collecting now"""
+        for copy in self._followers.values():
+            copy.flush()
+    def search(self, text: Optional[str] = None, sender: Optional[str] = None, since: Optional[datetime] = None,
+               until: Optional[datetime] = None, category: Optional[str] = None, folder: Optional["OutlookFolder"] = None,
+               limit: Optional[int] = 100) -> List[MirrorResult]:
+        """
+        Search the mirror, every given criterion must match.
+        text is an FTS5 query over subject and body ("invoice AND overdue", "subject:report"), results are ranked by it,
+        otherwise results are newest first.
+        """
+        columns = ", ".join(f"items.{column}" for column in _RESULT_COLUMNS)
+        clauses = []
+        parameters = []
+        if text is not None:
+            query = f"SELECT {columns} FROM items_fts JOIN items ON items.id = items_fts.rowid"
+            clauses.append("items_fts MATCH ?")
+            parameters.append(text)
+            order = "items_fts.rank"
+        else:
+            query = f"SELECT {columns} FROM items"
+            order = "items.received DESC"
+        if sender is not None:
+            clauses.append("items.sender = ? COLLATE NOCASE")
+            parameters.append(sender)
+        if since is not None:
+            clauses.append("items.received >= ?")
+            parameters.append(_timestamp(since))
+        if until is not None:
+            clauses.append("items.received < ?")
+            parameters.append(_timestamp(until))
+        if category is not None:
+            clauses.append("items.entry_id IN (SELECT entry_id FROM item_categories WHERE category = ?)")
+            parameters.append(category)
+        if folder is not None:
+            clauses.append("items.folder_id = ?")
+            parameters.append(folder.entry_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += f" ORDER BY {order}"
+        if limit is not None:
+            query += " LIMIT ?"
+            parameters.append(limit)
+        return [MirrorResult(self, row) for row in self._connection.execute(query, parameters)]
+    def close(self):
+        if self._schedule is not None:
+            self._schedule.cancel()
+        self.flush()
+        for folder, copy in self._followers.items():
+            folder.remove_handler(copy)
+        self._followers = {}
+        self._connection.close()
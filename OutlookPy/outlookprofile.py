@@ -0,0 +1,320 @@
+"""Counting and timing the COM calls wrappers make, switched on per block with OutlookPy.profile()."""
+from collections import defaultdict
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# wrapper classes and the attributes on them that hold COM objects, see instrument()
+_INSTRUMENTED = []
+_ACTIVE = [] # running profilers, every call is recorded by all of them
+_ACTIVE_LOCK = threading.Lock()
+
+_THIS_FILE = os.path.abspath(__file__)
+_PACKAGE_DIRECTORY = os.path.dirname(_THIS_FILE)
+_SITE_DEPTH = 8 # how far up the stack a call site is looked for
+
+
+def instrument(cls: type, *attributes: str):
+    """
+    Register attributes of a wrapper class as holding COM objects.
+    While a profiler runs they are replaced on the class by descriptors handing out timing proxies,
+    the rest of the time the class is untouched and access costs exactly what it did.
+    """
+    _INSTRUMENTED.append((cls, attributes))
+
+
+def _unwrap(value):
+    return value._target if isinstance(value, _ComProxy) else value
+
+
+def _call_site() -> str:
+    """the nearest public function of this package up the stack, the wrapper property or method paying for the call"""
+    frame = sys._getframe(2)
+    nearest = None
+    for _ in range(_SITE_DEPTH):
+        if frame is None:
+            break
+        code = frame.f_code
+        filename = os.path.abspath(code.co_filename)
+        if os.path.dirname(filename) == _PACKAGE_DIRECTORY and filename != _THIS_FILE:
+            name = getattr(code, "co_qualname", code.co_name)
+            if nearest is None:
+                nearest = name
+            if not code.co_name.startswith("_"):
+                return name
+        frame = frame.f_back
+    return nearest or "<outside outlookpy>"
+
+
+def _record(site: str, member: str, started: int, finished: int):
+    for profiler in _ACTIVE:
+        profiler._record(site, member, started, finished)
+
+
+class _ComProxy(object):
+    """Stands in for a COM object while profiling, timing member reads, writes and calls made through it."""
+    __slots__ = ("_target", "_path")
+    def __init__(self, target, path: str):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_path", path)
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._target!r})"
+    def _member(self, name: str) -> str:
+        return f"{self._path}.{name}" if self._path else name
+    def _wrap(self, value, member: str):
+        # COM objects coming back are proxied too, so chains like PropertyAccessor.GetProperties are timed
+        if hasattr(value, "_oleobj_") and not isinstance(value, _ComProxy):
+            return _ComProxy(value, member)
+        return value
+    def __getattr__(self, name: str):
+        target = self._target
+        if name.startswith("_") or not _ACTIVE:
+            # pywin32 plumbing (_oleobj_...) and leftover proxies after profiling has stopped go straight through
+            return getattr(target, name)
+        member = self._member(name)
+        started = time.perf_counter_ns()
+        value = getattr(target, name)
+        finished = time.perf_counter_ns()
+        if callable(value) and not hasattr(value, "_oleobj_"):
+            return _ComMethod(self, value, member)
+        _record(_call_site(), member, started, finished)
+        return self._wrap(value, member)
+    def __setattr__(self, name: str, value):
+        if not _ACTIVE:
+            setattr(self._target, name, _unwrap(value))
+            return
+        started = time.perf_counter_ns()
+        setattr(self._target, name, _unwrap(value))
+        _record(_call_site(), self._member(name) + " =", started, time.perf_counter_ns())
+    def __getitem__(self, key):
+        started = time.perf_counter_ns()
+        value = self._target[_unwrap(key)]
+        _record(_call_site(), self._member("[]"), started, time.perf_counter_ns())
+        return self._wrap(value, self._member("[]"))
+    def __iter__(self):
+        iterator = iter(self._target)
+        member = self._member("next")
+        while True:
+            started = time.perf_counter_ns()
+            try:
+                value = next(iterator)
+            except StopIteration:
+                return
+            _record(_call_site(), member, started, time.perf_counter_ns())
+            # proxied like members, so what is read off them before a wrapper takes over (Class...) is timed too
+            yield self._wrap(value, self._path)
+    def __len__(self):
+        return len(self._target)
+    def __bool__(self):
+        return True
+    def __eq__(self, other):
+        return self._target == _unwrap(other)
+    def __hash__(self):
+        return hash(self._target)
+
+
+class _ComMethod(object):
+    """a bound COM method of a proxy, the call is what gets timed"""
+    __slots__ = ("_proxy", "_method", "_member")
+    def __init__(self, proxy: _ComProxy, method, member: str):
+        self._proxy = proxy
+        self._method = method
+        self._member = member
+    def __call__(self, *args, **kwargs):
+        # COM can't marshal our proxies, the objects they stand in for are passed instead
+        args = tuple(_unwrap(arg) for arg in args)
+        kwargs = {key: _unwrap(value) for key, value in kwargs.items()}
+        started = time.perf_counter_ns()
+        value = self._method(*args, **kwargs)
+        _record(_call_site(), self._member + "()", started, time.perf_counter_ns())
+        return self._proxy._wrap(value, self._member + "()")
+
+
+class _Instrumented(object):
+    """
+    Data descriptor installed over a wrapper attribute while profiling.
+    Values stay in the instance __dict__ as the plain COM objects, reads get a proxy.
+    """
+    def __init__(self, name: str):
+        self._name = name
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            value = instance.__dict__[self._name]
+        except KeyError:
+            raise AttributeError(self._name)
+        if not hasattr(value, "_oleobj_") or isinstance(value, _ComProxy):
+            return value
+        return _ComProxy(value, "")
+    def __set__(self, instance, value):
+        instance.__dict__[self._name] = _unwrap(value)
+
+
+def _install():
+    for cls, attributes in _INSTRUMENTED:
+        for name in attributes:
+            setattr(cls, name, _Instrumented(name))
+
+
+def _uninstall():
+    for cls, attributes in _INSTRUMENTED:
+        for name in attributes:
+            if isinstance(cls.__dict__.get(name), _Instrumented):
+                delattr(cls, name)
+
+
+class CallStatistics(object):
+    """count, total, extremes and a log2 histogram of the durations of one kind of call, in microseconds"""
+    __slots__ = ("count", "total", "minimum", "maximum", "buckets")
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = 0.0
+        self.buckets = defaultdict(int) # upper bound in microseconds to count
+    def __repr__(self):
+        return f"{self.__class__.__name__}(count={self.count}, mean={self.mean:.1f}us, max={self.maximum:.1f}us)"
+    def add(self, microseconds: float):
+        self.count += 1
+        self.total += microseconds
+        self.maximum = max(self.maximum, microseconds)
+        self.minimum = microseconds if self.minimum is None else min(self.minimum, microseconds)
+        self.buckets[1 << int(microseconds).bit_length()] += 1
+    def merge(self, other: "CallStatistics"):
+        self.count += other.count
+        self.total += other.total
+        self.maximum = max(self.maximum, other.maximum)
+        if other.minimum is not None:
+            self.minimum = other.minimum if self.minimum is None else min(self.minimum, other.minimum)
+        for bound, count in other.buckets.items():
+            self.buckets[bound] += count
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+    def histogram(self) -> List[Tuple[int, int]]:
+        """(upper bound in microseconds, count) pairs, smallest bound first"""
+        return sorted(self.buckets.items())
+    def as_dict(self) -> dict:
+        return {"count": self.count, "total_us": round(self.total, 1), "mean_us": round(self.mean, 1),
+                "min_us": round(self.minimum or 0.0, 1), "max_us": round(self.maximum, 1),
+                "histogram_us": {f"<{bound}": count for bound, count in self.histogram()}}
+
+
+class ComProfiler(object):
+    """
+    Records every COM call OutlookItem, OutlookFolder and OutlookPy make while it runs,
+    keyed by call site (the wrapper property or method that made the call) and COM member ("PropertyAccessor.GetProperties()").
+
+        with outlook.profile() as profiler:
+            for mail in outlook.inbox.head(50):
+                mail.sender
+        print(profiler.report())
+
+    With trace=True every call is also kept as a trace event, up to max_events, for export_trace.
+    """
+    def __init__(self, trace: bool = True, max_events: int = 100000):
+        self._trace = trace
+        self._max_events = max_events
+        self._calls = defaultdict(CallStatistics) # (site, member) to statistics
+        self._events = []
+        self._lock = threading.Lock()
+        self._started = None
+        self.elapsed = 0.0
+        self.dropped_events = 0
+    def __repr__(self):
+        return f"{self.__class__.__name__}(calls={self.count}, sites={len(self._calls)})"
+    def __enter__(self) -> "ComProfiler":
+        self.start()
+        return self
+    def __exit__(self, *exc_info):
+        self.stop()
+    @property
+    def running(self) -> bool:
+        return self in _ACTIVE
+    def start(self):
+        with _ACTIVE_LOCK:
+            if self in _ACTIVE:
+                return
+            if not _ACTIVE:
+                _install()
+            _ACTIVE.append(self)
+        self._started = time.perf_counter_ns()
+    def stop(self):
+        with _ACTIVE_LOCK:
+            if self not in _ACTIVE:
+                return
+            _ACTIVE.remove(self)
+            if not _ACTIVE:
+                _uninstall()
+        self.elapsed += (time.perf_counter_ns() - self._started) / 1e9
+    def _record(self, site: str, member: str, started: int, finished: int):
+        microseconds = (finished - started) / 1000
+        with self._lock:
+            self._calls[(site, member)].add(microseconds)
+            if self._trace:
+                if len(self._events) < self._max_events:
+                    self._events.append((site, member, started, finished, threading.get_ident()))
+                else:
+                    self.dropped_events += 1
+    @property
+    def count(self) -> int:
+        return sum(statistics.count for statistics in self._calls.values())
+    @property
+    def calls(self) -> Dict[Tuple[str, str], CallStatistics]:
+        """statistics per (call site, COM member)"""
+        with self._lock:
+            return dict(self._calls)
+    def _grouped(self, position: int) -> Dict[str, CallStatistics]:
+        grouped = defaultdict(CallStatistics)
+        for key, statistics in self.calls.items():
+            grouped[key[position]].merge(statistics)
+        return dict(grouped)
+    def by_site(self) -> Dict[str, CallStatistics]:
+        """statistics per wrapper property or method, whichever COM members it used"""
+        return self._grouped(0)
+    def by_member(self) -> Dict[str, CallStatistics]:
+        """statistics per COM member, whichever wrapper used it"""
+        return self._grouped(1)
+    def report(self, top: int = 20) -> str:
+        """the call sites and members that took the most time, as a table"""
+        rows = sorted(self.calls.items(), key=lambda pair: pair[1].total, reverse=True)[:top]
+        lines = [f"{'call site':<40} {'COM member':<40} {'count':>8} {'total ms':>10} {'mean us':>9} {'max us':>9}"]
+        for (site, member), statistics in rows:
+            lines.append(f"{site[:40]:<40} {member[:40]:<40} {statistics.count:>8} {statistics.total / 1000:>10.1f}"
+                         f" {statistics.mean:>9.1f} {statistics.maximum:>9.1f}")
+        return "\n".join(lines)
+    def to_dict(self) -> dict:
+        return {"elapsed_s": round(self.elapsed, 3), "calls": self.count, "dropped_events": self.dropped_events,
+                "by_call": [dict(site=site, member=member, **statistics.as_dict()) for (site, member), statistics in self.calls.items()],
+                "by_site": {site: statistics.as_dict() for site, statistics in self.by_site().items()},
+                "by_member": {member: statistics.as_dict() for member, statistics in self.by_member().items()}}
+    def to_json(self, path: Optional[str] = None) -> str:
+        """the statistics as JSON, written to path as well when given"""
+        text = json.dumps(self.to_dict(), indent=2)
+        if path is not None:
+            with open(path, "w", encoding="utf-8") as json_file:
+                json_file.write(text)
+        return text
+    def export_trace(self, path: str):
+        """
+        Every recorded call in the Chrome trace event format, which chrome://tracing, Perfetto and speedscope open.
+        Calls are laid out per thread under their call site.
+        """
+        with self._lock:
+            events = list(self._events)
+        origin = events[0][2] if events else 0
+        trace = [{"name": member, "cat": site, "ph": "X", "pid": os.getpid(), "tid": thread,
+                  "ts": (started - origin) / 1000, "dur": (finished - started) / 1000, "args": {"site": site}}
+                 for site, member, started, finished, thread in events]
+        with open(path, "w", encoding="utf-8") as trace_file:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, trace_file)
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+            self._events.clear()
+            self.dropped_events = 0
+        self.elapsed = 0.0
@@ -1,29 +1,89 @@
 """
 Class definition for OutlookPy
 """
-import ctypes
-import pythoncom
-import win32com.client
-from win32com.client import constants, DispatchBaseClass
-from outlookpy.outlookfolder import OutlookFolder
-from outlookpy.constants import PR_SMTP_ADDRESS
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+from .outlookbackend import get_backend, use_backend
+from .outlookfolder import OutlookFolder
+from .outlookitem import OutlookItem, com_to_python
+from .outlookcontact import AddressCache, ADDRESS_CACHE
+from .outlookmirror import OutlookMirror
+from .outlookasync import EventBridge
+from .outlooksubscription import OutlookSubscription
+from .outlooksession import OutlookSessionPool, DEFAULT_MAX_CONCURRENT
+from .outlookscan import OutlookScan, DEFAULT_UNIT_SIZE
+from .outlookhandlers import flush_due_coalescers
+from .outlookprofile import ComProfiler, instrument
+from .constants import PR_SMTP_ADDRESS
+
+logger = logging.getLogger(__name__)
 
 
 class OutlookPy():
     """
     The master object for interacting with outlook.
     """
-    def __init__(self):
-        print("attaching to application")
-        generate_cache = win32com.client.gencache.EnsureDispatch("Outlook.Application")
-        self._outlook_application = win32com.client.DispatchEx("Outlook.Application")
-        self._mapi_namespace = self._outlook_application.GetNamespace("MAPI")
-        self._outlook_session = self._outlook_application.Session
-        self._my_smtp_address = self.__get_property(self._outlook_session, PR_SMTP_ADDRESS)
-        self._root_folder = OutlookFolder(self._outlook_session.Folders[self._my_smtp_address])
-        print("application attached")
+    def __init__(self, backend=None):
+        """
+        backend is where COM comes from, pywin32 unless given, see outlookbackend.
+        Attaching only gets the application and the MAPI namespace, the root folder and
+        the user's SMTP address are looked up the first time something needs them.
+        """
+        if backend is not None:
+            use_backend(backend)
+        self._startup_timings = {}
+        self._root = None
+        self._my_smtp_address = None
+        logger.debug("attaching to application")
+        started = time.perf_counter()
+        self._outlook_application = get_backend().attach(self._startup_timings)
+        self._mapi_namespace = self._timed("namespace", lambda: self._outlook_application.GetNamespace("MAPI"))
+        self._outlook_session = self._mapi_namespace
+        self._startup_timings["total"] = time.perf_counter() - started
+        logger.info("application attached in %.3fs (%s)", self._startup_timings["total"], self._format_timings())
+    def _timed(self, name: str, step: Callable):
+        started = time.perf_counter()
+        try:
+            return step()
+        finally:
+            self._startup_timings[name] = time.perf_counter() - started
+    def _format_timings(self) -> str:
+        return ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self._startup_timings.items() if name != "total")
+    @property
+    def startup_timings(self) -> Dict[str, float]:
+        """
+        Seconds spent in each startup step: wrappers (generating makepy wrappers, only when there are none yet),
+        attach, namespace, total, then root and identity once the lazy lookups have happened.
+        """
+        return dict(self._startup_timings)
+    @property
+    def smtp_address(self) -> str:
+        """the SMTP address of the signed in user, read on first use"""
+        if self._my_smtp_address is None:
+            self._my_smtp_address = self._timed("identity", lambda: self.__get_property(self._outlook_session, PR_SMTP_ADDRESS))
+        return self._my_smtp_address
+    @property
+    def _root_folder(self) -> OutlookFolder:
+        # the default store's root is the mailbox root without needing to know whose mailbox it is
+        if self._root is None:
+            self._root = self._timed("root", lambda: OutlookFolder(self._mapi_namespace.DefaultStore.GetRootFolder()))
+        return self._root
     def __get_property(self, session, property_string):
         return session.CurrentUser.PropertyAccessor.GetProperty(property_string)
+    def item_from_id(self, entry_id: str, store_id: Optional[str] = None) -> OutlookItem:
+        """the wrapped item with this EntryID, the StoreID makes the lookup faster and is needed outside the default store"""
+        if store_id:
+            return com_to_python(self._mapi_namespace.GetItemFromID(entry_id, store_id))
+        return com_to_python(self._mapi_namespace.GetItemFromID(entry_id))
+    def mirror(self, path: str, folders: Optional[Iterable[Union[OutlookFolder, str]]] = None) -> OutlookMirror:
+        """a local SQLite copy of folders for offline search, see OutlookMirror"""
+        return OutlookMirror(self, path, folders)
+    @property
+    def address_cache(self) -> AddressCache:
+        """recipients of every item are resolved through this one cache"""
+        return ADDRESS_CACHE
     @property
     def root_folder(self):
         return self._root_folder
@@ -54,9 +114,56 @@ class OutlookPy():
     @property
     def calendar(self):
         return self._root_folder.folders["Calendar"]
+    def event_bridge(self, maxsize: int = 0) -> EventBridge:
+        """
+        An asyncio friendly alternative to listen_for_events, see EventBridge.
+        Must be made from inside the running event loop.
+        """
+        return EventBridge(asyncio.get_running_loop(), maxsize)
+    def subscribe(self, folder: Optional[OutlookFolder] = None, recursive: bool = True,
+                  kinds: Iterable[str] = ("add", "change")) -> OutlookSubscription:
+        """one set of handlers for a folder and every folder below it, the whole mailbox by default"""
+        return OutlookSubscription(self._root_folder if folder is None else folder, recursive, kinds)
+    def session_pool(self, workers: int = 4, max_concurrent: int = DEFAULT_MAX_CONCURRENT) -> OutlookSessionPool:
+        """worker threads with their own COM apartments, for using outlook from more than this thread, see OutlookSessionPool"""
+        return OutlookSessionPool(self, workers, max_concurrent)
+    def scan(self, folders: Optional[Iterable[OutlookFolder]] = None, function: Callable[[OutlookItem], Any] = None,
+             processes: int = 4, recursive: bool = True, ordered: bool = True, unit_size: int = DEFAULT_UNIT_SIZE,
+             checkpoint: Optional[str] = None, backend_factory: Optional[Callable[[], Any]] = None) -> OutlookScan:
+        """
+        function on every item of folders and the folders below them, from worker processes, see OutlookScan.
+        The whole mailbox by default, iterate the result to run it.
+        """
+        if function is None:
+            raise TypeError("scan needs a function to run on each item")
+        if folders is None:
+            folders = [self._root_folder]
+        elif isinstance(folders, OutlookFolder):
+            folders = [folders]
+        return OutlookScan(self, folders, function, processes, recursive, ordered, unit_size, checkpoint, backend_factory)
+    def profile(self, trace: bool = True, max_events: int = 100000) -> ComProfiler:
+        """
+        Count and time every COM call the wrappers make inside a with block, see ComProfiler.
+        Nothing is instrumented outside of one.
+        """
+        return ComProfiler(trace, max_events)
     def listen_for_events(self):
         # pumping messages will cause this python thread's event loop
         #  to listen to messages sent to outlook
         #  this is a blocking operation, so we won't have control over this
         #  python thread unless an error triggers PostQuitMessage (WM_QUIT)
-        pythoncom.PumpMessages()
\ No newline at end of file
+        # between messages we wake up to deliver coalesced changes whose window has closed
+        backend = get_backend()
+        while True:
+            next_due = flush_due_coalescers()
+            # with no handles to wait on, 0 means messages are waiting
+            if backend.wait([], next_due) == 0:
+                # pump is true when it saw WM_QUIT
+                if backend.pump():
+                    break
+
+
+# the attributes holding COM objects, swapped for timing proxies while a ComProfiler runs
+instrument(OutlookPy, "_outlook_application", "_mapi_namespace", "_outlook_session")
+instrument(OutlookFolder, "_folder", "_items") # _MAPI_items is a property reading _items
+instrument(OutlookItem, "_internal_item")
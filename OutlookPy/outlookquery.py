@@ -0,0 +1,268 @@
+"""Server-side item selection, compiled to DASL for Items.Restrict and Folder.GetTable."""
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Iterable, Iterator, List, Optional, Tuple, TYPE_CHECKING
+
+from .constants import PR_SENDER_SMTP_ADDRESS, PR_MESSAGE_CLASS_W, PR_MESSAGE_SIZE
+from .outlookenumerations import OutlookItemImportance
+from .outlookitem import OutlookItem, com_to_python
+from .outlooksnapshot import OutlookItemSnapshot
+from .outlookbody import PREVIEW_LENGTH, previews
+
+if TYPE_CHECKING:
+    from .outlookfolder import OutlookFolder
+    from .outlooktable import OutlookTable
+
+
+class QueryField(object):
+    """A queryable item property, its DASL schema name, its name for sorting, and what kind of value it holds."""
+    __slots__ = ("name", "schema", "sort_name", "kind")
+    def __init__(self, name: str, schema: str, sort_name: Optional[str], kind: str):
+        self.name = name
+        self.schema = schema
+        self.sort_name = sort_name
+        self.kind = kind
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.name}, {self.schema})"
+
+# https://docs.microsoft.com/en-us/office/client-developer/outlook/mapi/filtering-items-using-query-keywords
+# sort names are the bracketed built-in property names that Items.Sort and Table.Sort accept
+FIELDS = {field.name: field for field in [
+    QueryField("subject", "urn:schemas:httpmail:subject", "[Subject]", "text"),
+    QueryField("body", "urn:schemas:httpmail:textdescription", None, "text"),
+    QueryField("sender", PR_SENDER_SMTP_ADDRESS, "[SenderEmailAddress]", "address"),
+    QueryField("sender_name", "urn:schemas:httpmail:fromname", "[SenderName]", "text"),
+    QueryField("received", "urn:schemas:httpmail:datereceived", "[ReceivedTime]", "date"),
+    QueryField("created", "DAV:creationdate", "[CreationTime]", "date"),
+    QueryField("modified", "DAV:getlastmodified", "[LastModificationTime]", "date"),
+    QueryField("read", "urn:schemas:httpmail:read", "[UnRead]", "bool"),
+    QueryField("unread", "urn:schemas:httpmail:read", "[UnRead]", "inverted_bool"),
+    QueryField("importance", "urn:schemas:httpmail:importance", "[Importance]", "importance"),
+    QueryField("categories", "urn:schemas-microsoft-com:office:office#Keywords", "[Categories]", "keywords"),
+    QueryField("message_class", PR_MESSAGE_CLASS_W, "[MessageClass]", "text"),
+    QueryField("size", PR_MESSAGE_SIZE, "[Size]", "number"),
+    QueryField("has_attachments", "urn:schemas:httpmail:hasattachment", None, "bool"),
+]}
+
+COMPARISONS = {"exact": "=", "ne": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+PATTERNS = {"contains": "%{}%", "startswith": "{}%", "endswith": "%{}"}
+
+
+def _quote(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+def _minute(value: Any) -> datetime:
+    """the UTC minute a date falls in, naive datetimes are taken to be local time like the ones Outlook hands back"""
+    if isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if not isinstance(value, datetime):
+        raise TypeError(f"expected a date or datetime, got {type(value).__name__}")
+    return value.astimezone(timezone.utc).replace(second=0, microsecond=0)
+
+def _format_date(value: Any) -> str:
+    """DASL compares dates in UTC and to the minute, seconds are dropped"""
+    return _quote(_minute(value).strftime("%m/%d/%Y %I:%M %p"))
+
+def _compile_date(schema: str, operator: str, value: Any) -> str:
+    """
+    Date comparisons to the minute: any time in the same minute as value counts as equal to it,
+    so received__gt=10:30:45 starts at 10:31 and received__lte=10:30:45 takes in all of 10:30.
+    Only >= and < against whole minutes are sent, those mean the same whatever outlook does with seconds.
+    """
+    start = _minute(value)
+    start, end = _format_date(start), _format_date(start + timedelta(minutes=1))
+    if operator == "exact":
+        return f"({schema} >= {start} AND {schema} < {end})"
+    if operator == "ne":
+        return f"({schema} < {start} OR {schema} >= {end})"
+    if operator in ("gt", "gte"):
+        return f"{schema} >= {end if operator == 'gt' else start}"
+    return f"{schema} < {end if operator == 'lte' else start}"
+
+def _format_value(field: QueryField, value: Any) -> str:
+    if field.kind == "date":
+        return _format_date(value)
+    if field.kind in ("bool", "inverted_bool"):
+        return "1" if bool(value) else "0"
+    if field.kind == "importance":
+        if isinstance(value, OutlookItemImportance):
+            value = value.value
+        return str(int(value))
+    if field.kind == "number":
+        return str(int(value))
+    return _quote(value)
+
+def compile_lookup(lookup: str, value: Any) -> str:
+    """
+    Compile a single django-style lookup (received__gte=dt) to a DASL condition, without the @SQL= prefix.
+    """
+    name, _, operator = lookup.partition("__")
+    operator = operator or "exact"
+    if name not in FIELDS:
+        raise ValueError(f"'{name}' is not a queryable field, expected one of {sorted(FIELDS)}")
+    field = FIELDS[name]
+    schema = f'"{field.schema}"'
+    if operator == "in":
+        values = list(value)
+        if not values:
+            raise ValueError(f"'{lookup}' needs at least one value")
+        return "(" + " OR ".join(compile_lookup(name, each) for each in values) + ")"
+    if field.kind == "inverted_bool":
+        # unread=True is stored as read = 0
+        if operator not in ("exact", "ne"):
+            raise ValueError(f"'{lookup}' only supports exact and ne comparisons")
+        if value is None:
+            raise ValueError(f"'{lookup}' needs True or False, an item is always either read or unread")
+        value = not value
+    if operator == "domain":
+        if field.kind != "address":
+            raise ValueError(f"'{lookup}' - domain lookups only apply to address fields")
+        return f"{schema} LIKE {_quote('%@' + str(value).lstrip('@'))}"
+    if operator == "contains" and field.kind == "keywords":
+        # equality against a multi-valued property matches if any one value is equal
+        return f"{schema} = {_quote(value)}"
+    if operator in PATTERNS:
+        if field.kind not in ("text", "address", "keywords"):
+            raise ValueError(f"'{lookup}' - pattern lookups only apply to text fields")
+        return f"{schema} LIKE {_quote(PATTERNS[operator].format(value))}"
+    if operator in COMPARISONS:
+        if value is None:
+            null_check = "IS NULL" if operator == "exact" else "IS NOT NULL"
+            return f"{schema} {null_check}"
+        if field.kind == "date":
+            return _compile_date(schema, operator, value)
+        return f"{schema} {COMPARISONS[operator]} {_format_value(field, value)}"
+    raise ValueError(f"'{operator}' is not a supported lookup")
+
+def compile_sort(by: str, reverse: bool = False) -> Tuple[str, bool]:
+    """the (property, descending) pair for Items.Sort or Table.Sort"""
+    if by not in FIELDS:
+        raise ValueError(f"'{by}' is not a queryable field, expected one of {sorted(FIELDS)}")
+    field = FIELDS[by]
+    if field.sort_name is None:
+        raise ValueError(f"'{by}' cannot be sorted on")
+    if field.kind == "bool":
+        # read is stored as UnRead, so read ascending is UnRead descending
+        reverse = not reverse
+    return field.sort_name, bool(reverse)
+
+
+class OutlookQuery(object):
+    """
+    A lazy, composable selection of a folder's items.
+    Nothing is sent to Outlook until the query is iterated, counted or read as a table,
+    and then only the items matching the restriction are wrapped.
+
+    Queries combine with .where() and &, | and ~ between queries on the same folder,
+    a combined query keeps the order of the left one.
+    Dates compare to the minute, see _compile_date.
+    """
+    def __init__(self, folder: "OutlookFolder", condition: Optional[str] = None, sort: Optional[Tuple[str, bool]] = None):
+        self._folder = folder
+        self._condition = condition
+        self._sort = sort
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._folder.name}, {self.filter})"
+    def _combine(self, other: "OutlookQuery", joiner: str) -> "OutlookQuery":
+        if other._folder != self._folder:
+            raise ValueError("only queries on the same folder can be combined")
+        if self._condition is None or other._condition is None:
+            # an empty query selects everything
+            if joiner == "OR":
+                return OutlookQuery(self._folder, sort=self._sort)
+            return OutlookQuery(self._folder, self._condition or other._condition, self._sort)
+        return OutlookQuery(self._folder, f"({self._condition}) {joiner} ({other._condition})", self._sort)
+    def __and__(self, other: "OutlookQuery") -> "OutlookQuery":
+        return self._combine(other, "AND")
+    def __or__(self, other: "OutlookQuery") -> "OutlookQuery":
+        return self._combine(other, "OR")
+    def __invert__(self) -> "OutlookQuery":
+        if self._condition is None:
+            raise ValueError("an empty query selects everything and cannot be negated")
+        return OutlookQuery(self._folder, f"NOT ({self._condition})", self._sort)
+    def where(self, **lookups) -> "OutlookQuery":
+        """narrow this query, every lookup must match"""
+        conditions = [compile_lookup(lookup, value) for lookup, value in lookups.items()]
+        if self._condition is not None:
+            conditions.insert(0, f"({self._condition})")
+        if not conditions:
+            return self
+        return OutlookQuery(self._folder, " AND ".join(conditions), self._sort)
+    def sorted(self, by: str = "received", reverse: bool = False) -> "OutlookQuery":
+        """the same selection, ordered by outlook with Items.Sort"""
+        return OutlookQuery(self._folder, self._condition, compile_sort(by, reverse))
+    def head(self, n: int) -> List[OutlookItem]:
+        """the first n items, only n items are ever fetched and wrapped"""
+        if n < 0:
+            raise ValueError("n must not be negative")
+        return list(self._stream(n))
+    def top(self, n: int, by: str = "received") -> List[OutlookItem]:
+        """the n items with the greatest value of by, newest first for dates"""
+        return self.sorted(by, reverse=True).head(n)
+    @property
+    def filter(self) -> Optional[str]:
+        """the DASL string handed to Items.Restrict, None when the query selects everything"""
+        if self._condition is None:
+            return None
+        return "@SQL=" + self._condition
+    def _items(self):
+        # a fresh Items collection every time, so we never restrict the one events are attached to
+        items = self._folder._folder.Items
+        if self._condition is not None:
+            items = items.Restrict(self.filter)
+        if self._sort is not None:
+            items.Sort(*self._sort)
+        return items
+    def _stream(self, limit: Optional[int] = None, prefetch: Optional[Iterable[str]] = None) -> Iterator[OutlookItem]:
+        # GetFirst/GetNext walks the collection in its sorted order and lets us stop early
+        if limit == 0:
+            return
+        prefetch = list(prefetch) if prefetch else None
+        items = self._items()
+        item = items.GetFirst()
+        count = 0
+        while item is not None:
+            wrapped = com_to_python(item)
+            if prefetch:
+                wrapped.prefetch(prefetch)
+            yield wrapped
+            count += 1
+            if limit is not None and count >= limit:
+                return
+            item = items.GetNext()
+    def __iter__(self) -> Iterator[OutlookItem]:
+        return self._stream()
+    def iter(self, prefetch: Optional[Iterable[str]] = None) -> Iterator[OutlookItem]:
+        """the matching items, each with the given schema properties read in a single call, see OutlookItem.prefetch"""
+        return self._stream(prefetch=prefetch)
+    def snapshots(self, fields: Optional[Iterable[str]] = None) -> Iterator[OutlookItemSnapshot]:
+        """
+        Detached snapshots of the matching items, see OutlookItem.snapshot.
+        Each live item is let go of as soon as its snapshot is taken.
+        """
+        fields = None if fields is None else tuple(fields)
+        for item in self._stream():
+            yield item.snapshot(fields)
+    def __len__(self) -> int:
+        return self._items().Count
+    def count(self) -> int:
+        return len(self)
+    def exists(self) -> bool:
+        return self._items().GetFirst() is not None
+    def first(self) -> Optional[OutlookItem]:
+        item = self._items().GetFirst()
+        if item is None:
+            return None
+        return com_to_python(item)
+    def previews(self, n: int = PREVIEW_LENGTH) -> Iterator[Tuple[str, str]]:
+        """(EntryID, start of the plain body) of the matching items from one table read, see outlookbody.previews"""
+        return previews(self.table(["modified", "preview"]), n)
+    def table(self, columns: List[str], **kwargs) -> "OutlookTable":
+        """the matching items as an OutlookTable, the restriction is applied by the table itself"""
+        kwargs.setdefault("sort", self._sort)
+        return self._folder.table(columns, where=self.filter, **kwargs)
+    def entry_ids(self) -> List[str]:
+        """
+        EntryIDs of the matching items, read in bulk.
+        Safe to act on afterwards even if acting changes whether an item still matches.
+        """
+        return self.table([]).entry_ids()
@@ -0,0 +1,230 @@
+"""Declarative routing rules, compiled into indexes so each item only meets the rules that could match it."""
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Pattern, Set, Union
+
+from .outlookenumerations import OutlookItemImportance
+from .outlookitem import SENDER_ENTRY_IDS, SENDER_PROPERTIES
+
+# the criteria a rule can have, most selective first, a rule is indexed under the first one it has
+CRITERIA = ("sender", "recipient", "sender_domain", "category", "subject", "importance")
+
+# what a rule set reading senders prefetches, one PropertyAccessor call per item
+RULE_PROPERTIES = SENDER_ENTRY_IDS + SENDER_PROPERTIES
+
+# inline flags for a whole pattern, "(?i)", only allowed at the start so such patterns can't be joined with others
+_GLOBAL_FLAGS = re.compile(r"\(\?[aiLmsux]+\)")
+
+
+def _values(value) -> Optional[frozenset]:
+    """a criterion is one value or any of several, addresses and names compare case-insensitively"""
+    if value is None:
+        return None
+    if isinstance(value, (str, int, OutlookItemImportance)):
+        value = (value,)
+    normalized = set()
+    for single in value:
+        if isinstance(single, OutlookItemImportance):
+            single = single.value
+        elif isinstance(single, str):
+            single = single.lower()
+        normalized.add(single)
+    return frozenset(normalized)
+
+
+class _Facts(object):
+    """
+    What the rules know about one item, each read from outlook at most once and only when a rule asks.
+    Works on OutlookItem wrappers and on OutlookItemSnapshot records, snapshots have no recipients.
+    """
+    def __init__(self, item, prefetch: bool):
+        self.item = item
+        self._read = {}
+        if prefetch and hasattr(item, "prefetch"):
+            item.prefetch(RULE_PROPERTIES)
+    def _get(self, name: str, reader: Callable):
+        if name not in self._read:
+            self._read[name] = reader(self.item)
+        return self._read[name]
+    @property
+    def sender(self) -> Optional[str]:
+        return self._get("sender", lambda item: (item.sender or "").lower() or None)
+    @property
+    def sender_domain(self) -> Optional[str]:
+        sender = self.sender
+        if sender is None or "@" not in sender:
+            return None
+        return sender.rsplit("@", 1)[1]
+    @property
+    def subject(self) -> str:
+        return self._get("subject", lambda item: item.subject or "")
+    @property
+    def categories(self) -> Set[str]:
+        return self._get("categories", lambda item: {category.lower() for category in item.categories or ()})
+    @property
+    def importance(self) -> Optional[int]:
+        def read(item):
+            importance = item.importance
+            return importance.value if isinstance(importance, OutlookItemImportance) else importance
+        return self._get("importance", read)
+    @property
+    def recipients(self) -> Set[str]:
+        def read(item):
+            contacts = getattr(item, "recipients", None) or ()
+            return {contact.address.lower() for contact in contacts if contact.address}
+        return self._get("recipients", read)
+
+
+class Rule(object):
+    """
+    An action and the criteria an item must meet for it to run. Every given criterion must match,
+    each can be one value or a collection of values any of which matches.
+    subject is a regular expression searched for in the subject, everything else compares case-insensitively.
+    As with folder handlers, a falsey result from the action stops the rules after it.
+    """
+    def __init__(self, action: Callable[[Any], Any], sender=None, sender_domain=None,
+                 subject: Union[str, Pattern, None] = None, category=None, importance=None, recipient=None,
+                 name: Optional[str] = None):
+        self.action = action
+        self.name = name if name is not None else getattr(action, "__name__", repr(action))
+        self.sender = _values(sender)
+        self.sender_domain = _values(sender_domain)
+        self.subject = re.compile(subject) if isinstance(subject, str) else subject
+        self.category = _values(category)
+        self.importance = _values(importance)
+        self.recipient = _values(recipient)
+    def __repr__(self):
+        criteria = ", ".join(criterion for criterion in CRITERIA if getattr(self, criterion) is not None)
+        return f"{self.__class__.__name__}({self.name}, {criteria or 'always'})"
+    @property
+    def index_key(self) -> Optional[str]:
+        """the most selective criterion this rule has, the one it is indexed under"""
+        for criterion in CRITERIA:
+            if getattr(self, criterion) is not None:
+                return criterion
+        return None
+    @property
+    def reads_sender(self) -> bool:
+        return self.sender is not None or self.sender_domain is not None
+    def matches(self, facts: _Facts) -> bool:
+        if self.sender is not None and facts.sender not in self.sender:
+            return False
+        if self.sender_domain is not None and facts.sender_domain not in self.sender_domain:
+            return False
+        if self.recipient is not None and not self.recipient & facts.recipients:
+            return False
+        if self.category is not None and not self.category & facts.categories:
+            return False
+        if self.importance is not None and facts.importance not in self.importance:
+            return False
+        if self.subject is not None and self.subject.search(facts.subject) is None:
+            return False
+        return True
+
+
+class RuleEngine(object):
+    """
+    A set of Rules, compiled into lookups so an item is only checked against rules that could match it.
+    Rules with a sender, recipient, domain, category or importance are found by hash lookups on the item's values,
+    subject rules sit behind one combined expression per set of flags that most subjects fail in a single pass.
+    Patterns with groups (backreferences count them) or inline global flags can't be joined, those rules
+    are checked with their own search.
+    Matching rules run in the order they were added.
+
+    The engine is a handler itself, folder.use_rules(engine) runs it for live events and dispatch_unread.
+    """
+    def __init__(self, rules: Iterable[Rule] = ()):
+        self._rules = []
+        self._compiled = False
+        self.items = 0 # items seen
+        self.checked = 0 # rules checked in full against an item
+        self.matched = 0 # rules whose action ran
+        for rule in rules:
+            self.add(rule)
+    def __repr__(self):
+        return f"{self.__class__.__name__}({len(self._rules)} rules, items={self.items}, matched={self.matched})"
+    def __len__(self):
+        return len(self._rules)
+    @property
+    def rules(self) -> List[Rule]:
+        return list(self._rules)
+    def add(self, rule: Rule) -> Rule:
+        self._rules.append(rule)
+        self._compiled = False
+        return rule
+    def rule(self, **criteria):
+        """decorator adding the decorated function as a rule's action, engine.rule(sender_domain="example.com")"""
+        def decorator(callback):
+            self.add(Rule(callback, **criteria))
+            return callback
+        return decorator
+    def _compile(self):
+        self._indexes = {criterion: {} for criterion in CRITERIA if criterion != "subject"}
+        self._subject_rules = []
+        self._always = []
+        for position, rule in enumerate(self._rules):
+            key = rule.index_key
+            if key is None:
+                self._always.append(position)
+            elif key == "subject":
+                self._subject_rules.append(position)
+            else:
+                for value in getattr(rule, key):
+                    self._indexes[key].setdefault(value, []).append(position)
+        self._subject_filters = [] # (one expression for several subject rules, their positions)
+        self._subject_searched = [] # subject rules whose patterns can't be joined, their own search decides
+        joinable = {}
+        for position in self._subject_rules:
+            pattern = self._rules[position].subject
+            if pattern.groups or _GLOBAL_FLAGS.search(pattern.pattern):
+                self._subject_searched.append(position)
+            else:
+                joinable.setdefault(pattern.flags, []).append(position)
+        for flags, positions in joinable.items():
+            expression = "|".join(f"(?:{self._rules[position].subject.pattern})" for position in positions)
+            self._subject_filters.append((re.compile(expression, flags), positions))
+        self._reads_sender = any(rule.reads_sender for rule in self._rules)
+        self._compiled = True
+    def _candidates(self, facts: _Facts) -> List[int]:
+        indexes = self._indexes
+        candidates = set(self._always)
+        if indexes["sender"] or indexes["sender_domain"]:
+            candidates.update(indexes["sender"].get(facts.sender, ()))
+            candidates.update(indexes["sender_domain"].get(facts.sender_domain, ()))
+        if indexes["recipient"]:
+            for address in facts.recipients:
+                candidates.update(indexes["recipient"].get(address, ()))
+        if indexes["category"]:
+            for category in facts.categories:
+                candidates.update(indexes["category"].get(category, ()))
+        if indexes["importance"]:
+            candidates.update(indexes["importance"].get(facts.importance, ()))
+        candidates.update(self._subject_searched)
+        for expression, positions in self._subject_filters:
+            if expression.search(facts.subject):
+                candidates.update(positions)
+        return sorted(candidates)
+    def matching(self, item) -> List[Rule]:
+        """the rules an item matches, without running them"""
+        if not self._compiled:
+            self._compile()
+        facts = _Facts(item, self._reads_sender)
+        return [self._rules[position] for position in self._candidates(facts) if self._rules[position].matches(facts)]
+    def __call__(self, item) -> Any:
+        """run the actions of every rule item matches, the result is the last action's, True if none ran"""
+        if not self._compiled:
+            self._compile()
+        self.items += 1
+        facts = _Facts(item, self._reads_sender)
+        result = True
+        for position in self._candidates(facts):
+            rule = self._rules[position]
+            self.checked += 1
+            if not rule.matches(facts):
+                continue
+            self.matched += 1
+            result = rule.action(item)
+            if not result: # if the response is falsey
+                break # stop processing more rules/handlers
+        return result
+    def statistics(self) -> Dict[str, int]:
+        return {"rules": len(self._rules), "items": self.items, "checked": self.checked, "matched": self.matched}
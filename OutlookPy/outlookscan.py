@@ -0,0 +1,276 @@
+"""Scanning whole folder trees from several worker processes, each attached to outlook on its own."""
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+import json
+import math
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union, TYPE_CHECKING
+
+from .outlookbackend import Win32Backend, get_backend
+from .outlookfolder import OutlookFolder
+from .outlookquery import OutlookQuery
+from .outlooksnapshot import plain_datetime
+
+if TYPE_CHECKING:
+    from .outlookpy import OutlookPy
+
+# folders holding more items than this are split into received date ranges of about this many items
+DEFAULT_UNIT_SIZE = 2000
+
+
+class ScanUnit(object):
+    """
+    One piece of a scan: the items of a folder, or of a received date range of one, start inclusive and end exclusive.
+    Bounds are whole minutes, DASL compares dates no finer than that, so neighbouring ranges never overlap.
+    Date ranges never hold items without a received time (drafts, posts, contacts...), an undated unit has those.
+    """
+    __slots__ = ("number", "folder_id", "store_id", "path", "start", "end", "expected", "undated")
+    def __init__(self, number: int, folder_id: str, store_id: Optional[str], path: str,
+                 start: Optional[datetime] = None, end: Optional[datetime] = None, expected: int = 0, undated: bool = False):
+        self.number = number
+        self.folder_id = folder_id
+        self.store_id = store_id
+        self.path = path
+        self.start = start
+        self.end = end
+        self.expected = expected
+        self.undated = undated
+    def __repr__(self):
+        dates = "" if self.start is None and self.end is None else f", {self.start} to {self.end}"
+        if self.undated:
+            dates = ", undated"
+        return f"{self.__class__.__name__}({self.number}, {self.path}{dates}, ~{self.expected} items)"
+    def lookups(self) -> Dict[str, Optional[datetime]]:
+        if self.undated:
+            return {"received": None}
+        lookups = {}
+        if self.start is not None:
+            lookups["received__gte"] = self.start
+        if self.end is not None:
+            lookups["received__lt"] = self.end
+        return lookups
+    def to_dict(self) -> dict:
+        return {"number": self.number, "folder_id": self.folder_id, "store_id": self.store_id, "path": self.path,
+                "start": self.start.isoformat() if self.start else None, "end": self.end.isoformat() if self.end else None,
+                "expected": self.expected, "undated": self.undated}
+    @classmethod
+    def from_dict(cls, data: dict) -> "ScanUnit":
+        start = datetime.fromisoformat(data["start"]) if data.get("start") else None
+        end = datetime.fromisoformat(data["end"]) if data.get("end") else None
+        return cls(data["number"], data["folder_id"], data.get("store_id"), data["path"], start, end, data.get("expected", 0),
+                   data.get("undated", False))
+
+
+def _minute(value: datetime) -> datetime:
+    return value.replace(second=0, microsecond=0)
+
+
+def _walk(folder: OutlookFolder, path: str, recursive: bool) -> Iterator:
+    yield folder, path
+    if recursive:
+        for name, child in folder.folders.items():
+            yield from _walk(child, f"{path}/{name}", recursive)
+
+
+def plan_units(folders: Iterable[OutlookFolder], recursive: bool = True, unit_size: int = DEFAULT_UNIT_SIZE) -> List[ScanUnit]:
+    """
+    Split folders (and everything below them) into ScanUnits of about unit_size items.
+    Big folders are cut into equally long date ranges between their oldest and newest items,
+    so units only come out even when mail arrived at an even pace.
+    Items without a received time fall outside every range, a split folder gets an undated unit for them.
+    """
+    units = []
+    for top in folders:
+        for folder, path in _walk(top, top.name, recursive):
+            count = len(folder)
+            if count == 0:
+                continue
+            folder_id, store_id = folder.entry_id, folder._folder.StoreID
+            pieces = math.ceil(count / unit_size)
+            oldest = newest = None
+            if pieces > 1:
+                dated = OutlookQuery(folder).where(received__ne=None)
+                oldest = dated.sorted("received").first()
+                newest = dated.sorted("received", reverse=True).first()
+            if oldest is None or newest is None:
+                units.append(ScanUnit(len(units), folder_id, store_id, path, expected=count))
+                continue
+            first, last = _minute(plain_datetime(oldest.received)), _minute(plain_datetime(newest.received))
+            step = max(timedelta(minutes=1), (last - first) / pieces)
+            bounds = [None]
+            boundary = _minute(first + step)
+            while boundary <= last and len(bounds) < pieces:
+                if boundary > (bounds[-1] or first):
+                    bounds.append(boundary)
+                boundary = _minute(boundary + step)
+            bounds.append(None)
+            undated = len(OutlookQuery(folder).where(received=None))
+            for start, end in zip(bounds, bounds[1:]):
+                units.append(ScanUnit(len(units), folder_id, store_id, path, start, end,
+                                      math.ceil((count - undated) / (len(bounds) - 1))))
+            if undated:
+                units.append(ScanUnit(len(units), folder_id, store_id, path, expected=undated, undated=True))
+    return units
+
+
+# the worker process' own OutlookPy, attached once when the process starts
+_worker_outlook = None
+
+
+def _start_worker(backend_factory: Optional[Callable[[], Any]]):
+    global _worker_outlook
+    from .outlookpy import OutlookPy
+    _worker_outlook = OutlookPy(backend=backend_factory() if backend_factory is not None else None)
+
+
+def scan_unit(unit: dict, function: Callable, outlook: Optional["OutlookPy"] = None) -> dict:
+    """
+    Run function on every item of one unit, oldest first, keeping whatever isn't None.
+    Module level so process pools can pickle it, outlook defaults to the worker process' own.
+    """
+    unit = ScanUnit.from_dict(unit)
+    namespace = (outlook or _worker_outlook)._mapi_namespace
+    if unit.store_id:
+        folder = OutlookFolder(namespace.GetFolderFromID(unit.folder_id, unit.store_id))
+    else:
+        folder = OutlookFolder(namespace.GetFolderFromID(unit.folder_id))
+    started = time.perf_counter()
+    records = []
+    items = 0
+    for item in OutlookQuery(folder).where(**unit.lookups()).sorted("received"):
+        items += 1
+        record = function(item)
+        if record is not None:
+            records.append(record)
+    return {"unit": unit.number, "records": records, "items": items, "seconds": time.perf_counter() - started,
+            "worker": os.getpid() if outlook is None else "main"}
+
+
+class OutlookScan(object):
+    """
+    A scan of folder trees, iterate it to run it and get the records function returned for each item.
+
+    The folders are planned into ScanUnits up front, then the units run on a pool of processes,
+    each of which attaches its own OutlookPy. function and its records cross process boundaries,
+    so function has to be a module level function and records have to pickle, snapshots or plain values.
+    Records arrive unit by unit, in plan order (ordered=True) or as units finish.
+    With processes=0 the units run one after the other in this process.
+
+    With a checkpoint path the plan and the units whose records were handed out are kept in a JSON file,
+    a scan over the same path picks up with the units that hadn't been. A unit cut off halfway runs again in full,
+    so its first records come out twice.
+    backend_factory makes each worker's backend, it has to be picklable too, by default workers use pywin32.
+    """
+    def __init__(self, outlook: "OutlookPy", folders: Iterable[OutlookFolder], function: Callable[[Any], Any],
+                 processes: int = 4, recursive: bool = True, ordered: bool = True, unit_size: int = DEFAULT_UNIT_SIZE,
+                 checkpoint: Optional[str] = None, backend_factory: Optional[Callable[[], Any]] = None):
+        if processes > 0 and backend_factory is None and not isinstance(get_backend(), Win32Backend):
+            raise ValueError("worker processes can't share this backend, give a backend_factory or use processes=0")
+        self._outlook = outlook
+        self._folders = list(folders)
+        self._function = function
+        self._processes = processes
+        self._recursive = recursive
+        self._ordered = ordered
+        self._unit_size = unit_size
+        self._checkpoint = checkpoint
+        self._backend_factory = backend_factory
+        self._units = None
+        self._done = set()
+        self._workers = OrderedDict() # worker to its totals
+        self.elapsed = 0.0
+    def __repr__(self):
+        units = "unplanned" if self._units is None else f"{len(self._done)}/{len(self._units)} units"
+        return f"{self.__class__.__name__}({units}, processes={self._processes})"
+    @property
+    def units(self) -> List[ScanUnit]:
+        """the plan, read from the checkpoint when there is one"""
+        if self._units is None:
+            self._load()
+        return list(self._units)
+    @property
+    def done(self) -> int:
+        return len(self._done)
+    def _load(self):
+        if self._checkpoint is not None:
+            try:
+                with open(self._checkpoint, "r", encoding="utf-8") as checkpoint_file:
+                    saved = json.load(checkpoint_file)
+                self._units = [ScanUnit.from_dict(unit) for unit in saved["units"]]
+                self._done = set(saved["done"])
+                return
+            except FileNotFoundError:
+                pass
+        self._units = plan_units(self._folders, self._recursive, self._unit_size)
+        self._save()
+    def _save(self):
+        if self._checkpoint is None:
+            return
+        directory = os.path.dirname(os.path.abspath(self._checkpoint))
+        handle, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "w", encoding="utf-8") as checkpoint_file:
+                json.dump({"units": [unit.to_dict() for unit in self._units], "done": sorted(self._done)}, checkpoint_file)
+            os.replace(temporary_path, self._checkpoint)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+    def _record(self, result: dict):
+        totals = self._workers.setdefault(result["worker"], {"units": 0, "items": 0, "records": 0, "seconds": 0.0})
+        totals["units"] += 1
+        totals["items"] += result["items"]
+        totals["records"] += len(result["records"])
+        totals["seconds"] += result["seconds"]
+    def _finished(self, result: dict):
+        # only once its records have all been handed out, so a resumed scan never skips any
+        self._done.add(result["unit"])
+        self._save()
+    def _results(self, pending: List[ScanUnit]) -> Iterator[dict]:
+        if self._processes <= 0:
+            for unit in pending:
+                yield scan_unit(unit.to_dict(), self._function, self._outlook)
+            return
+        executor = ProcessPoolExecutor(self._processes, initializer=_start_worker, initargs=(self._backend_factory,))
+        futures = []
+        try:
+            futures = [executor.submit(scan_unit, unit.to_dict(), self._function) for unit in pending]
+            if not self._ordered:
+                for future in as_completed(futures):
+                    yield future.result()
+                return
+            for future in futures:
+                yield future.result()
+        finally:
+            # units that haven't started are dropped when iteration stops early (cancel_futures needs python 3.9)
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+    def __iter__(self) -> Iterator[Any]:
+        if self._units is None:
+            self._load()
+        pending = [unit for unit in self._units if unit.number not in self._done]
+        started = time.perf_counter()
+        try:
+            for result in self._results(pending):
+                self._record(result)
+                yield from result["records"]
+                self._finished(result)
+        finally:
+            self.elapsed += time.perf_counter() - started
+    def statistics(self) -> Dict[Any, Dict[str, float]]:
+        """per worker: units, items, records, seconds spent scanning and items per second of that"""
+        return {worker: dict(totals, items_per_second=totals["items"] / totals["seconds"] if totals["seconds"] else 0.0)
+                for worker, totals in self._workers.items()}
+    def report(self) -> str:
+        """the throughput of every worker as a table"""
+        lines = [f"{'worker':<10} {'units':>6} {'items':>8} {'records':>8} {'seconds':>9} {'items/s':>9}"]
+        for worker, totals in self.statistics().items():
+            lines.append(f"{worker!s:<10} {totals['units']:>6} {totals['items']:>8} {totals['records']:>8} "
+                         f"{totals['seconds']:>9.3f} {totals['items_per_second']:>9.1f}")
+        items = sum(totals["items"] for totals in self._workers.values())
+        rate = items / self.elapsed if self.elapsed else 0.0
+        lines.append(f"{len(self._done)}/{len(self._units or ())} units, {items} items in {self.elapsed:.3f}s, {rate:.1f} items/s")
+        return "\n".join(lines)
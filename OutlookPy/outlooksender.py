@@ -0,0 +1,159 @@
+"""Adaptive, cached resolution of the SMTP address that sent an item."""
+from collections import OrderedDict
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+
+class ProbeStatistics(object):
+    """How often reading one property for one kind of item produced a usable SMTP address, and how long it took."""
+    __slots__ = ("attempts", "hits", "seconds")
+    def __init__(self):
+        self.attempts = 0
+        self.hits = 0
+        self.seconds = 0.0
+    def __repr__(self):
+        return f"{self.__class__.__name__}(attempts={self.attempts}, hits={self.hits}, seconds={self.seconds:.4f})"
+    @property
+    def hit_rate(self) -> float:
+        # smoothed so an untried property counts as even odds
+        return (self.hits + 1) / (self.attempts + 2)
+    @property
+    def latency(self) -> float:
+        if not self.attempts:
+            return 0.0
+        return self.seconds / self.attempts
+    def as_dict(self) -> Dict[str, float]:
+        return {"attempts": self.attempts, "hits": self.hits, "hit_rate": self.hit_rate, "latency": self.latency}
+
+
+def _acceptable(sample) -> bool:
+    """does a property value look like an SMTP address we can use"""
+    return isinstance(sample, str) and "@" in sample
+
+
+class SenderResolver(object):
+    """
+    Tries a list of schema properties in their given order until one holds an SMTP address,
+    the way OutlookItem.sender always has, so an item resolves to the same address whatever was resolved before it.
+
+    What adapts is how the properties are read: per item kind, the resolver keeps statistics of which properties hit
+    and reads the ones that usually miss in the same GetProperties call as the next one that usually hits.
+
+    keys maps each property to the entry ID property of the address entry it describes
+    (the sent representing properties to PR_SENT_REPRESENTING_ENTRYID, the rest to PR_SENDER_ENTRYID).
+    A resolved address is cached under all of the item's entry IDs together, so mail a delegate sent
+    on behalf of someone is never answered with the delegate's own address or the other way round.
+    One resolver is shared by every item in the process.
+    """
+    def __init__(self, properties: Iterable[str], keys: Mapping[str, str], cache_size: int = 10000):
+        self._properties = tuple(properties)
+        missing = set(self._properties) - set(keys)
+        if missing:
+            raise ValueError(f"{sorted(missing)} have no entry ID property to cache their answers under")
+        self._keys = dict(keys)
+        self._cache_size = cache_size
+        self._cache = OrderedDict() # entry ids of the item's address entries to SMTP address, least recently used first
+        self._statistics = {} # item kind to {property: ProbeStatistics}
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+    def __repr__(self):
+        return f"{self.__class__.__name__}(cached={len(self._cache)}, hits={self.cache_hits}, misses={self.cache_misses})"
+    @property
+    def entry_id_properties(self) -> Tuple[str, ...]:
+        """the entry ID properties answers are cached under, in the order of the properties they key"""
+        return tuple(dict.fromkeys(self._keys[schema] for schema in self._properties))
+    def _kind_statistics(self, kind: str) -> Dict[str, ProbeStatistics]:
+        if kind not in self._statistics:
+            self._statistics[kind] = {schema: ProbeStatistics() for schema in self._properties}
+        return self._statistics[kind]
+    def batches(self, kind: str) -> List[Tuple[str, ...]]:
+        """
+        The properties in their fixed order, cut into the groups read with one GetProperties call each.
+        A group ends at a property that usually answers for this kind, with no data every property is its own group.
+        """
+        with self._lock:
+            statistics = self._kind_statistics(kind)
+            batches, batch = [], []
+            for schema in self._properties:
+                batch.append(schema)
+                if statistics[schema].hit_rate >= 0.5:
+                    batches.append(tuple(batch))
+                    batch = []
+            if batch:
+                batches.append(tuple(batch))
+            return batches
+    def record(self, kind: str, schema: str, hit: bool, seconds: float):
+        with self._lock:
+            probe = self._kind_statistics(kind)[schema]
+            probe.attempts += 1
+            probe.hits += int(hit)
+            probe.seconds += seconds
+    def _key(self, entry_ids: Mapping[str, Optional[str]]) -> Optional[Tuple[Optional[str], ...]]:
+        # every entry id at once, whichever property answers the same item finds its answer again
+        key = tuple(entry_ids.get(schema) or None for schema in self.entry_id_properties)
+        if not any(key):
+            return None
+        return key
+    def cached(self, key: Optional[Tuple[Optional[str], ...]]) -> Optional[str]:
+        if key is None:
+            return None
+        with self._lock:
+            smtp = self._cache.get(key)
+            if smtp is None:
+                self.cache_misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return smtp
+    def remember(self, key: Optional[Tuple[Optional[str], ...]], smtp: str):
+        if key is None:
+            return
+        with self._lock:
+            self._cache[key] = smtp
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+    def resolve(self, kind: str, read: Callable[[Sequence[str]], Dict[str, object]],
+                entry_ids: Mapping[str, Optional[str]]) -> Optional[str]:
+        """
+        The SMTP address of a sender.
+        read reads several schema properties of the item at once, missing ones as None.
+        entry_ids are the item's values of entry_id_properties as hex, None where missing.
+        """
+        key = self._key(entry_ids)
+        smtp = self.cached(key)
+        if smtp is not None:
+            return smtp
+        for batch in self.batches(kind):
+            started = time.perf_counter()
+            try:
+                samples = read(batch)
+            except Exception:
+                # missing properties are an expected outcome, not an error
+                samples = {}
+            seconds = (time.perf_counter() - started) / len(batch)
+            answer = None
+            for schema in batch:
+                sample = samples.get(schema)
+                hit = _acceptable(sample)
+                self.record(kind, schema, hit, seconds)
+                if hit and answer is None:
+                    answer = sample
+            if answer is not None:
+                self.remember(key, answer)
+                return answer
+        return None
+    def statistics(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """per item kind, per property, attempts, hits, hit rate and mean latency in seconds"""
+        with self._lock:
+            return {kind: {schema: probe.as_dict() for schema, probe in probes.items()}
+                    for kind, probes in self._statistics.items()}
+    def clear(self):
+        """forget cached addresses and statistics"""
+        with self._lock:
+            self._cache.clear()
+            self._statistics.clear()
+            self.cache_hits = 0
+            self.cache_misses = 0
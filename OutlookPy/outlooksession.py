@@ -0,0 +1,185 @@
+"""Using outlook from a pool of worker threads, each with its own COM apartment and proxies."""
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+import logging
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .outlookbackend import get_backend
+from .outlookfolder import OutlookFolder
+from .outlookitem import OutlookItem, com_to_python
+from .outlooksnapshot import OutlookItemSnapshot
+
+logger = logging.getLogger(__name__)
+
+# outlook answers every out of process call on its one main thread, more callers than this only queue up there
+DEFAULT_MAX_CONCURRENT = 2
+
+# what crosses between threads instead of wrappers, ("item" or "folder", entry id, store id)
+Reference = Tuple[str, str, Optional[str]]
+
+
+def reference(target: Union[OutlookItem, OutlookFolder, OutlookItemSnapshot, str, Reference]) -> Reference:
+    """
+    What a wrapper is re-bound from on another thread. Read on the thread the wrapper belongs to,
+    a plain string is taken to be an item's EntryID in the default store.
+    """
+    if isinstance(target, OutlookItem):
+        return ("item", target.entry_id, target._store_id())
+    if isinstance(target, OutlookFolder):
+        return ("folder", target.entry_id, target._folder.StoreID)
+    if isinstance(target, OutlookItemSnapshot):
+        return ("item", target.entry_id, target.store_id)
+    if isinstance(target, str):
+        return ("item", target, None)
+    if isinstance(target, tuple) and len(target) == 3 and target[0] in ("item", "folder"):
+        return target
+    raise TypeError(f"can't refer to a {type(target).__name__} from another thread")
+
+
+class OutlookSession(object):
+    """
+    One worker thread's connection to outlook: an initialized apartment and its own proxies of the
+    Application and MAPI namespace, unmarshalled from the ones of the thread the pool was made on.
+    Wrappers it hands out belong to its thread, like everything else it does.
+    """
+    def __init__(self, backend, application_token, namespace_token):
+        backend.initialize()
+        self._backend = backend
+        self._outlook_application = backend.unmarshal(application_token)
+        self._mapi_namespace = backend.unmarshal(namespace_token)
+        self.thread = threading.current_thread().name
+        self.calls = 0 # tasks run on this session
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.thread}, calls={self.calls})"
+    def item(self, entry_id: str, store_id: Optional[str] = None) -> OutlookItem:
+        if store_id:
+            return com_to_python(self._mapi_namespace.GetItemFromID(entry_id, store_id))
+        return com_to_python(self._mapi_namespace.GetItemFromID(entry_id))
+    def folder(self, entry_id: str, store_id: Optional[str] = None) -> OutlookFolder:
+        if store_id:
+            return OutlookFolder(self._mapi_namespace.GetFolderFromID(entry_id, store_id))
+        return OutlookFolder(self._mapi_namespace.GetFolderFromID(entry_id))
+    def rebind(self, target: Reference):
+        """the wrapper a reference stands for, bound to this session's thread"""
+        kind, entry_id, store_id = target
+        if kind == "folder":
+            return self.folder(entry_id, store_id)
+        return self.item(entry_id, store_id)
+    def close(self):
+        self._outlook_application = None
+        self._mapi_namespace = None
+        self._backend.uninitialize()
+
+
+class OutlookSessionPool(object):
+    """
+    Worker threads that can each talk to outlook, for using wrappers from more than the thread that made them.
+
+    Every worker gets an OutlookSession when it starts. Work is handed over as references
+    (EntryID and StoreID, read on the calling thread) and re-bound to wrappers on the worker,
+    since wrappers can't be used from other threads. At most max_concurrent workers talk to outlook at once,
+    what a worker does after (the then callback of map) runs outside that limit, alongside other workers' COM calls.
+    Results travel back between threads, so they should be plain values or snapshots, not wrappers.
+
+    Make the pool on the thread that attached OutlookPy, and close it (or use it as a context manager) when done.
+    """
+    def __init__(self, outlook, workers: int = 4, max_concurrent: int = DEFAULT_MAX_CONCURRENT):
+        if workers < 1 or max_concurrent < 1:
+            raise ValueError("a session pool needs at least one worker and one concurrent caller")
+        self._backend = get_backend()
+        self._workers = workers
+        # an unmarshalled stream is used up, so each worker gets its own pair
+        self._tokens = queue.Queue()
+        for _ in range(workers):
+            self._tokens.put((self._backend.marshal(outlook._outlook_application), self._backend.marshal(outlook._mapi_namespace)))
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+        self._com_slots = threading.BoundedSemaphore(max_concurrent)
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="outlookpy-session", initializer=self._start_worker)
+        self._closed = False
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        # start every worker now, so the tokens are all used on the threads they were meant for
+        self._on_every_worker(lambda: None)
+    def __repr__(self):
+        return f"{self.__class__.__name__}(workers={self._workers}, submitted={self.submitted}, completed={self.completed}, failed={self.failed})"
+    def __enter__(self) -> "OutlookSessionPool":
+        return self
+    def __exit__(self, *exc_info):
+        self.close()
+    def _start_worker(self):
+        session = OutlookSession(self._backend, *self._tokens.get_nowait())
+        self._local.session = session
+        with self._lock:
+            self._sessions.append(session)
+    def _on_every_worker(self, step: Callable[[], Any]):
+        # every worker has to reach the barrier before any leaves it, so each runs step exactly once
+        barrier = threading.Barrier(self._workers)
+        def run():
+            barrier.wait()
+            step()
+        for future in [self._executor.submit(run) for _ in range(self._workers)]:
+            future.result()
+    @property
+    def sessions(self) -> List[OutlookSession]:
+        with self._lock:
+            return list(self._sessions)
+    def session(self) -> OutlookSession:
+        """the calling worker's session, only callable from inside the pool's tasks"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            raise RuntimeError("only the pool's own workers have sessions")
+        return session
+    def _run(self, task: Callable, arguments: Tuple, then: Optional[Callable]):
+        session = self.session()
+        try:
+            with self._com_slots:
+                session.calls += 1
+                result = task(session, *arguments)
+            if then is not None:
+                result = then(result)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        with self._lock:
+            self.completed += 1
+        return result
+    def submit(self, task: Callable, *arguments, then: Optional[Callable] = None) -> Future:
+        """run task(session, *arguments) on a worker, then(result) after it outside the concurrency limit"""
+        if self._closed:
+            raise RuntimeError("the session pool is closed")
+        with self._lock:
+            self.submitted += 1
+        return self._executor.submit(self._run, task, arguments, then)
+    def map(self, function: Callable, targets: Iterable, then: Optional[Callable] = None, ordered: bool = True) -> Iterator:
+        """
+        function(wrapper) for every item or folder in targets, each re-bound on a worker, then(result) after.
+        Results come in the order of targets, or as they finish with ordered=False.
+        """
+        # references are read here, wrappers can't be touched from the workers
+        references = [reference(target) for target in targets]
+        def task(session, target):
+            return function(session.rebind(target))
+        futures = [self.submit(task, target, then=then) for target in references]
+        return self._results(futures, ordered)
+    def _results(self, futures: List[Future], ordered: bool) -> Iterator:
+        for future in (futures if ordered else as_completed(futures)):
+            yield future.result()
+    def statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"submitted": self.submitted, "completed": self.completed, "failed": self.failed,
+                    "per_session": {session.thread: session.calls for session in self._sessions}}
+    def close(self):
+        """finish submitted work, then release every worker's proxies and apartment"""
+        if self._closed:
+            return
+        self._closed = True
+        def release():
+            self._local.session.close()
+            self._local.session = None
+        self._on_every_worker(release)
+        self._executor.shutdown(wait=True)
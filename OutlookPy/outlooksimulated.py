@@ -0,0 +1,1023 @@
+"""
+An in-memory Outlook for running and benchmarking the wrappers without Windows.
+
+    simulated = SimulatedOutlook(latency=0.0002)
+    simulated.populate(5000)
+    outlook = OutlookPy(backend=SimulatedBackend(simulated))
+
+It mimics the parts of the object model the wrappers use: Application, Namespace, Folders, Items
+(Restrict with the DASL that OutlookQuery emits, Sort, GetFirst/GetNext), Folder.GetTable, PropertyAccessor,
+Recipients and AddressEntries, Attachments, and ItemAdd/ItemChange/ItemRemove and FolderAdd/FolderRemove/FolderChange events.
+Every public member access counts as one round trip in SimulatedOutlook.calls and waits latency seconds.
+"""
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+import hashlib
+import itertools
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import weakref
+
+from .constants import *
+from .outlookbackend import com_error
+
+MAPI_E_NOT_FOUND = -2147221233 # 0x8004010F as a signed SCODE
+E_INVALIDARG = -2147024809
+
+# https://docs.microsoft.com/en-us/office/vba/api/outlook.olobjectclass
+OL_MAIL = 43
+OL_RECIPIENT = 4
+OL_ADDRESS_ENTRY = 8
+
+WELL_KNOWN_FOLDERS = ("Inbox", "Drafts", "Sent Items", "Deleted Items", "Journal", "Outbox", "Junk Email", "Calendar")
+
+_SUBJECTS = ("Quarterly report", "Invoice {n}", "Re: lunch?", "Build failed", "Meeting notes", "Your order has shipped",
+             "Action required: password expiry", "Weekly newsletter", "Fw: contract draft", "Holiday schedule")
+_DOMAINS = ("example.com", "vendor.com", "partner.org", "newsletters.com", "mail.example.net")
+
+
+def _fail(message: str, hresult: int = MAPI_E_NOT_FOUND):
+    raise com_error(hresult, message, None, None)
+
+
+class SimulatedObject(object):
+    """Counts and delays every public member access, the way each would be a round trip to outlook."""
+    def __getattribute__(self, name: str):
+        if name[0] != "_":
+            object.__getattribute__(self, "_outlook")._round_trip(type(self).__name__, name)
+        return object.__getattribute__(self, name)
+    def __setattr__(self, name: str, value):
+        if name[0] != "_":
+            self._outlook._round_trip(type(self).__name__, name + " =")
+        object.__setattr__(self, name, value)
+    @property
+    def _oleobj_(self):
+        # what pywin32 and the profiler look for to tell COM objects apart
+        return self
+
+
+class SimulatedOutlook(object):
+    """
+    A mailbox in memory: one store named after address with the well-known folders, and the items in them.
+    latency is how long every member access takes, in seconds. calls counts accesses by (object type, member).
+    """
+    def __init__(self, address: str = "me@example.com", latency: float = 0.0):
+        self._outlook = self
+        self.address = address
+        self.latency = latency
+        self.calls = Counter()
+        self._calls_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._objects = {} # entry id to item or folder
+        self.saved_bytes = 0 # attachment content handed out by SaveAsFile
+        self._queues = {} # thread id to the events waiting for that thread's pump
+        self._queues_lock = threading.Condition()
+        self._quitting = set() # threads that posted a quit
+        self.namespace = SimulatedNamespace(self)
+        self.application = SimulatedApplication(self)
+        self.store_id = self._new_id("store")
+        self.root = SimulatedFolder(self, address, None)
+        for name in WELL_KNOWN_FOLDERS:
+            self.root._add_folder(name)
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.address}, {sum(1 for obj in self._objects.values() if isinstance(obj, SimulatedMailItem))} items)"
+    def _round_trip(self, kind: str, member: str):
+        with self._calls_lock:
+            self.calls[(kind, member)] += 1
+        if self.latency:
+            time.sleep(self.latency)
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+    def reset_calls(self):
+        with self._calls_lock:
+            self.calls.clear()
+    def _new_id(self, prefix: str) -> str:
+        # hex like real entry ids, unique and stable for the life of the simulation
+        return hashlib.sha1(f"{prefix}-{next(self._ids)}".encode()).hexdigest().upper() * 2
+    def folder(self, path: str) -> "SimulatedFolder":
+        """a folder by its path below the store root, "Inbox/Projects\""""
+        folder = self.root
+        for name in re.split(r"[/\\]", path):
+            if name:
+                folder = folder._children[name]
+        return folder
+    def _resolve_folder(self, folder: Union["SimulatedFolder", str]) -> "SimulatedFolder":
+        return self.folder(folder) if isinstance(folder, str) else folder
+    def add_folder(self, path: str) -> "SimulatedFolder":
+        """create a folder, and its parents where missing, firing FolderAdd"""
+        parent = self.root
+        for name in [name for name in re.split(r"[/\\]", path) if name]:
+            if name not in parent._children:
+                parent._add_folder(name, fire=True)
+            parent = parent._children[name]
+        return parent
+    def remove_folder(self, path: str):
+        folder = self.folder(path)
+        folder._parent._remove_folder(folder, fire=True)
+    def add_mail(self, folder: Union["SimulatedFolder", str] = "Inbox", subject: str = "", sender: str = "someone@example.com",
+                 sender_name: Optional[str] = None, body: str = "", received: Optional[datetime] = None, unread: bool = True,
+                 importance: int = 1, categories: Iterable[str] = (), recipients: Iterable[str] = (),
+                 sender_type: str = "SMTP", html: Optional[str] = None, on_behalf_of: Optional[str] = None,
+                 fire: bool = True) -> "SimulatedMailItem":
+        """
+        put a mail item in a folder, firing ItemAdd like a delivery would, with html the body is natively HTML.
+        on_behalf_of makes sender a delegate, the sent representing properties name on_behalf_of instead
+        """
+        folder = self._resolve_folder(folder)
+        item = SimulatedMailItem(self, folder, subject=subject, sender=sender, sender_name=sender_name, body=body,
+                                 received=received, unread=unread, importance=importance, categories=categories,
+                                 recipients=recipients or (self.address,), sender_type=sender_type)
+        if on_behalf_of is not None:
+            item._representing = on_behalf_of
+        if html is not None:
+            item._html = html
+            item._body_format = 3
+        folder._insert(item, fire)
+        return item
+    def populate(self, count: int, folder: Union["SimulatedFolder", str] = "Inbox", senders: int = 200, seed: int = 0,
+                 start: Optional[datetime] = None) -> List["SimulatedMailItem"]:
+        """
+        count generated mail items with repeatable subjects, senders, dates, flags and categories, without events.
+        About a fifth of the senders are exchange users, as in a typical mailbox.
+        """
+        generator = random.Random(seed)
+        start = start or datetime(2026, 1, 1, 8, 0)
+        addresses = [f"user{number}@{generator.choice(_DOMAINS)}" for number in range(senders)]
+        exchange = set(generator.sample(addresses, max(1, senders // 5)))
+        items = []
+        for number in range(count):
+            sender = generator.choice(addresses)
+            items.append(self.add_mail(
+                folder, subject=generator.choice(_SUBJECTS).format(n=number), sender=sender,
+                sender_name=sender.split("@")[0].title(), body=f"Message {number} from {sender}.\n" * generator.randint(1, 20),
+                received=start + timedelta(minutes=number * 7 + generator.randint(0, 6)), unread=generator.random() < 0.3,
+                importance=generator.choice((0, 1, 1, 1, 2)),
+                categories=generator.sample(("Billing", "Projects", "Personal", "Escalations"), generator.choice((0, 0, 0, 1, 2))),
+                sender_type="EX" if sender in exchange else "SMTP", fire=False))
+        return items
+    def change(self, item: "SimulatedMailItem", **values):
+        """change fields of an item (subject=..., unread=...) as another client would, firing ItemChange"""
+        for field, value in values.items():
+            object.__setattr__(item, _FIELD_ATTRIBUTES[field], value)
+        item._touch(fire=True)
+    def remove(self, item: "SimulatedMailItem"):
+        """delete an item for good as another client would, firing ItemRemove"""
+        item._folder._discard(item, fire=True)
+    def add_attachment(self, item: "SimulatedMailItem", name: str, content: bytes, mime_type: Optional[str] = None,
+                       inline: bool = False) -> "SimulatedAttachment":
+        """attach content to an item, inline ones get a content id the way pictures in HTML bodies do"""
+        attachment = SimulatedAttachment(self, item, len(item._attachments) + 1, name, bytes(content), mime_type, inline)
+        item._attachments.append(attachment)
+        return attachment
+    # event delivery, sinks are called on the thread that hooked them, when that thread pumps
+    def _fire(self, sinks: Dict[int, Tuple[weakref.ref, int]], method: str, *args):
+        with self._queues_lock:
+            for sink_ref, thread in list(sinks.values()):
+                self._queues.setdefault(thread, deque()).append((sink_ref, method, args))
+            self._queues_lock.notify_all()
+    def _pending(self, thread: int) -> bool:
+        return bool(self._queues.get(thread)) or thread in self._quitting
+    def _wait(self, handles: Sequence[threading.Event], timeout: Optional[float]) -> Optional[int]:
+        thread = threading.get_ident()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queues_lock:
+            while True:
+                for position, handle in enumerate(handles):
+                    if handle.is_set():
+                        handle.clear()
+                        return position
+                if self._pending(thread):
+                    return len(handles)
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._queues_lock.wait(remaining)
+    def _pump(self) -> bool:
+        thread = threading.get_ident()
+        with self._queues_lock:
+            waiting = self._queues.pop(thread, deque())
+        for sink_ref, method, args in waiting:
+            sink = sink_ref()
+            if sink is not None and hasattr(sink, method):
+                getattr(sink, method)(*args)
+        with self._queues_lock:
+            if thread in self._quitting:
+                self._quitting.discard(thread)
+                return True
+        return False
+    def _post_quit(self):
+        with self._queues_lock:
+            self._quitting.add(threading.get_ident())
+            self._queues_lock.notify_all()
+    def _wake(self, handle: threading.Event):
+        with self._queues_lock:
+            handle.set()
+            self._queues_lock.notify_all()
+
+
+class SimulatedApplication(SimulatedObject):
+    def __init__(self, outlook: SimulatedOutlook):
+        self._outlook = outlook
+    @property
+    def Session(self) -> "SimulatedNamespace":
+        return self._outlook.namespace
+    def GetNamespace(self, name: str) -> "SimulatedNamespace":
+        if name != "MAPI":
+            _fail(f"unknown namespace {name}", E_INVALIDARG)
+        return self._outlook.namespace
+
+
+class SimulatedNamespace(SimulatedObject):
+    def __init__(self, outlook: SimulatedOutlook):
+        self._outlook = outlook
+    @property
+    def Folders(self) -> "SimulatedFolders":
+        return SimulatedFolders(self._outlook, None)
+    @property
+    def CurrentUser(self) -> "SimulatedRecipient":
+        return SimulatedRecipient(self._outlook, self._outlook.address)
+    def GetItemFromID(self, entry_id: str, store_id: Optional[str] = None):
+        if store_id is not None and store_id != self._outlook.store_id:
+            _fail(f"no store {store_id}")
+        found = self._outlook._objects.get(entry_id)
+        if found is None:
+            _fail(f"no item {entry_id}")
+        return found
+    def GetFolderFromID(self, entry_id: str, store_id: Optional[str] = None) -> "SimulatedFolder":
+        found = self.GetItemFromID(entry_id, store_id)
+        if not isinstance(found, SimulatedFolder):
+            _fail(f"no folder {entry_id}")
+        return found
+    @property
+    def DefaultStore(self) -> "SimulatedStore":
+        return SimulatedStore(self._outlook)
+
+
+class SimulatedStore(SimulatedObject):
+    """the one store of the simulated mailbox"""
+    def __init__(self, outlook: SimulatedOutlook):
+        self._outlook = outlook
+    @property
+    def StoreID(self) -> str:
+        return self._outlook.store_id
+    @property
+    def DisplayName(self) -> str:
+        return self._outlook.address
+    def GetRootFolder(self) -> "SimulatedFolder":
+        return self._outlook.root
+
+
+class SimulatedFolders(SimulatedObject):
+    """the sub folders of a folder, or the stores of the session when parent is None"""
+    def __init__(self, outlook: SimulatedOutlook, parent: Optional["SimulatedFolder"]):
+        self._outlook = outlook
+        self._parent = parent
+    def _folders(self) -> List["SimulatedFolder"]:
+        if self._parent is None:
+            return [self._outlook.root]
+        return list(self._parent._children.values())
+    @property
+    def Count(self) -> int:
+        return len(self._folders())
+    def Item(self, key: Union[str, int]) -> "SimulatedFolder":
+        folders = self._folders()
+        if isinstance(key, int):
+            if not 1 <= key <= len(folders):
+                _fail(f"no folder at {key}", E_INVALIDARG)
+            return folders[key - 1]
+        for folder in folders:
+            if folder._name == key:
+                return folder
+        _fail(f"no folder {key}")
+    def __getitem__(self, key):
+        return self.Item(key)
+    def __iter__(self):
+        for folder in self._folders():
+            self._outlook._round_trip(type(self).__name__, "next")
+            yield folder
+    def __len__(self):
+        return len(self._folders())
+    def Add(self, name: str) -> "SimulatedFolder":
+        return self._parent._add_folder(name, fire=True)
+    def Remove(self, index: int):
+        self._parent._remove_folder(self._folders()[index - 1], fire=True)
+    def _connect(self, sink) -> None:
+        self._parent._connect("folders", sink)
+    def _disconnect(self, sink) -> None:
+        self._parent._disconnect("folders", sink)
+
+
+class SimulatedFolder(SimulatedObject):
+    def __init__(self, outlook: SimulatedOutlook, name: str, parent: Optional["SimulatedFolder"]):
+        self._outlook = outlook
+        self._name = name
+        self._parent = parent
+        self._entry_id = outlook._new_id("folder")
+        self._children = {}
+        self._items = [] # in the order they arrived
+        self._sinks = {"items": {}, "folders": {}} # id of sink to (weak reference, thread)
+        outlook._objects[self._entry_id] = self
+    @property
+    def Name(self) -> str:
+        return self._name
+    @Name.setter
+    def Name(self, name: str):
+        siblings = self._parent._children
+        siblings[name] = siblings.pop(self._name)
+        self._name = name
+        self._outlook._fire(self._parent._sinks["folders"], "OnFolderChange", self)
+    @property
+    def EntryID(self) -> str:
+        return self._entry_id
+    @property
+    def StoreID(self) -> str:
+        return self._outlook.store_id
+    @property
+    def Session(self) -> SimulatedNamespace:
+        return self._outlook.namespace
+    @property
+    def Parent(self):
+        return self._parent if self._parent is not None else self._outlook.namespace
+    @property
+    def Items(self) -> "SimulatedItems":
+        return SimulatedItems(self, None)
+    @property
+    def Folders(self) -> SimulatedFolders:
+        return SimulatedFolders(self._outlook, self)
+    def GetTable(self, filter: Optional[str] = None, table_contents: int = 0) -> "SimulatedTable":
+        return SimulatedTable(self, _restrict(self._items, filter) if filter else list(self._items))
+    def _add_folder(self, name: str, fire: bool = False) -> "SimulatedFolder":
+        if name in self._children:
+            _fail(f"a folder named {name} already exists", E_INVALIDARG)
+        folder = SimulatedFolder(self._outlook, name, self)
+        self._children[name] = folder
+        if fire:
+            self._outlook._fire(self._sinks["folders"], "OnFolderAdd", folder)
+        return folder
+    def _remove_folder(self, folder: "SimulatedFolder", fire: bool = False):
+        del self._children[folder._name]
+        self._outlook._objects.pop(folder._entry_id, None)
+        if fire:
+            self._outlook._fire(self._sinks["folders"], "OnFolderRemove")
+    def _connect(self, kind: str, sink):
+        sinks = self._sinks[kind]
+        key = id(sink)
+        sinks[key] = (weakref.ref(sink, lambda _, sinks=sinks, key=key: sinks.pop(key, None)), threading.get_ident())
+    def _disconnect(self, kind: str, sink):
+        self._sinks[kind].pop(id(sink), None)
+    def _insert(self, item: "SimulatedMailItem", fire: bool):
+        item._folder = self
+        self._items.append(item)
+        self._outlook._objects[item._entry_id] = item
+        if fire:
+            self._outlook._fire(self._sinks["items"], "OnItemAdd", item)
+    def _discard(self, item: "SimulatedMailItem", fire: bool, forget: bool = True):
+        self._items.remove(item)
+        if forget:
+            self._outlook._objects.pop(item._entry_id, None)
+        if fire:
+            self._outlook._fire(self._sinks["items"], "OnItemRemove")
+
+
+class SimulatedItems(SimulatedObject):
+    """
+    A folder's Items. Unrestricted collections follow the folder as it changes,
+    restricted ones hold the items that matched when Restrict was called, as a snapshot.
+    """
+    def __init__(self, folder: SimulatedFolder, items: Optional[List["SimulatedMailItem"]]):
+        self._outlook = folder._outlook
+        self._folder = folder
+        self._fixed = items
+        self._sort = None
+        self._cursor = 0
+    def _list(self) -> List["SimulatedMailItem"]:
+        items = list(self._folder._items) if self._fixed is None else self._fixed
+        if self._sort is not None:
+            attribute, descending = self._sort
+            items = sorted(items, key=lambda item: _sort_key(object.__getattribute__(item, attribute)), reverse=descending)
+        return items
+    @property
+    def Count(self) -> int:
+        return len(self._list())
+    def Item(self, position: int) -> "SimulatedMailItem":
+        items = self._list()
+        if not 1 <= position <= len(items):
+            _fail(f"no item at {position}", E_INVALIDARG)
+        return items[position - 1]
+    def __iter__(self):
+        for item in self._list():
+            self._outlook._round_trip(type(self).__name__, "next")
+            yield item
+    def __len__(self):
+        return len(self._list())
+    def Restrict(self, filter: str) -> "SimulatedItems":
+        restricted = SimulatedItems(self._folder, _restrict(self._list(), filter))
+        return restricted
+    def Sort(self, property_name: str, descending: bool = False):
+        self._sort = (_sort_attribute(property_name), bool(descending))
+    def GetFirst(self) -> Optional["SimulatedMailItem"]:
+        self._cursor = 0
+        return self._at_cursor()
+    def GetNext(self) -> Optional["SimulatedMailItem"]:
+        self._cursor += 1
+        return self._at_cursor()
+    def GetLast(self) -> Optional["SimulatedMailItem"]:
+        self._cursor = len(self._list()) - 1
+        return self._at_cursor()
+    def _at_cursor(self):
+        items = self._list()
+        return items[self._cursor] if 0 <= self._cursor < len(items) else None
+    def _connect(self, sink):
+        self._folder._connect("items", sink)
+    def _disconnect(self, sink):
+        self._folder._disconnect("items", sink)
+
+
+class SimulatedColumns(SimulatedObject):
+    def __init__(self, table: "SimulatedTable"):
+        self._outlook = table._outlook
+        self._table = table
+    def RemoveAll(self):
+        self._table._columns = []
+    def Add(self, name: str):
+        self._table._columns.append(name)
+
+
+class SimulatedTable(SimulatedObject):
+    def __init__(self, folder: SimulatedFolder, rows: List["SimulatedMailItem"]):
+        self._outlook = folder._outlook
+        self._rows = rows
+        self._columns = ["EntryID", "Subject", "CreationTime", "LastModificationTime", "MessageClass"]
+        self._position = 0
+    @property
+    def Columns(self) -> SimulatedColumns:
+        return SimulatedColumns(self)
+    @property
+    def EndOfTable(self) -> bool:
+        return self._position >= len(self._rows)
+    def Sort(self, property_name: str, descending: bool = False):
+        attribute = _sort_attribute(property_name)
+        self._rows = sorted(self._rows, key=lambda item: _sort_key(object.__getattribute__(item, attribute)), reverse=bool(descending))
+    def GetArray(self, count: int) -> Tuple[Tuple, ...]:
+        rows = self._rows[self._position:self._position + count]
+        self._position += len(rows)
+        return tuple(tuple(self._value(row, column) for column in self._columns) for row in rows)
+    def _value(self, row: "SimulatedMailItem", column: str):
+        value = row._column(column)
+        # like outlook's, tables only carry the start of the body
+        if column == "urn:schemas:httpmail:textdescription" and value:
+            return value[:255]
+        return value
+
+
+class SimulatedAddressEntry(SimulatedObject):
+    Class = OL_ADDRESS_ENTRY
+    def __init__(self, outlook: SimulatedOutlook, address: str, exchange: bool):
+        self._outlook = outlook
+        self._address = address
+        self._exchange = exchange
+    @property
+    def ID(self) -> str:
+        return _address_id(self._address)
+    @property
+    def Address(self) -> str:
+        return _exchange_dn(self._address) if self._exchange else self._address
+    @property
+    def Type(self) -> str:
+        return "EX" if self._exchange else "SMTP"
+    def GetExchangeUser(self):
+        return SimulatedExchangeUser(self._outlook, self._address) if self._exchange else None
+
+
+class SimulatedExchangeUser(SimulatedObject):
+    def __init__(self, outlook: SimulatedOutlook, address: str):
+        self._outlook = outlook
+        self._address = address
+    @property
+    def PrimarySmtpAddress(self) -> str:
+        return self._address
+
+
+class SimulatedRecipient(SimulatedObject):
+    Class = OL_RECIPIENT
+    def __init__(self, outlook: SimulatedOutlook, address: str, exchange: bool = False):
+        self._outlook = outlook
+        self._address = address
+        self._exchange = exchange
+    @property
+    def Name(self) -> str:
+        return self._address.split("@")[0].title()
+    @property
+    def Address(self) -> str:
+        return self._address
+    @property
+    def EntryID(self) -> str:
+        return _address_id(self._address)
+    @property
+    def AddressEntry(self) -> SimulatedAddressEntry:
+        return SimulatedAddressEntry(self._outlook, self._address, self._exchange)
+    @property
+    def PropertyAccessor(self) -> "SimulatedPropertyAccessor":
+        return SimulatedPropertyAccessor(self._outlook, {PR_SMTP_ADDRESS: self._address})
+    @property
+    def MeetingResponseStatus(self) -> int:
+        return 0
+
+
+class SimulatedPropertyAccessor(SimulatedObject):
+    """schema properties of an object, missing ones fail like they do in outlook"""
+    def __init__(self, outlook: SimulatedOutlook, properties: Dict[str, Any]):
+        self._outlook = outlook
+        self._properties = properties
+    def GetProperty(self, schema: str):
+        if schema not in self._properties or self._properties[schema] is None:
+            _fail(f"property {schema} is unavailable")
+        return self._properties[schema]
+    def GetProperties(self, schemas: Sequence[str]) -> Tuple:
+        # like outlook, a missing property is an error code in its slot rather than an exception
+        return tuple(MAPI_E_NOT_FOUND if self._properties.get(schema) is None else self._properties[schema] for schema in schemas)
+
+
+# add_mail/change field names to the attributes a SimulatedMailItem keeps them in
+_FIELD_ATTRIBUTES = {"subject": "_subject", "body": "_body", "unread": "_unread", "importance": "_importance",
+                     "categories": "_categories", "received": "_received", "sender": "_sender", "sender_name": "_sender_name",
+                     "html": "_html"}
+
+
+class SimulatedMailItem(SimulatedObject):
+    Class = OL_MAIL
+    MessageClass = "IPM.Note"
+    def __init__(self, outlook: SimulatedOutlook, folder: SimulatedFolder, subject: str, sender: str, sender_name: Optional[str],
+                 body: str, received: Optional[datetime], unread: bool, importance: int, categories: Iterable[str],
+                 recipients: Iterable[str], sender_type: str):
+        self._outlook = outlook
+        self._folder = folder
+        self._entry_id = outlook._new_id("item")
+        self._subject = subject
+        self._sender = sender
+        self._sender_name = sender_name or sender.split("@")[0]
+        self._sender_type = sender_type
+        self._representing = sender # who the mail was sent on behalf of, the sender unless they are a delegate
+        self._body = body
+        self._received = received or datetime.now().replace(microsecond=0)
+        self._created = self._received
+        self._modified = self._received
+        self._unread = unread
+        self._importance = importance
+        self._categories = ", ".join(categories)
+        self._recipients = tuple(recipients)
+        self._body_format = 1
+        self._alternate_recipient_allowed = True
+        self._attachments = []
+        self._html = None
+        self._saved = True # no edits waiting for a Save
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._subject!r})"
+    def _touch(self, fire: bool):
+        self._modified = datetime.now().replace(microsecond=0)
+        if fire:
+            self._outlook._fire(self._folder._sinks["items"], "OnItemChange", self)
+    # the plain values behind the object model, also what tables and restrictions read
+    @property
+    def _smtp_sender(self) -> str:
+        return self._sender
+    @property
+    def _properties(self) -> Dict[str, Any]:
+        exchange = self._sender_type == "EX"
+        return {
+            PR_SENT_REPRESENTING_EMAIL_ADDRESS_W: _exchange_dn(self._representing) if exchange else self._representing,
+            PR_SENT_REPRESENTING_SMTP_ADDRESS: self._representing,
+            PR_SENT_REPRESENTING_ENTRYID: bytes.fromhex(_address_id(self._representing)),
+            PR_SENDER_SMTP_ADDRESS: self._sender,
+            PR_SENDER_ENTRYID: bytes.fromhex(_address_id(self._sender)),
+            PR_SENDER_ADDRTYPE_W: self._sender_type,
+            PR_LAST_MODIFIER_NAME_W: self._sender_name,
+            PR_MESSAGE_CLASS_W: "IPM.Note",
+            PR_MESSAGE_SIZE: self._size,
+            PR_STORE_ENTRYID: bytes.fromhex(self._outlook.store_id),
+            PR_ENTRYID: bytes.fromhex(self._entry_id),
+            PR_LAST_MODIFICATION_TIME: self._modified,
+            PR_NATIVE_BODY_INFO: self._body_format,
+        }
+    @property
+    def _size(self) -> int:
+        return 512 + len(self._subject) + len(self._body.encode("utf-8")) + sum(attachment._size for attachment in self._attachments)
+    def _column(self, name: str):
+        if name in _DASL_READERS:
+            return _DASL_READERS[name](self)
+        if name in self._properties:
+            return self._properties[name]
+        attribute = _COLUMN_ATTRIBUTES.get(name)
+        return object.__getattribute__(self, attribute) if attribute is not None else None
+    @property
+    def EntryID(self) -> str:
+        return self._entry_id
+    @property
+    def Subject(self) -> str:
+        return self._subject
+    @Subject.setter
+    def Subject(self, subject: str):
+        self._subject = subject
+        self._saved = False
+    @property
+    def Body(self) -> str:
+        return self._body
+    @Body.setter
+    def Body(self, body: str):
+        self._body = body
+        self._saved = False
+    @property
+    def HTMLBody(self) -> str:
+        # converted the way outlook does for plain bodies, only simpler
+        if self._html is not None:
+            return self._html
+        return "<html><body><pre>" + self._body.replace("&", "&amp;").replace("<", "&lt;") + "</pre></body></html>"
+    @property
+    def RTFBody(self) -> bytes:
+        text = self._body.replace("\\", "\\\\").replace("{", "\\{").replace("}", "\\}").replace("\n", "\\par\n")
+        return ("{\\rtf1\\ansi " + text + "}").encode("latin-1", "replace")
+    @property
+    def BodyFormat(self) -> int:
+        return self._body_format
+    @BodyFormat.setter
+    def BodyFormat(self, body_format: int):
+        self._body_format = body_format
+    @property
+    def UnRead(self) -> bool:
+        return self._unread
+    @UnRead.setter
+    def UnRead(self, unread: bool):
+        # outlook applies the read state right away, without a Save
+        if bool(unread) != self._unread:
+            self._unread = bool(unread)
+            self._touch(fire=True)
+    @property
+    def Importance(self) -> int:
+        return self._importance
+    @Importance.setter
+    def Importance(self, importance: int):
+        self._importance = importance
+    @property
+    def Categories(self) -> str:
+        return self._categories
+    @Categories.setter
+    def Categories(self, categories: str):
+        self._categories = categories
+    @property
+    def ReceivedTime(self) -> datetime:
+        return self._received
+    @ReceivedTime.setter
+    def ReceivedTime(self, received: datetime):
+        self._received = received
+    @property
+    def CreationTime(self) -> datetime:
+        return self._created
+    @property
+    def LastModificationTime(self) -> datetime:
+        return self._modified
+    @property
+    def SenderName(self) -> str:
+        return self._sender_name
+    @property
+    def SenderEmailAddress(self) -> str:
+        return _exchange_dn(self._sender) if self._sender_type == "EX" else self._sender
+    @property
+    def SenderEmailType(self) -> str:
+        return self._sender_type
+    @property
+    def Size(self) -> int:
+        return self._size
+    @property
+    def AlternateRecipientAllowed(self) -> bool:
+        return self._alternate_recipient_allowed
+    @AlternateRecipientAllowed.setter
+    def AlternateRecipientAllowed(self, allowed: bool):
+        self._alternate_recipient_allowed = allowed
+    @property
+    def Recipients(self) -> List[SimulatedRecipient]:
+        return [SimulatedRecipient(self._outlook, address, address == self._outlook.address) for address in self._recipients]
+    @property
+    def PropertyAccessor(self) -> SimulatedPropertyAccessor:
+        return SimulatedPropertyAccessor(self._outlook, self._properties)
+    @property
+    def Attachments(self) -> "SimulatedAttachments":
+        return SimulatedAttachments(self._outlook, self)
+    @property
+    def Parent(self) -> SimulatedFolder:
+        return self._folder
+    @property
+    def Session(self) -> SimulatedNamespace:
+        return self._outlook.namespace
+    @property
+    def Saved(self) -> bool:
+        return self._saved
+    def Save(self):
+        self._saved = True
+        self._touch(fire=True)
+    def Move(self, folder: SimulatedFolder) -> "SimulatedMailItem":
+        self._folder._discard(self, fire=True, forget=False)
+        folder._insert(self, fire=True)
+        return self
+    def Delete(self):
+        deleted = self._outlook.root._children.get("Deleted Items")
+        if deleted is None or self._folder is deleted:
+            self._folder._discard(self, fire=True)
+        else:
+            self.Move(deleted)
+
+
+class SimulatedAttachments(SimulatedObject):
+    def __init__(self, outlook: SimulatedOutlook, item: SimulatedMailItem):
+        self._outlook = outlook
+        self._item = item
+    @property
+    def Count(self) -> int:
+        return len(self._item._attachments)
+    def Item(self, index: int) -> "SimulatedAttachment":
+        if not 1 <= index <= len(self._item._attachments):
+            _fail(f"no attachment at {index}", E_INVALIDARG)
+        return self._item._attachments[index - 1]
+    def __iter__(self):
+        for attachment in self._item._attachments:
+            self._outlook._round_trip(type(self).__name__, "next")
+            yield attachment
+    def __len__(self):
+        return len(self._item._attachments)
+
+
+class SimulatedAttachment(SimulatedObject):
+    """
+    A file attached by value. Size is the content plus a little overhead, like outlook's,
+    SaveAsFile is the only way to the content and counts the bytes it hands out in SimulatedOutlook.saved_bytes.
+    """
+    Type = 1
+    def __init__(self, outlook: SimulatedOutlook, item: SimulatedMailItem, index: int, name: str, content: bytes,
+                 mime_type: Optional[str], inline: bool):
+        self._outlook = outlook
+        self._item = item
+        self._index = index
+        self._name = name
+        self._content = content
+        self._mime_type = mime_type
+        self._content_id = f"{hashlib.md5(content).hexdigest()}@simulated" if inline else None
+    @property
+    def _size(self) -> int:
+        return len(self._content) + 128
+    @property
+    def Index(self) -> int:
+        return self._index
+    @property
+    def FileName(self) -> str:
+        return self._name
+    @property
+    def DisplayName(self) -> str:
+        return self._name
+    @property
+    def Size(self) -> int:
+        return self._size
+    @property
+    def Parent(self) -> SimulatedMailItem:
+        return self._item
+    @property
+    def PropertyAccessor(self) -> SimulatedPropertyAccessor:
+        return SimulatedPropertyAccessor(self._outlook, {PR_ATTACH_MIME_TAG_W: self._mime_type,
+                                                         PR_ATTACH_CONTENT_ID_W: self._content_id,
+                                                         PR_ATTACHMENT_HIDDEN: self._content_id is not None})
+    def SaveAsFile(self, path: str):
+        with open(path, "wb") as saved:
+            saved.write(self._content)
+        self._outlook.saved_bytes += len(self._content)
+
+
+# Table column names, built-in property names and sort names, to the attribute holding their value
+_COLUMN_ATTRIBUTES = {
+    "EntryID": "_entry_id", "Subject": "_subject", "ReceivedTime": "_received", "UnRead": "_unread",
+    "Importance": "_importance", "Categories": "_categories", "SenderName": "_sender_name",
+    "SenderEmailAddress": "_smtp_sender", "MessageClass": "MessageClass", "LastModificationTime": "_modified",
+    "CreationTime": "_created", "Size": "_size", "Body": "_body",
+}
+
+
+def _keywords(item: SimulatedMailItem) -> List[str]:
+    return [category for category in item._categories.split(", ") if category]
+
+# DASL schema names OutlookQuery uses, to how the simulated item answers them
+_DASL_READERS = {
+    "urn:schemas:httpmail:subject": lambda item: item._subject,
+    "urn:schemas:httpmail:textdescription": lambda item: item._body,
+    "urn:schemas:httpmail:fromname": lambda item: item._sender_name,
+    "urn:schemas:httpmail:datereceived": lambda item: item._received,
+    "DAV:creationdate": lambda item: item._created,
+    "DAV:getlastmodified": lambda item: item._modified,
+    "urn:schemas:httpmail:read": lambda item: 0 if item._unread else 1,
+    "urn:schemas:httpmail:hasattachment": lambda item: 1 if item._attachments else 0,
+    "urn:schemas:httpmail:importance": lambda item: item._importance,
+    "urn:schemas-microsoft-com:office:office#Keywords": _keywords,
+}
+
+
+def _address_id(address: str) -> str:
+    return hashlib.md5(address.lower().encode()).hexdigest().upper()
+
+
+def _exchange_dn(address: str) -> str:
+    return f"/O=EXCHANGELABS/OU=EXCHANGE ADMINISTRATIVE GROUP/CN=RECIPIENTS/CN={address.split('@')[0].upper()}"
+
+
+def _sort_attribute(property_name: str) -> str:
+    name = property_name.strip("[]")
+    if name not in _COLUMN_ATTRIBUTES:
+        _fail(f"cannot sort on {property_name}", E_INVALIDARG)
+    return _COLUMN_ATTRIBUTES[name]
+
+
+def _sort_key(value):
+    # None sorts first, like an empty property does in outlook
+    return (value is not None, value if value is not None else 0)
+
+
+# the DASL subset OutlookQuery emits: comparisons, LIKE, IS [NOT] NULL, AND, OR, NOT and parentheses
+_TOKEN = re.compile(r"""\s*(?:(?P<schema>"[^"]*")|(?P<string>'(?:[^']|'')*')|(?P<operator><>|>=|<=|=|<|>)|(?P<paren>[()])|(?P<word>-?\w+))""")
+_DASL_DATE = "%m/%d/%Y %I:%M %p"
+
+
+def _tokenize(condition: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    condition = condition.rstrip()
+    while position < len(condition):
+        match = _TOKEN.match(condition, position)
+        if match is None:
+            _fail(f"cannot parse filter at '{condition[position:]}'", E_INVALIDARG)
+        tokens.append((match.lastgroup, match.group(match.lastgroup)))
+        position = match.end()
+    return tokens
+
+
+class _Parser(object):
+    """turns a DASL condition into a predicate over simulated items"""
+    def __init__(self, condition: str):
+        self._tokens = _tokenize(condition)
+        self._position = 0
+    def _peek(self) -> Tuple[Optional[str], Optional[str]]:
+        return self._tokens[self._position] if self._position < len(self._tokens) else (None, None)
+    def _next(self) -> Tuple[str, str]:
+        token = self._peek()
+        if token[0] is None:
+            _fail("unexpected end of filter", E_INVALIDARG)
+        self._position += 1
+        return token
+    def _keyword(self, word: str) -> bool:
+        kind, value = self._peek()
+        if kind == "word" and value.upper() == word:
+            self._position += 1
+            return True
+        return False
+    def parse(self) -> Callable[[SimulatedMailItem], bool]:
+        predicate = self._or()
+        if self._peek()[0] is not None:
+            _fail(f"unexpected '{self._peek()[1]}' in filter", E_INVALIDARG)
+        return predicate
+    def _or(self):
+        terms = [self._and()]
+        while self._keyword("OR"):
+            terms.append(self._and())
+        return terms[0] if len(terms) == 1 else (lambda item: any(term(item) for term in terms))
+    def _and(self):
+        terms = [self._not()]
+        while self._keyword("AND"):
+            terms.append(self._not())
+        return terms[0] if len(terms) == 1 else (lambda item: all(term(item) for term in terms))
+    def _not(self):
+        if self._keyword("NOT"):
+            term = self._not()
+            return lambda item: not term(item)
+        if self._peek() == ("paren", "("):
+            self._next()
+            term = self._or()
+            if self._next() != ("paren", ")"):
+                _fail("unbalanced parentheses in filter", E_INVALIDARG)
+            return term
+        return self._comparison()
+    def _comparison(self):
+        kind, schema = self._next()
+        if kind != "schema":
+            _fail(f"expected a quoted property name, got {schema}", E_INVALIDARG)
+        read = _reader(schema.strip('"'))
+        if self._keyword("IS"):
+            negated = self._keyword("NOT")
+            if not self._keyword("NULL"):
+                _fail("expected NULL", E_INVALIDARG)
+            return lambda item: (_values(read(item)) == []) != negated
+        if self._keyword("LIKE"):
+            pattern = re.compile(".*".join(re.escape(part) for part in _literal(self._next()).split("%")), re.IGNORECASE | re.DOTALL)
+            return lambda item: any(isinstance(value, str) and pattern.fullmatch(value) for value in _values(read(item)))
+        kind, operator = self._next()
+        if kind != "operator":
+            _fail(f"expected a comparison, got {operator}", E_INVALIDARG)
+        literal = _literal(self._next())
+        compare = _COMPARE[operator]
+        return lambda item: any(compare(*_comparable(value, literal)) for value in _values(read(item)))
+
+
+_COMPARE = {"=": lambda a, b: a == b, "<>": lambda a, b: a != b, ">": lambda a, b: a > b,
+            ">=": lambda a, b: a >= b, "<": lambda a, b: a < b, "<=": lambda a, b: a <= b}
+
+
+def _reader(schema: str) -> Callable[[SimulatedMailItem], Any]:
+    if schema in _DASL_READERS:
+        return _DASL_READERS[schema]
+    return lambda item: item._properties.get(schema)
+
+
+def _literal(token: Tuple[str, str]):
+    kind, value = token
+    if kind == "string":
+        return value[1:-1].replace("''", "'")
+    if kind == "word":
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    _fail(f"expected a value, got {value}", E_INVALIDARG)
+
+
+def _values(value) -> list:
+    """multi-valued properties match if any value does, missing ones never match"""
+    if value is None or value == "":
+        return []
+    return list(value) if isinstance(value, list) else [value]
+
+
+def _comparable(value, literal) -> tuple:
+    if isinstance(value, datetime):
+        # DASL dates are UTC to the minute, item dates are naive local time
+        value = value.astimezone(timezone.utc).replace(second=0, microsecond=0, tzinfo=None)
+        literal = datetime.strptime(literal, _DASL_DATE)
+    elif isinstance(value, bool):
+        value = int(value)
+    elif isinstance(value, str) and isinstance(literal, str):
+        # DASL string comparisons ignore case
+        value, literal = value.lower(), literal.lower()
+    elif isinstance(value, int) and isinstance(literal, str):
+        literal = int(literal)
+    return value, literal
+
+
+def _restrict(items: List[SimulatedMailItem], filter: str) -> List[SimulatedMailItem]:
+    if not filter.startswith("@SQL="):
+        # Jet syntax ("[UnRead] = True") isn't simulated, OutlookQuery only produces DASL
+        _fail(f"only DASL filters are simulated, got {filter}", E_INVALIDARG)
+    predicate = _Parser(filter[len("@SQL="):]).parse()
+    return [item for item in items if predicate(item)]
+
+
+class SimulatedBackend(object):
+    """The backend (see outlookbackend) for a SimulatedOutlook, events are delivered when the hooking thread pumps."""
+    name = "simulated"
+    def __init__(self, outlook: Optional[SimulatedOutlook] = None):
+        self.outlook = outlook if outlook is not None else SimulatedOutlook()
+        self._sources = weakref.WeakKeyDictionary() # sink to the object whose events it gets
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.outlook})"
+    def attach(self, timings: Optional[Dict[str, float]] = None) -> SimulatedApplication:
+        started = time.perf_counter()
+        application = self.outlook.application
+        if timings is not None:
+            timings["attach"] = time.perf_counter() - started
+        return application
+    def dispatch(self, com_object):
+        return com_object
+    def with_events(self, com_object, sink_class, arguments: Sequence):
+        # sinks are only weakly held, like pywin32's they stop receiving events once they are let go of
+        sink = sink_class.__new__(sink_class)
+        sink_class.__init__(sink, *arguments)
+        object.__getattribute__(com_object, "_connect")(sink)
+        self._sources[sink] = com_object
+        return sink
+    def unhook(self, sink):
+        source = self._sources.pop(sink, None)
+        if source is not None:
+            object.__getattribute__(source, "_disconnect")(sink)
+    def post_quit(self):
+        self.outlook._post_quit()
+    def initialize(self):
+        pass
+    def uninitialize(self):
+        pass
+    def marshal(self, com_object):
+        return com_object
+    def unmarshal(self, token):
+        return token
+    def create_wake(self) -> threading.Event:
+        return threading.Event()
+    def wake(self, handle: threading.Event):
+        self.outlook._wake(handle)
+    def wait(self, handles: Sequence[threading.Event], timeout: Optional[float]) -> Optional[int]:
+        return self.outlook._wait(handles, timeout)
+    def pump(self) -> bool:
+        return self.outlook._pump()
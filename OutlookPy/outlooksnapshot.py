@@ -0,0 +1,77 @@
+"""Detached, immutable records of outlook items that hold no COM references."""
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .outlookitem import OutlookItem
+
+# every field a snapshot can carry, entry_id and store_id are always filled in
+SNAPSHOT_FIELDS = ("entry_id", "store_id", "item_class", "subject", "sender", "received", "unread", "importance", "categories")
+
+
+def plain_datetime(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    A naive local datetime.datetime from whatever pywin32 hands back,
+    so the value pickles and compares without pywintypes on the other end.
+    """
+    if value is None:
+        return None
+    return datetime(value.year, value.month, value.day, value.hour, value.minute, value.second, value.microsecond)
+
+
+class OutlookItemSnapshot(object):
+    """
+    A compact, immutable copy of the commonly used fields of an item.
+    Snapshots are safe to keep, pickle, send to other threads or processes and compare,
+    because they hold plain python values only. rehydrate() fetches the live item again by EntryID.
+    Fields that weren't asked for when the snapshot was taken are None.
+    """
+    __slots__ = SNAPSHOT_FIELDS
+    def __init__(self, entry_id: str, store_id: Optional[str], item_class: Optional[int] = None, subject: Optional[str] = None,
+                 sender: Optional[str] = None, received: Optional[datetime] = None, unread: Optional[bool] = None,
+                 importance: Optional[int] = None, categories: Optional[Tuple[str, ...]] = None):
+        values = (entry_id, store_id, item_class, subject, sender, received, unread, importance, categories)
+        for field, value in zip(SNAPSHOT_FIELDS, values):
+            object.__setattr__(self, field, value)
+    def __setattr__(self, field, value):
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+    def __delattr__(self, field):
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+    def _values(self) -> Tuple:
+        return tuple(getattr(self, field) for field in SNAPSHOT_FIELDS)
+    def __reduce__(self):
+        # the default slots pickling would go through __setattr__
+        return (self.__class__, self._values())
+    def __eq__(self, other):
+        if not isinstance(other, OutlookItemSnapshot):
+            return NotImplemented
+        return self._values() == other._values()
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+    def __hash__(self):
+        return hash((self.entry_id, self.store_id))
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.subject!r}, {self.entry_id})"
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(zip(SNAPSHOT_FIELDS, self._values()))
+    def replace(self, **changes) -> "OutlookItemSnapshot":
+        values = self.as_dict()
+        for field in changes:
+            if field not in values:
+                raise TypeError(f"'{field}' is not a snapshot field")
+        values.update(changes)
+        return self.__class__(**values)
+    def rehydrate(self, session) -> "OutlookItem":
+        """
+        The live item again, looked up by EntryID and StoreID.
+        session is an OutlookPy or a MAPI Namespace belonging to the calling thread.
+        """
+        if hasattr(session, "item_from_id"):
+            return session.item_from_id(self.entry_id, self.store_id)
+        from .outlookitem import com_to_python
+        if self.store_id:
+            return com_to_python(session.GetItemFromID(self.entry_id, self.store_id))
+        return com_to_python(session.GetItemFromID(self.entry_id))
@@ -0,0 +1,129 @@
+"""Event subscriptions covering whole folder subtrees."""
+import logging
+from typing import Callable, Iterable, List
+
+from .outlookbackend import get_backend
+from .outlookasync import EVENT_KINDS
+from .outlookfolder import OutlookFolder
+from .outlookitem import com_to_python
+
+logger = logging.getLogger(__name__)
+
+
+class _SubscriptionItemEvents(object):
+    """event sink for one folder's Items, names are hard-wired for the exchange API"""
+    def __init__(self, subscription, folder):
+        self._subscription = subscription
+        self._subscribed_folder = folder
+    def OnItemAdd(self, item):
+        # wrap the item only when a handler is going to see it
+        if self._subscription._handlers.get("add"):
+            self._subscription._dispatch("add", self._subscribed_folder, com_to_python(item))
+    def OnItemChange(self, item):
+        if self._subscription._handlers.get("change"):
+            self._subscription._dispatch("change", self._subscribed_folder, com_to_python(item))
+    def OnItemRemove(self):
+        self._subscription._dispatch("remove", self._subscribed_folder)
+
+
+class _SubscriptionFolderEvents(object):
+    """event sink for one folder's Folders, so the subscription follows the tree as it changes"""
+    def __init__(self, subscription, folder):
+        self._subscription = subscription
+        self._subscribed_folder = folder
+    def OnFolderAdd(self, folder):
+        self._subscription._folder_added(self._subscribed_folder, folder)
+    def OnFolderRemove(self):
+        self._subscription._folder_removed(self._subscribed_folder)
+    def OnFolderChange(self, folder):
+        # a rename, the cached names of the parent are out of date
+        self._subscribed_folder.folders.invalidate()
+
+
+class OutlookSubscription(object):
+    """
+    One set of handlers listening to a folder and, with recursive=True, every folder below it,
+    including folders created after subscribing. Folders that are deleted are let go of.
+
+    Handlers are registered per kind with on(kind) and receive the originating OutlookFolder first:
+    handler(folder, item) for "add" and "change", handler(folder) for "remove".
+    As with folder handlers, a falsey result stops the remaining handlers.
+    Like every other event, this needs messages to be pumped (OutlookPy.listen_for_events).
+    """
+    def __init__(self, root: OutlookFolder, recursive: bool = True, kinds: Iterable[str] = ("add", "change")):
+        kinds = frozenset(kinds)
+        if not kinds <= EVENT_KINDS:
+            raise ValueError(f"{sorted(kinds - EVENT_KINDS)} are not event kinds, expected some of {sorted(EVENT_KINDS)}")
+        self._root = root
+        self._recursive = recursive
+        self._handlers = {kind: [] for kind in kinds}
+        self._folders = {} # entry id to OutlookFolder
+        self._sinks = {} # entry id to the sinks hooked for that folder
+        self._children = {} # entry id to the entry ids of subscribed sub folders
+        self._attach(root)
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._root.name}, {len(self._folders)} folders, {sorted(self._handlers)})"
+    def __len__(self):
+        return len(self._folders)
+    @property
+    def folders(self) -> List[OutlookFolder]:
+        return list(self._folders.values())
+    def on(self, kind: str):
+        """decorator registering a handler for one kind of event"""
+        if kind not in self._handlers:
+            raise ValueError(f"this subscription only listens for {sorted(self._handlers)}")
+        def decorator(callback: Callable):
+            self._handlers[kind].append(callback)
+            return callback
+        return decorator
+    def _attach(self, folder: OutlookFolder):
+        entry_id = folder.entry_id
+        if entry_id in self._folders:
+            return
+        backend = get_backend()
+        sinks = [backend.with_events(folder._folder.Items, _SubscriptionItemEvents, [self, folder])]
+        if self._recursive:
+            sinks.append(backend.with_events(folder._folder.Folders, _SubscriptionFolderEvents, [self, folder]))
+        self._folders[entry_id] = folder
+        self._sinks[entry_id] = sinks
+        self._children[entry_id] = set()
+        if self._recursive:
+            for name in folder.folders:
+                child = folder.folders[name]
+                self._attach(child)
+                self._children[entry_id].add(child.entry_id)
+    def _detach(self, entry_id: str):
+        for child_id in self._children.pop(entry_id, ()):
+            self._detach(child_id)
+        # closed rather than dropped, so outlook stops sending them events right away
+        backend = get_backend()
+        for sink in self._sinks.pop(entry_id, ()):
+            backend.unhook(sink)
+        self._folders.pop(entry_id, None)
+    def _dispatch(self, kind: str, folder: OutlookFolder, *args):
+        for handler in self._handlers.get(kind, ()):
+            try:
+                result = handler(folder, *args)
+                if not result: # if the response is falsey
+                    break # stop processing more rules/handlers
+            except Exception:
+                logger.exception("a handler for %s events of %s failed, stopping the message pump", kind, folder.name)
+                get_backend().post_quit()
+    def _folder_added(self, parent: OutlookFolder, com_folder):
+        parent.folders.invalidate()
+        child = parent.folders[com_folder.Name]
+        self._attach(child)
+        self._children[parent.entry_id].add(child.entry_id)
+    def _folder_removed(self, parent: OutlookFolder):
+        # outlook doesn't say which folder went away, so compare against what is there now
+        parent.folders.invalidate()
+        remaining = {sub_folder.EntryID for sub_folder in parent._folder.Folders}
+        parent_id = parent.entry_id
+        for child_id in list(self._children.get(parent_id, ())):
+            if child_id not in remaining:
+                self._children[parent_id].discard(child_id)
+                self._detach(child_id)
+    def unsubscribe(self):
+        """stop listening to every folder"""
+        self._detach(self._root.entry_id)
+        self._handlers = {kind: [] for kind in self._handlers}
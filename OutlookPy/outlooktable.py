@@ -0,0 +1,132 @@
+"""Columnar bulk reads over a folder's MAPI table."""
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .outlookfolder import OutlookFolder
+    from .outlookitem import OutlookItem
+
+# https://docs.microsoft.com/en-us/office/vba/api/outlook.oltablecontents
+OL_USER_ITEMS = 0
+
+# friendly column names mapped to the property names a Table accepts in Columns.Add
+# anything not in here is handed to Outlook untouched, so explicit built-in names
+#   ("SenderName") and DASL schema names ("http://schemas.microsoft.com/mapi/...") both work
+TABLE_COLUMNS = {
+    "entry_id": "EntryID",
+    "subject": "Subject",
+    "received": "ReceivedTime",
+    "unread": "UnRead",
+    "importance": "Importance",
+    "categories": "Categories",
+    "sender_name": "SenderName",
+    "sender_address": "SenderEmailAddress",
+    "message_class": "MessageClass",
+    "modified": "LastModificationTime",
+    "created": "CreationTime",
+    "size": "Size",
+    "preview": "urn:schemas:httpmail:textdescription", # the start of the plain text body, see outlookbody
+}
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class OutlookTableRow(object):
+    """
+    A single row of an OutlookTable.
+    Holds plain python values only, the COM item is fetched by EntryID when .item is asked for.
+    """
+    __slots__ = ("_folder", "_index", "_values")
+    def __init__(self, folder: "OutlookFolder", index: Dict[str, int], values: Sequence[Any]):
+        self._folder = folder
+        self._index = index
+        self._values = values
+    def __getitem__(self, column: str):
+        return self._values[self._index[column]]
+    def __getattr__(self, column: str):
+        try:
+            return self._values[self._index[column]]
+        except KeyError:
+            raise AttributeError(column)
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.as_dict()})"
+    @property
+    def entry_id(self) -> str:
+        return self._values[self._index["entry_id"]]
+    @property
+    def item(self) -> "OutlookItem":
+        """the full item wrapper, costs one COM lookup by EntryID"""
+        return self._folder._item_from_id(self.entry_id)
+    def as_dict(self) -> Dict[str, Any]:
+        return {column: self._values[position] for column, position in self._index.items()}
+
+
+class OutlookTable(object):
+    """
+    Bulk, read-only view of a folder built on Folder.GetTable.
+    Rows come back from Table.GetArray in chunks, so reading n rows of k columns costs
+    roughly n / chunk_size COM calls instead of n * k.
+    """
+    def __init__(self, folder: "OutlookFolder", columns: Sequence[str], where: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE, sort: Optional[Tuple[str, bool]] = None):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer")
+        self._folder = folder
+        self._columns = list(columns)
+        self._where = where
+        self._chunk_size = chunk_size
+        # (property, descending) as handed to Table.Sort
+        self._sort = sort
+        # the EntryID is always fetched so rows can be turned back into items
+        self._fetched = list(self._columns)
+        if "entry_id" not in self._fetched:
+            self._fetched.append("entry_id")
+        self._index = {column: position for position, column in enumerate(self._fetched)}
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._folder.name}, {self._columns})"
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+    def _open(self):
+        if self._where:
+            table = self._folder._folder.GetTable(self._where, OL_USER_ITEMS)
+        else:
+            table = self._folder._folder.GetTable()
+        if self._sort is not None:
+            table.Sort(*self._sort)
+        # every .Columns is a round trip, the collection is asked for once
+        columns = table.Columns
+        columns.RemoveAll()
+        for column in self._fetched:
+            columns.Add(TABLE_COLUMNS.get(column, column))
+        return table
+    def chunks(self) -> Iterator[List[Tuple]]:
+        """raw row tuples, in chunk_size batches, in the order of the fetched columns"""
+        table = self._open()
+        while not table.EndOfTable:
+            rows = table.GetArray(self._chunk_size)
+            if not rows:
+                break
+            yield [tuple(row) for row in rows]
+    def __iter__(self) -> Iterator[OutlookTableRow]:
+        for chunk in self.chunks():
+            for values in chunk:
+                yield OutlookTableRow(self._folder, self._index, values)
+    def entry_ids(self) -> List[str]:
+        position = self._index["entry_id"]
+        return [values[position] for chunk in self.chunks() for values in chunk]
+    def columnar(self, numpy: bool = False) -> Dict[str, Any]:
+        """
+        All rows as a dictionary of column name to column values.
+        With numpy=True each column is a numpy array instead of a list.
+        """
+        result = {column: [] for column in self._fetched}
+        for chunk in self.chunks():
+            for values in chunk:
+                for column, value in zip(self._fetched, values):
+                    result[column].append(value)
+        if numpy:
+            try:
+                import numpy as np
+            except ImportError:
+                raise ImportError("numpy is required for columnar(numpy=True)")
+            result = {column: np.asarray(values) for column, values in result.items()}
+        return result
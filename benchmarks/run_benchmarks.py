@@ -0,0 +1,152 @@
+"""
+Common OutlookPy workloads against the simulated Outlook, reporting wall time and COM round trips.
+Runs anywhere, no Windows or Outlook needed.
+
+    python benchmarks/run_benchmarks.py --items 5000 --latency 0.0001
+    python benchmarks/run_benchmarks.py --only sender --json results.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OutlookPy import OutlookPy, RuleEngine, BODY_CACHE, BODY_KEY_PROPERTIES
+from OutlookPy.outlookbackend import get_backend
+from OutlookPy.outlookcontact import ADDRESS_CACHE
+from OutlookPy.outlookitem import SENDER_RESOLVER, TRIAGE_PROPERTIES, com_to_python
+from OutlookPy.outlooksimulated import SimulatedBackend, SimulatedOutlook
+
+
+def startup(outlook, simulated):
+    # attaching only, the root folder and identity are looked up lazily
+    return len(OutlookPy(backend=get_backend()).startup_timings)
+
+def iterate_folder(outlook, simulated):
+    return sum(1 for _ in outlook.inbox)
+
+def index_folder(outlook, simulated):
+    inbox = outlook.inbox
+    return sum(1 for position in range(len(inbox)) if inbox[position] is not None)
+
+def wrap_items(outlook, simulated):
+    items = list(simulated.folder("Inbox")._items)
+    return sum(1 for item in items if com_to_python(item) is not None)
+
+def top_ten(outlook, simulated):
+    return len(outlook.inbox.top(10))
+
+def restricted_count(outlook, simulated):
+    return outlook.inbox.where(unread=True, sender__domain="vendor.com").count()
+
+def table_read(outlook, simulated):
+    return len(outlook.inbox.table(["subject", "received", "unread", "sender_address"]).columnar()["entry_id"])
+
+def sender_cold(outlook, simulated):
+    SENDER_RESOLVER.clear()
+    return sum(1 for item in outlook.inbox if item.sender)
+
+def sender_warm(outlook, simulated):
+    # resolved senders are cached across items, a second pass only reads sender entry ids
+    sum(1 for item in outlook.inbox if item.sender)
+    return sum(1 for item in outlook.inbox if item.sender)
+
+def sender_prefetched(outlook, simulated):
+    SENDER_RESOLVER.clear()
+    return sum(1 for item in outlook.inbox.iter(prefetch=TRIAGE_PROPERTIES) if item.sender)
+
+def recipients(outlook, simulated):
+    ADDRESS_CACHE.clear()
+    return sum(len(item.recipients) for item in outlook.inbox)
+
+def snapshots(outlook, simulated):
+    return sum(1 for _ in outlook.inbox.snapshots())
+
+def body_warm(outlook, simulated):
+    # bodies are cached under the prefetched EntryID and LastModificationTime,
+    #   the second pass costs one GetProperties per item and no Body
+    sum(len(item.body) for item in outlook.inbox.iter(prefetch=BODY_KEY_PROPERTIES))
+    return sum(len(item.body) for item in outlook.inbox.iter(prefetch=BODY_KEY_PROPERTIES))
+
+def previews(outlook, simulated):
+    # one table read gives every preview, item.preview afterwards doesn't read a body
+    previews = dict(outlook.inbox.previews(100))
+    return sum(1 for item in outlook.inbox if item.preview(100) == previews[item.entry_id])
+
+def event_dispatch(outlook, simulated):
+    inbox = outlook.inbox
+    received = []
+    @inbox.on_item_received()
+    def handler(mail):
+        received.append(mail.subject)
+        if mail.subject == "last":
+            get_backend().post_quit()
+        return True
+    inbox.hook_events(inbox.dispatch_events())
+    for number in range(200):
+        simulated.add_mail("Inbox", subject=f"event {number}")
+    simulated.add_mail("Inbox", subject="last")
+    outlook.listen_for_events()
+    return len(received)
+
+def rule_dispatch(outlook, simulated):
+    rules = RuleEngine()
+    for number in range(300):
+        rules.rule(sender=f"user{number}@nowhere.example")(lambda mail: True)
+    rules.rule(sender_domain="vendor.com", subject="(?i)invoice")(lambda mail: True)
+    for item in outlook.inbox:
+        rules(item)
+    return rules.items
+
+def bulk_flags(outlook, simulated):
+    inbox = outlook.inbox
+    return len(inbox.set_flags_many(inbox.where(unread=True), read=True).succeeded)
+
+WORKLOADS = {function.__name__: function for function in (
+    startup, iterate_folder, index_folder, wrap_items, top_ten, restricted_count, table_read, sender_cold, sender_warm,
+    sender_prefetched, recipients, snapshots, body_warm, previews, event_dispatch, rule_dispatch, bulk_flags)}
+
+
+def run(name: str, items: int, latency: float, seed: int) -> dict:
+    # every workload gets a fresh mailbox, so mutating ones don't affect the rest
+    simulated = SimulatedOutlook(latency=latency)
+    simulated.populate(items, seed=seed)
+    outlook = OutlookPy(backend=SimulatedBackend(simulated))
+    outlook.root # resolved up front so workloads only count their own calls
+    SENDER_RESOLVER.clear()
+    ADDRESS_CACHE.clear()
+    BODY_CACHE.clear()
+    simulated.reset_calls()
+    started = time.perf_counter()
+    result = WORKLOADS[name](outlook, simulated)
+    elapsed = time.perf_counter() - started
+    calls = simulated.total_calls
+    return {"workload": name, "items": items, "latency_s": latency, "result": result, "wall_s": round(elapsed, 4),
+            "com_calls": calls, "calls_per_item": round(calls / items, 2) if items else None,
+            "top_members": [f"{kind}.{member}: {count}" for (kind, member), count in simulated.calls.most_common(3)]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=2000, help="items in the simulated inbox")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds every COM call takes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", default=None, help="workloads to run, substrings of their names")
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    arguments = parser.parse_args()
+    names = [name for name in WORKLOADS if not arguments.only or any(part in name for part in arguments.only)]
+    results = []
+    print(f"{'workload':<20} {'wall s':>9} {'COM calls':>10} {'per item':>9}  busiest members")
+    for name in names:
+        result = run(name, arguments.items, arguments.latency, arguments.seed)
+        results.append(result)
+        print(f"{name:<20} {result['wall_s']:>9.4f} {result['com_calls']:>10} {result['calls_per_item']:>9}  {', '.join(result['top_members'])}")
+    if arguments.json:
+        with open(arguments.json, "w", encoding="utf-8") as json_file:
+            json.dump(results, json_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
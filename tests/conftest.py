@@ -0,0 +1,29 @@
+"""Fixtures running OutlookPy against the simulated Outlook, so the tests need neither Windows nor Outlook."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OutlookPy import OutlookPy, BODY_CACHE
+from OutlookPy.outlookbackend import use_backend
+from OutlookPy.outlookcontact import ADDRESS_CACHE
+from OutlookPy.outlookitem import SENDER_RESOLVER
+from OutlookPy.outlooksimulated import SimulatedBackend, SimulatedOutlook
+
+
+@pytest.fixture
+def simulated():
+    return SimulatedOutlook()
+
+
+@pytest.fixture
+def outlook(simulated):
+    # process wide caches would carry answers from one test's mailbox into the next
+    SENDER_RESOLVER.clear()
+    ADDRESS_CACHE.clear()
+    BODY_CACHE.clear()
+    previous = use_backend(SimulatedBackend(simulated))
+    yield OutlookPy()
+    use_backend(previous)
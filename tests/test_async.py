@@ -0,0 +1,38 @@
+import asyncio
+
+from OutlookPy.outlookasync import EventBridge
+
+
+def test_a_full_queue_still_ends_iteration(outlook, simulated):
+    async def run():
+        bridge = EventBridge(maxsize=1)
+        bridge.watch(outlook.inbox, kinds={"add"})
+        async with bridge:
+            simulated.add_mail(subject="first")
+            simulated.add_mail(subject="second")
+            while not bridge.dropped:
+                await asyncio.sleep(0.01)
+        # the stop sentinel found the queue full, the waiting event is still delivered and iteration ends
+        return [event.item.subject async for event in bridge], bridge.dropped
+    subjects, dropped = asyncio.run(asyncio.wait_for(run(), 5))
+    assert subjects == ["first"] and dropped == 1
+
+
+def test_stopping_leaves_the_loop_running(outlook):
+    async def run():
+        bridge = EventBridge()
+        bridge.watch(outlook.inbox)
+        ticks = 0
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+        ticker = asyncio.ensure_future(tick())
+        async with bridge:
+            await asyncio.sleep(0.01)
+            before = ticks
+        ticker.cancel()
+        return before, ticks, [event async for event in bridge]
+    before, after, events = asyncio.run(asyncio.wait_for(run(), 5))
+    assert after > before and events == []
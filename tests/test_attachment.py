@@ -0,0 +1,72 @@
+import os
+import threading
+
+from OutlookPy.outlookattachment import AttachmentStore, attachments_of
+
+
+def put_all(store, simulated, contents):
+    digests = []
+    for content in contents:
+        mail = simulated.add_mail(fire=False)
+        simulated.add_attachment(mail, "report.pdf", content, "application/pdf")
+        digests += [store.put(attachment) for attachment in attachments_of(mail, mail._entry_id)]
+    return digests
+
+
+def test_same_content_is_stored_once(outlook, simulated, tmp_path):
+    with AttachmentStore(str(tmp_path), trust_fingerprints=False) as store:
+        first, second, other = put_all(store, simulated, [b"quarterly", b"quarterly", b"different"])
+        assert first == second != other
+        # same name, size and type, different content, only the hash can tell
+        assert store.statistics()["files"] == 2 and store.content_hits == 1 and store.downloads == 3
+        assert store.total_size() == len(b"quarterly") + len(b"different")
+        with store.open(other) as stored:
+            assert stored[:] == b"different"
+
+
+def test_known_fingerprints_are_not_downloaded_again(outlook, simulated, tmp_path):
+    with AttachmentStore(str(tmp_path)) as store:
+        first, second = put_all(store, simulated, [b"quarterly", b"quarterly"])
+        assert first == second and store.fingerprint_hits == 1 and store.downloads == 1
+        assert simulated.saved_bytes == len(b"quarterly")
+        # a stored file that no longer has the size it was stored with isn't trusted
+        with open(store.path(first), "ab") as stored:
+            stored.write(b"!")
+        put_all(store, simulated, [b"quarterly"])
+        assert store.fingerprint_hits == 1 and store.downloads == 2
+
+
+def test_max_total_counts_what_is_stored(outlook, simulated, tmp_path):
+    with AttachmentStore(str(tmp_path), max_total=12, trust_fingerprints=False) as store:
+        assert put_all(store, simulated, [b"12345678", b"12345678", b"abcdefgh"])[2] is None
+        assert store.skipped == 1
+    # the running total starts from what an earlier session stored
+    with AttachmentStore(str(tmp_path), max_total=12) as store:
+        assert store.total_size() == 8
+
+
+def test_concurrent_puts_stay_under_max_total(outlook, simulated, tmp_path, monkeypatch):
+    attachments = []
+    for number in range(6):
+        mail = simulated.add_mail(fire=False)
+        simulated.add_attachment(mail, f"file{number}.txt", f"content {number}".encode())
+        attachments += attachments_of(mail, mail._entry_id)
+    # every put that got past the limit check waits here for the others, so they would all fit into the same room
+    arrived = threading.Barrier(len(attachments))
+    path = AttachmentStore.path
+    def waiting_path(store, digest):
+        try:
+            arrived.wait(0.2)
+        except threading.BrokenBarrierError:
+            pass
+        return path(store, digest)
+    with AttachmentStore(str(tmp_path), max_total=20) as store:
+        monkeypatch.setattr(AttachmentStore, "path", waiting_path)
+        threads = [threading.Thread(target=store.put, args=(attachment,)) for attachment in attachments]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert store.total_size() <= 20 and store.count() == 2 and store.skipped == 4
+        assert store._reserved == 0
+    assert sum(len(files) for _, _, files in os.walk(tmp_path / "objects")) == 2
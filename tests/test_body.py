@@ -0,0 +1,74 @@
+from OutlookPy import BODY_CACHE, BODY_KEY_PROPERTIES, BodyCache
+from OutlookPy.outlookitem import OutlookItem
+
+
+def test_bodies_cost_one_read_without_a_prefetched_key(outlook, simulated):
+    item = OutlookItem(simulated.add_mail(body="hello", fire=False))
+    simulated.reset_calls()
+    assert item.body == "hello" and item.body == "hello"
+    assert dict(simulated.calls) == {("SimulatedMailItem", "Body"): 2}
+    assert len(BODY_CACHE) == 0
+
+
+def test_prefetched_keys_serve_bodies_from_the_cache(outlook, simulated):
+    for number in range(3):
+        simulated.add_mail(body=f"hello {number}", fire=False)
+    inbox = outlook.inbox
+    assert [item.body for item in inbox.iter(prefetch=BODY_KEY_PROPERTIES)] == ["hello 0", "hello 1", "hello 2"]
+    simulated.reset_calls()
+    assert [item.body for item in inbox.iter(prefetch=BODY_KEY_PROPERTIES)] == ["hello 0", "hello 1", "hello 2"]
+    assert simulated.calls[("SimulatedMailItem", "Body")] == 0
+    assert simulated.calls[("SimulatedPropertyAccessor", "GetProperties")] == 3
+    # snapshots read the key along with everything else
+    item = inbox[0]
+    item.snapshot()
+    simulated.reset_calls()
+    assert item.body == "hello 0" and simulated.total_calls == 0
+
+
+def test_new_items_are_read_every_time(outlook, simulated):
+    drafts = [simulated.add_mail(body=body, fire=False) for body in ("first", "second")]
+    for draft in drafts:
+        draft._entry_id = ""
+    assert [OutlookItem(draft).prefetch(BODY_KEY_PROPERTIES).body for draft in drafts] == ["first", "second"]
+    assert len(BODY_CACHE) == 0
+
+
+def test_deleting_or_moving_discards_cached_bodies(outlook, simulated):
+    deleted, moved = [OutlookItem(simulated.add_mail(body="hello", fire=False)) for _ in range(2)]
+    assert deleted.body and moved.preview(2)
+    deleted.delete()
+    moved.move(outlook.root.find("Drafts"))
+    assert len(BODY_CACHE) == 0 and BODY_CACHE.bytes == 0
+
+
+def test_a_change_elsewhere_invalidates_the_cached_body(outlook, simulated):
+    mail = simulated.add_mail(body="hello", fire=False)
+    assert OutlookItem(mail).prefetch(BODY_KEY_PROPERTIES).body == "hello"
+    mail._modified = mail._modified.replace(year=2020)
+    mail._body = "changed by another client"
+    assert OutlookItem(mail).prefetch(BODY_KEY_PROPERTIES).body == "changed by another client"
+    assert BODY_CACHE.statistics()["misses"] == 2
+
+
+def test_previews_come_from_the_table_or_the_whole_body(outlook, simulated):
+    mail = simulated.add_mail(body="hello there", fire=False)
+    simulated.reset_calls()
+    # nothing cached yet, the start of one body can only be had by reading all of it
+    assert OutlookItem(mail).preview(5) == "hello"
+    assert simulated.calls[("SimulatedMailItem", "Body")] == 1
+    BODY_CACHE.clear()
+    assert dict(outlook.inbox.previews(5)) == {mail._entry_id: "hello"}
+    simulated.reset_calls()
+    assert OutlookItem(mail).preview(5) == "hello"
+    assert simulated.calls[("SimulatedMailItem", "Body")] == 0
+    assert simulated.calls[("SimulatedPropertyAccessor", "GetProperties")] == 1
+
+
+def test_the_cache_stays_under_its_byte_budget():
+    cache = BodyCache(max_bytes=1000, max_body_bytes=400)
+    for number in range(10):
+        cache.put(f"item {number}", "plain", None, "x" * 300)
+    cache.put("huge", "plain", None, "x" * 500)
+    assert cache.bytes <= 1000 and cache.evictions > 0
+    assert cache.get("huge", "plain", None) is None and cache.get("item 9", "plain", None) is not None
@@ -0,0 +1,45 @@
+def test_categories_in_another_order_are_not_saved_again(outlook, simulated):
+    same = simulated.add_mail(categories=["Billing", "Archived"], fire=False)
+    other = simulated.add_mail(categories=["Billing"], fire=False)
+    simulated.reset_calls()
+    result = outlook.inbox.set_flags_many(categories=["Archived", "Billing"])
+    assert result.succeeded == [other._entry_id] and result.skipped == 1
+    assert simulated.calls[("SimulatedMailItem", "Save")] == 1
+    assert other._categories == "Archived, Billing" and same._categories == "Billing, Archived"
+
+
+def test_move_many_reports_new_ids_and_failures(outlook, simulated):
+    mails = [simulated.add_mail(subject=f"mail {number}", fire=False) for number in range(5)]
+    gone = mails[0]._entry_id
+    simulated.remove(mails[0])
+    archive = outlook.root.find("Drafts")
+    progress = []
+    simulated.reset_calls()
+    result = outlook.inbox.move_many([mail._entry_id for mail in mails], archive, batch_size=2,
+                                     progress=lambda done, total: progress.append(done))
+    assert result.succeeded == [mail._entry_id for mail in mails[1:]]
+    assert [entry_id for entry_id, error in result.failed] == [gone] and not result
+    assert result.moved == {mail._entry_id: mail._entry_id for mail in mails[1:]}
+    assert progress == [2, 4, 5] and result.batches == 3
+    assert [item.subject for item in archive] == [f"mail {number}" for number in range(1, 5)]
+    # the session and store once, then a lookup and a move per item
+    assert simulated.calls[("SimulatedNamespace", "GetItemFromID")] == 5
+    assert simulated.calls[("SimulatedMailItem", "Move")] == 4
+
+
+def test_delete_many_keeps_going_past_any_error(outlook, simulated, monkeypatch):
+    from OutlookPy.outlooksimulated import SimulatedMailItem
+    for number in range(4):
+        simulated.add_mail(subject=f"mail {number}", fire=False)
+    delete = SimulatedMailItem.Delete
+    def flaky(item):
+        if object.__getattribute__(item, "_subject") == "mail 1":
+            raise ValueError("not this one")
+        delete(item)
+    monkeypatch.setattr(SimulatedMailItem, "Delete", flaky)
+    result = outlook.inbox.delete_many()
+    assert len(result.succeeded) == 3 and result.total == 4
+    [(entry_id, error)] = result.failed
+    assert isinstance(error, ValueError)
+    assert [item.subject for item in outlook.inbox] == ["mail 1"]
+    assert len(outlook.root.find("Deleted Items")) == 3
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
+from OutlookPy.outlookchanges import ChangeToken, FileTokenStore, SQLiteTokenStore, WATERMARK_OVERLAP
+
+
+def test_first_scan_reports_everything_as_added(outlook, simulated):
+    simulated.populate(5)
+    changes = outlook.inbox.changes_since()
+    assert changes.full and len(changes.added) == 5 and not changes.modified
+
+
+def test_modifications_inside_the_overlap_are_reported_again(outlook, simulated):
+    recent, settled, old = simulated.populate(3, start=datetime(2026, 1, 1))
+    inbox = outlook.inbox
+    watermark = datetime.now(timezone.utc)
+    token = ChangeToken(inbox.entry_id, watermark, [mail._entry_id for mail in (recent, settled, old)])
+    local = watermark.astimezone().replace(tzinfo=None)
+    recent._modified = local - WATERMARK_OVERLAP + timedelta(seconds=90)
+    settled._modified = local - WATERMARK_OVERLAP - timedelta(minutes=2)
+    changes = inbox.changes_since(token)
+    assert changes.modified == [recent._entry_id]
+    assert not changes.added and not changes.removed
+
+
+def test_additions_removals_and_moves(outlook, simulated):
+    kept, removed = simulated.populate(2, start=datetime(2026, 1, 1))
+    moved = simulated.add_mail("Drafts", received=datetime(2026, 1, 1), fire=False)
+    inbox = outlook.inbox
+    token = inbox.changes_since().token
+    simulated.remove(removed)
+    added = simulated.add_mail(subject="new")
+    moved.Move(simulated.folder("Inbox"))
+    changes = inbox.changes_since(token)
+    assert changes.removed == [removed._entry_id]
+    assert set(changes.added) == {added._entry_id, moved._entry_id}
+    assert changes.token.entry_ids == {kept._entry_id, added._entry_id, moved._entry_id}
+
+
+def test_tokens_round_trip(tmp_path):
+    token = ChangeToken("FOLDER", datetime(2026, 3, 1, 10, 30, tzinfo=timezone.utc), ["A", "B"])
+    file_store = FileTokenStore(str(tmp_path / "tokens.json"))
+    file_store.save(token)
+    assert file_store.load("FOLDER") == token
+    sqlite_store = SQLiteTokenStore(str(tmp_path / "tokens.sqlite"))
+    sqlite_store.save(token)
+    assert sqlite_store.load("FOLDER") == token
+    sqlite_store.delete("FOLDER")
+    assert sqlite_store.load("FOLDER") is None
+    sqlite_store.close()
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from OutlookPy.outlookcontact import ADDRESS_CACHE, AddressCache, OutlookContact
+
+
+def test_known_items_cost_no_call_per_recipient(outlook, simulated):
+    simulated.add_mail(recipients=[f"person{number}@example.com" for number in range(5)])
+    first = outlook.inbox[0].recipients
+    simulated.reset_calls()
+    again = outlook.inbox[0].recipients
+    assert again == first and ADDRESS_CACHE.item_hits == 1
+    assert simulated.calls[("SimulatedRecipient", "EntryID")] == 0
+
+
+def test_changed_items_read_their_recipients_again(outlook, simulated):
+    mail = simulated.add_mail(recipients=["a@example.com"], received=datetime(2026, 1, 1))
+    assert [contact.address for contact in outlook.inbox[0].recipients] == ["a@example.com"]
+    mail._recipients = ("a@example.com", "b@example.com")
+    simulated.change(mail, subject="edited")
+    assert [contact.address for contact in outlook.inbox[0].recipients] == ["a@example.com", "b@example.com"]
+    # a was known, only b went to exchange
+    assert ADDRESS_CACHE.hits == 1
+
+
+def test_contacts_are_kept_per_store():
+    cache = AddressCache()
+    cache.put("ABC", OutlookContact.detached("A", "a@one.example", True), "store one")
+    assert cache.get("ABC", "store two") is None
+    assert cache.get("ABC", "store one").address == "a@one.example"
@@ -0,0 +1,54 @@
+from datetime import datetime
+import json
+
+import pytest
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupt_after(chunks):
+    def progress(written, total):
+        progress.calls += 1
+        if progress.calls == chunks:
+            raise Interrupted
+    progress.calls = 0
+    return progress
+
+
+@pytest.mark.parametrize("chunks", [1, 2, 3])
+def test_a_resumed_export_writes_every_item_once(outlook, simulated, tmp_path, chunks):
+    dated = simulated.populate(3, start=datetime(2026, 1, 1))
+    dated += [simulated.add_mail(subject=f"same minute {number}", received=datetime(2026, 2, 1, 9, 30, number), fire=False)
+              for number in range(2)]
+    drafts = [simulated.add_mail(subject=f"draft {number}", fire=False) for number in range(2)]
+    for draft in drafts:
+        draft._received = None
+    path = str(tmp_path / "inbox.jsonl")
+    with pytest.raises(Interrupted):
+        outlook.inbox.export(path, fields=["subject", "received"], chunk_size=2, progress=interrupt_after(chunks))
+    totals = []
+    result = outlook.inbox.export(path, fields=["subject", "received"], chunk_size=2,
+                                  progress=lambda written, total: totals.append(total))
+    assert result.complete and result.resumed_from == 2 * chunks
+    assert set(totals) == {7} and result.written == 7
+    with open(path, encoding="utf-8") as exported:
+        entry_ids = [json.loads(line)["entry_id"] for line in exported]
+    assert sorted(entry_ids) == sorted(item._entry_id for item in dated + drafts)
+
+
+def test_exports_without_received_still_checkpoint_by_minute(outlook, simulated, tmp_path):
+    simulated.populate(5, start=datetime(2026, 1, 1))
+    path = str(tmp_path / "inbox.jsonl")
+    with pytest.raises(Interrupted):
+        outlook.inbox.export(path, fields=["subject"], chunk_size=2, progress=interrupt_after(1))
+    with open(path + ".checkpoint", encoding="utf-8") as checkpoint:
+        state = json.load(checkpoint)
+    # the received time orders and places items even when it isn't written out
+    assert state["minute"] is not None and state["undated_ids"] == [] and len(state["minute_ids"]) == 1
+    result = outlook.inbox.export(path, fields=["subject"], chunk_size=2)
+    assert result.complete and result.written == 5
+    with open(path, encoding="utf-8") as exported:
+        records = [json.loads(line) for line in exported]
+    assert all(set(record) == {"entry_id", "subject"} for record in records)
@@ -0,0 +1,59 @@
+import pytest
+
+
+def test_views_read_the_count_once(outlook, simulated):
+    simulated.populate(20)
+    view = outlook.inbox[2:12:3]
+    simulated.reset_calls()
+    subjects = [item.subject for item in view]
+    assert len(view) == 4 and view[-1].subject == subjects[-1]
+    assert [item.subject for item in view[1:3]] == subjects[1:3]
+    assert simulated.calls[("SimulatedItems", "Count")] == 1
+    with pytest.raises(IndexError):
+        view[4]
+
+
+def test_views_match_list_slicing(outlook, simulated):
+    simulated.populate(10)
+    subjects = [item.subject for item in outlook.inbox]
+    for key in (slice(None), slice(3, None), slice(-4, -1), slice(None, None, -2), slice(8, 2, -3)):
+        assert [item.subject for item in outlook.inbox[key]] == subjects[key]
+
+
+def test_paths_resolve_only_the_folders_along_them(outlook, simulated):
+    simulated.add_folder("Inbox/Projects/2026")
+    simulated.add_folder("Inbox/Archive")
+    root = outlook.root
+    simulated.reset_calls()
+    folder = root.find("Inbox/Projects/2026")
+    assert folder.name == "2026"
+    # one lookup by name per level, no listing of siblings and no Items
+    assert simulated.calls[("SimulatedFolders", "Item")] == 3
+    assert simulated.calls[("SimulatedFolder", "Items")] == 0
+    simulated.reset_calls()
+    assert root.find("Inbox\\Projects/2026") is folder and simulated.total_calls == 0
+    with pytest.raises(KeyError, match="no folder 'Missing' in 'Projects'"):
+        root.find("Inbox/Projects/Missing")
+
+
+def test_prefetched_folders_cost_nothing_later(outlook, simulated):
+    simulated.add_folder("Inbox/Projects")
+    root = outlook.root
+    root.prefetch_folders(depth=2)
+    simulated.reset_calls()
+    assert root.folders["Inbox"].folders["Projects"].name == "Projects"
+    assert simulated.total_calls == 1 # the name, wrappers are cached
+    simulated.add_folder("Inbox/Later")
+    inbox = root.folders["Inbox"]
+    assert "Later" not in list(inbox.folders)
+    inbox.folders.invalidate()
+    assert "Later" in list(inbox.folders) and inbox.folders["Projects"] is root.folders["Inbox"].folders["Projects"]
+
+
+def test_profiling_a_folder_leaves_its_lazy_items_working(outlook, simulated):
+    simulated.add_mail(subject="hello", fire=False)
+    inbox = outlook.inbox
+    with outlook.profile() as profiler:
+        assert [item.subject for item in inbox] == ["hello"]
+    assert profiler.by_member()["Items"].count == 1
+    assert [item.subject for item in outlook.inbox] == ["hello"]
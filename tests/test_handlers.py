@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from OutlookPy.outlookhandlers import ChangeCoalescer, HandlerPool, flush_due_coalescers
+from OutlookPy.outlookitem import OutlookItem
+from OutlookPy.outlookrules import Rule, RuleEngine
+
+
+def keep(item):
+    return True
+
+
+def test_process_pools_refuse_handlers_they_cant_pickle(outlook):
+    inbox = outlook.inbox
+    inbox.on_item_received()(lambda item: True)
+    with HandlerPool(1, kind="process") as pool:
+        with pytest.raises(TypeError, match="pickled"):
+            inbox.use_handler_pool(pool)
+        inbox._attached_handlers["add"].clear()
+        inbox.on_item_received()(keep)
+        inbox.use_handler_pool(pool)
+        with pytest.raises(TypeError):
+            inbox.use_rules(RuleEngine([Rule(lambda item: True, sender_domain="example.com")]))
+        with pytest.raises(TypeError):
+            inbox.on_item_changed(coalesce=1.0)(keep)
+        inbox.use_handler_pool(None)
+
+
+def test_events_without_handlers_read_nothing(outlook, simulated):
+    inbox = outlook.inbox
+    mail = simulated.add_mail(fire=False)
+    with HandlerPool(1) as pool:
+        inbox.use_handler_pool(pool)
+        simulated.reset_calls()
+        inbox.OnItemAdd(mail)
+        inbox.OnItemChange(mail)
+        assert simulated.total_calls == 0 and pool.submitted == 0
+        inbox.use_handler_pool(None)
+
+
+def test_dispatch_unread_runs_on_the_folders_pool(outlook, simulated):
+    inbox = outlook.inbox
+    simulated.add_mail(subject="read", unread=False)
+    simulated.add_mail(subject="first")
+    simulated.add_mail(subject="second")
+    seen = []
+    @inbox.on_item_received()
+    def note(item):
+        seen.append((type(item).__name__, item.subject))
+        return False
+    @inbox.on_item_received()
+    def never(item):
+        seen.append(("never", item.subject))
+    with HandlerPool(1) as pool:
+        inbox.use_handler_pool(pool)
+        inbox.dispatch_unread()
+        pool.join()
+        inbox.use_handler_pool(None)
+    # snapshots, like live events on a pooled folder, and the chain still stops at a falsy answer
+    assert sorted(seen) == [("OutlookItemSnapshot", "first"), ("OutlookItemSnapshot", "second")]
+
+
+def test_coalescers_merge_changes_per_item(outlook, simulated):
+    first, second = simulated.add_mail(subject="first", fire=False), simulated.add_mail(subject="second", fire=False)
+    batches = []
+    coalescer = ChangeCoalescer(batches.append, 60)
+    for mail in (first, second, first, first):
+        coalescer(OutlookItem(mail))
+    assert not batches and coalescer.merged == 2
+    # nothing is due for another minute
+    assert flush_due_coalescers() > 0 and not batches
+    coalescer.flush()
+    assert [[item.subject for item in batch] for batch in batches] == [["first", "second"]]
+    assert coalescer.statistics() == {"raw": 4, "delivered": 2, "merged": 2, "batches": 1}
+    coalescer.flush()
+    assert len(batches) == 1
+
+
+def test_full_and_due_windows_are_delivered(outlook, simulated):
+    mails = [simulated.add_mail(fire=False) for _ in range(3)]
+    batches = []
+    coalescer = ChangeCoalescer(batches.append, 0.01, max_batch=2)
+    for mail in mails:
+        coalescer(OutlookItem(mail))
+    assert [len(batch) for batch in batches] == [2]
+    time.sleep(0.02)
+    assert flush_due_coalescers() is None
+    assert [len(batch) for batch in batches] == [2, 1] and coalescer.batches == 2
+
+
+def test_coalesced_batches_of_pooled_folders_run_on_the_pool(outlook, simulated):
+    inbox = outlook.inbox
+    mail = simulated.add_mail(fire=False)
+    threads = []
+    @inbox.on_item_changed(coalesce=0.01)
+    def changed(items):
+        threads.append(threading.current_thread().name)
+        return True
+    with HandlerPool(1) as pool:
+        inbox.use_handler_pool(pool)
+        inbox._run_handlers("change", OutlookItem(mail))
+        pool.join()
+        time.sleep(0.02)
+        flush_due_coalescers()
+        pool.join()
+        inbox.use_handler_pool(None)
+    assert len(threads) == 1 and threads[0].startswith("outlookpy-handler")
+    assert inbox.coalescers[0].statistics()["delivered"] == 1
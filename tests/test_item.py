@@ -0,0 +1,34 @@
+import pytest
+
+from OutlookPy.outlookitem import PR_STORE_ENTRYID, SENDER_ENTRY_IDS, SENDER_PROPERTIES, com_error
+
+PROPERTIES = [PR_STORE_ENTRYID, *SENDER_ENTRY_IDS, *SENDER_PROPERTIES]
+
+
+def test_prefetch_reads_every_property_in_one_call(outlook, simulated):
+    simulated.add_mail(subject="smtp", sender="smtp@example.com")
+    simulated.add_mail(subject="exchange", sender="exchange@example.com", sender_type="EX")
+    items = list(outlook.inbox)
+    simulated.reset_calls()
+    for item in items:
+        item.prefetch(PROPERTIES)
+    assert simulated.calls[("SimulatedPropertyAccessor", "GetProperties")] == 2
+    assert simulated.total_calls == 4
+    simulated.reset_calls()
+    assert [item.sender for item in items] == ["smtp@example.com", "exchange@example.com"]
+    assert all(item._store_id() == simulated.store_id for item in items)
+    # prefetching what is already there doesn't go back to outlook either
+    for item in items:
+        item.prefetch(PROPERTIES)
+    assert simulated.total_calls == 0
+
+
+def test_prefetched_misses_fail_without_asking_again(outlook, simulated):
+    simulated.add_mail(sender="smtp@example.com")
+    item = outlook.inbox[0]
+    unknown = "http://schemas.microsoft.com/mapi/proptag/0x7FFF001F"
+    item.prefetch([unknown])
+    simulated.reset_calls()
+    with pytest.raises(com_error):
+        item._get_property(unknown)
+    assert simulated.total_calls == 0
@@ -0,0 +1,63 @@
+from datetime import datetime
+import time
+
+from OutlookPy.outlookhandlers import HandlerPool, flush_due_coalescers
+from OutlookPy.outlookitem import OutlookItem
+
+
+def test_follow_copies_items_pooled_handlers_saw(outlook, simulated, tmp_path):
+    inbox = outlook.inbox
+    mirror = outlook.mirror(str(tmp_path / "mirror.sqlite"), folders=[inbox])
+    with HandlerPool(2) as pool:
+        inbox.use_handler_pool(pool)
+        mirror.follow()
+        mail = simulated.add_mail(subject="quarterly report", body="the overdue invoice", fire=False)
+        inbox._run_handlers("add", OutlookItem(mail))
+        pool.join()
+    # written by the thread owning the connection, with the body read from the live item
+    mirror.flush()
+    assert [result.entry_id for result in mirror.search("overdue")] == [mail._entry_id]
+    mirror.close()
+
+
+def test_sync_runs_from_the_pump(outlook, simulated, tmp_path):
+    mirror = outlook.mirror(str(tmp_path / "mirror.sqlite"))
+    mirror.follow(sync_every=0.01)
+    simulated.add_mail(subject="hello", fire=False)
+    time.sleep(0.02)
+    flush_due_coalescers()
+    assert len(mirror) == 1
+    mirror.close()
+
+
+def test_a_move_between_mirrored_folders_keeps_the_item(outlook, simulated, tmp_path):
+    mail = simulated.add_mail(subject="moving", received=datetime(2026, 1, 1), fire=False)
+    drafts = outlook.root.find("Drafts")
+    mirror = outlook.mirror(str(tmp_path / "mirror.sqlite"), folders=[drafts, outlook.inbox])
+    mirror.sync()
+    mail.Move(simulated.folder("Drafts"))
+    # drafts sees the item arrive before the inbox reports it gone
+    mirror.sync()
+    [result] = mirror.search()
+    assert result.entry_id == mail._entry_id and result.folder_id == drafts.entry_id
+    mirror.close()
+
+
+def test_following_twice_copies_once_and_close_unhooks_every_folder(outlook, simulated, tmp_path):
+    inbox, drafts = outlook.inbox, outlook.root.find("Drafts")
+    @inbox.on_item_received()
+    def stop(item):
+        return False
+    mirror = outlook.mirror(str(tmp_path / "mirror.sqlite"), folders=[inbox, drafts])
+    mirror.follow()
+    mirror.follow()
+    assert [len(folder._attached_handlers["add"]) for folder in (inbox, drafts)] == [2, 1]
+    mail = simulated.add_mail(subject="hello", fire=False)
+    inbox._run_handlers("add", OutlookItem(mail))
+    inbox._run_handlers("change", OutlookItem(mail))
+    [copy] = [handler for handler in inbox._attached_handlers["change"]]
+    mirror.flush()
+    assert len(mirror) == 1 and copy.raw == 2 and copy.delivered == 1
+    mirror.close()
+    assert inbox._attached_handlers["add"] == [stop]
+    assert not drafts._attached_handlers["add"] and not inbox._attached_handlers["change"]
@@ -0,0 +1,12 @@
+def test_every_call_of_an_iteration_is_recorded(outlook, simulated):
+    for number in range(3):
+        simulated.add_mail(subject=f"mail {number}", fire=False)
+    inbox = outlook.inbox
+    simulated.reset_calls()
+    with outlook.profile() as profiler:
+        assert [item.subject for item in inbox] == ["mail 0", "mail 1", "mail 2"]
+    members = profiler.by_member()
+    # the items iteration hands out are read for their Class before they are wrapped
+    assert members["Class"].count == 3 and members["Subject"].count == 3
+    assert profiler.count == simulated.total_calls
+    assert all(type(item._internal_item).__name__ == "SimulatedMailItem" for item in inbox)
@@ -0,0 +1,74 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+from OutlookPy.outlookquery import compile_lookup, _format_date
+
+
+def test_format_date_is_utc_to_the_minute():
+    assert _format_date(datetime(2026, 3, 1, 10, 30, 45)) == _format_date(datetime(2026, 3, 1, 10, 30))
+    assert _format_date(datetime(2026, 3, 1, 10, 30, tzinfo=timezone.utc)) == "'03/01/2026 10:30 AM'"
+    assert _format_date(date(2026, 3, 1)) == _format_date(datetime(2026, 3, 1))
+    with pytest.raises(TypeError):
+        _format_date("yesterday")
+
+
+def test_lookups_compile_to_dasl():
+    assert compile_lookup("subject__contains", "it's") == '"urn:schemas:httpmail:subject" LIKE \'%it\'\'s%\''
+    assert compile_lookup("unread", True) == '"urn:schemas:httpmail:read" = 0'
+    assert compile_lookup("sender__domain", "@example.com").endswith("LIKE '%@example.com'")
+    assert compile_lookup("importance__in", [0, 2]).count(" OR ") == 1
+    assert compile_lookup("received", None).endswith("IS NULL")
+
+
+def test_bad_lookups_raise():
+    with pytest.raises(ValueError):
+        compile_lookup("unread", None)
+    with pytest.raises(ValueError):
+        compile_lookup("unread__gt", True)
+    with pytest.raises(ValueError):
+        compile_lookup("nothing", 1)
+    with pytest.raises(ValueError):
+        compile_lookup("size__contains", 1)
+
+
+@pytest.mark.parametrize("lookup, expected", [
+    ("received__gt", ["10:31"]),
+    ("received__gte", ["10:30", "10:30:50", "10:31"]),
+    ("received__lt", ["10:29:59"]),
+    ("received__lte", ["10:29:59", "10:30", "10:30:50"]),
+    ("received", ["10:30", "10:30:50"]),
+    ("received__ne", ["10:29:59", "10:31"]),
+])
+def test_dates_compare_to_the_minute(outlook, simulated, lookup, expected):
+    times = {"10:29:59": (10, 29, 59), "10:30": (10, 30, 0), "10:30:50": (10, 30, 50), "10:31": (10, 31, 0)}
+    for subject, (hour, minute, second) in times.items():
+        simulated.add_mail(subject=subject, received=datetime(2026, 3, 1, hour, minute, second))
+    matched = outlook.inbox.where(**{lookup: datetime(2026, 3, 1, 10, 30, 45)})
+    assert sorted(item.subject for item in matched) == expected
+
+
+def test_combined_queries_keep_the_left_order(outlook, simulated):
+    for number in range(4):
+        simulated.add_mail(subject=f"mail {number}", received=datetime(2026, 3, 1, 10, number), importance=number % 3)
+    inbox = outlook.inbox
+    newest = inbox.where(importance=1).sorted("received", reverse=True)
+    combined = newest | inbox.where(importance=0)
+    assert [item.subject for item in combined] == ["mail 3", "mail 1", "mail 0"]
+    assert [item.subject for item in ~inbox.where(importance=2).sorted("received", reverse=True)] == ["mail 3", "mail 1", "mail 0"]
+
+
+def test_top_and_head_fetch_only_what_they_return(outlook, simulated):
+    mails = simulated.populate(50, start=datetime(2026, 1, 1))
+    inbox = outlook.inbox
+    newest = sorted(mails, key=lambda mail: mail._received, reverse=True)
+    simulated.reset_calls()
+    top = inbox.top(5)
+    # Items, Sort, GetFirst, four GetNext and one Class per wrapped item
+    assert simulated.total_calls == 2 * 5 + 2
+    assert [item.entry_id for item in top] == [mail._entry_id for mail in newest[:5]]
+    simulated.reset_calls()
+    assert inbox.head(0) == [] and simulated.total_calls == 0
+    oldest = inbox.sorted("received").head(3)
+    assert [item.entry_id for item in oldest] == [mail._entry_id for mail in newest[::-1][:3]]
+    assert simulated.calls[("SimulatedItems", "GetNext")] == 2
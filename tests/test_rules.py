@@ -0,0 +1,20 @@
+from OutlookPy.outlookitem import OutlookItem
+from OutlookPy.outlookrules import Rule, RuleEngine
+
+
+def matched(engine, simulated, subject):
+    item = OutlookItem(simulated.add_mail(subject=subject, fire=False))
+    return [rule.name for rule in engine.matching(item)]
+
+
+def test_subject_patterns_keep_their_groups_and_flags(outlook, simulated):
+    engine = RuleEngine([
+        Rule(print, subject=r"(\w+) \1", name="repeated"),
+        Rule(print, subject="(?i)invoice", name="invoice"),
+        Rule(print, subject="report", name="report"),
+        Rule(print, subject="summary", name="summary"),
+    ])
+    assert matched(engine, simulated, "hello hello") == ["repeated"]
+    assert matched(engine, simulated, "INVOICE 12") == ["invoice"]
+    assert matched(engine, simulated, "Report") == []
+    assert matched(engine, simulated, "weekly summary report") == ["report", "summary"]
@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from OutlookPy.outlookscan import plan_units
+
+
+def entry_id(item):
+    return item.entry_id
+
+
+def test_split_folders_keep_items_without_a_received_time(outlook, simulated):
+    dated = simulated.populate(9, start=datetime(2026, 1, 1))
+    drafts = [simulated.add_mail(subject=f"draft {number}", fire=False) for number in range(3)]
+    for draft in drafts:
+        draft._received = None
+    units = plan_units([outlook.inbox], recursive=False, unit_size=4)
+    assert len(units) > 2 and units[-1].undated and units[-1].expected == 3
+    scanned = list(outlook.scan([outlook.inbox], entry_id, processes=0, recursive=False, unit_size=4))
+    assert sorted(scanned) == sorted(item._entry_id for item in dated + drafts)
@@ -0,0 +1,56 @@
+from OutlookPy.outlookitem import SENDER_PROPERTIES, SENDER_PROPERTY_KEYS, SENDER_RESOLVER
+from OutlookPy.outlooksender import SenderResolver
+
+
+def test_delegates_resolve_to_who_they_sent_for(outlook, simulated):
+    simulated.add_mail(subject="own", sender="assistant@example.com")
+    simulated.add_mail(subject="for boss", sender="assistant@example.com", on_behalf_of="boss@example.com")
+    simulated.add_mail(subject="for cfo", sender="assistant@example.com", on_behalf_of="cfo@example.com")
+    simulated.add_mail(subject="own again", sender="assistant@example.com")
+    simulated.add_mail(subject="boss again", sender="assistant@example.com", on_behalf_of="boss@example.com")
+    senders = {item.subject: item.sender for item in outlook.inbox}
+    assert senders == {"own": "assistant@example.com", "for boss": "boss@example.com", "for cfo": "cfo@example.com",
+                       "own again": "assistant@example.com", "boss again": "boss@example.com"}
+    assert SENDER_RESOLVER.cache_hits == 2
+
+
+def test_answers_do_not_depend_on_earlier_traffic(outlook, simulated):
+    # exchange senders only answer from the second property, which used to move it ahead of the first for everyone
+    for number in range(20):
+        simulated.add_mail(sender=f"user{number}@example.com", sender_type="EX")
+    simulated.add_mail(subject="delegate", sender="assistant@example.com", on_behalf_of="boss@example.com")
+    assert [item.sender for item in outlook.inbox if item.subject == "delegate"] == ["boss@example.com"]
+
+
+def test_properties_that_usually_miss_are_read_with_the_next_one(outlook, simulated):
+    for number in range(10):
+        simulated.add_mail(sender=f"user{number}@example.com", sender_type="EX")
+    assert all(item.sender for item in outlook.inbox)
+    first_batch = SENDER_RESOLVER.batches("mail")[0]
+    assert first_batch == SENDER_PROPERTIES[:2]
+    simulated.add_mail(sender="late@example.com", sender_type="EX")
+    item = outlook.inbox[-1]
+    simulated.reset_calls()
+    assert item.sender == "late@example.com"
+    # one call for both entry ids, one for the first two probes
+    assert simulated.calls[("SimulatedPropertyAccessor", "GetProperties")] == 2
+
+
+def test_answers_from_sender_properties_are_found_again(outlook):
+    # the sent representing properties hold no SMTP address, so a PR_SENDER_* property answers,
+    # while the sent representing entry id still names a different address entry
+    resolver = SenderResolver(SENDER_PROPERTIES, SENDER_PROPERTY_KEYS)
+    representing, sender = resolver.entry_id_properties
+    answering = next(schema for schema in SENDER_PROPERTIES if SENDER_PROPERTY_KEYS[schema] == sender)
+    reads = []
+    def read(batch):
+        reads.append(batch)
+        return {schema: "assistant@example.com" if schema == answering else None for schema in batch}
+    entry_ids = {representing: "B055", sender: "A551"}
+    assert resolver.resolve("mail", read, entry_ids) == "assistant@example.com"
+    read_before = len(reads)
+    assert resolver.resolve("mail", read, dict(entry_ids)) == "assistant@example.com"
+    assert len(reads) == read_before and resolver.cache_hits == 1
+    # the same delegate sending for someone else is resolved again rather than taken from the cache
+    assert resolver.resolve("mail", read, {representing: "C0FF", sender: "A551"}) == "assistant@example.com"
+    assert len(reads) > read_before and resolver.cache_hits == 1
@@ -0,0 +1,54 @@
+import threading
+import time
+
+import pytest
+
+
+def test_map_rebinds_every_item_on_a_worker(outlook, simulated):
+    simulated.populate(12)
+    items = list(outlook.inbox)
+    subjects = [item.subject for item in items]
+    simulated.reset_calls()
+    with outlook.session_pool(workers=3) as pool:
+        threads = set()
+        def read(item):
+            threads.add(threading.current_thread().name)
+            return item.subject
+        assert list(pool.map(read, items)) == subjects
+        assert sorted(pool.map(read, items, ordered=False)) == sorted(subjects)
+        statistics = pool.statistics()
+    assert threads and all(name.startswith("outlookpy-session") for name in threads)
+    assert statistics["submitted"] == statistics["completed"] == 24 and statistics["failed"] == 0
+    assert sum(statistics["per_session"].values()) == 24
+    # each item is looked up once per map by EntryID, which is read once on the calling thread
+    assert simulated.calls[("SimulatedNamespace", "GetItemFromID")] == 24
+    assert simulated.calls[("SimulatedMailItem", "EntryID")] == 24
+
+
+def test_no_more_than_max_concurrent_tasks_talk_to_outlook(outlook, simulated):
+    lock = threading.Lock()
+    running = [0, 0] # now, most at once
+    def task(session):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+    with outlook.session_pool(workers=4, max_concurrent=2) as pool:
+        for future in [pool.submit(task) for _ in range(12)]:
+            future.result()
+    assert running[1] <= 2
+
+
+def test_failures_are_counted_and_raised(outlook):
+    with outlook.session_pool(workers=2) as pool:
+        with pytest.raises(ZeroDivisionError):
+            pool.submit(lambda session: 1 / 0).result()
+        assert pool.statistics()["failed"] == 1
+        with pytest.raises(RuntimeError):
+            pool.session()
+    with pytest.raises(RuntimeError, match="closed"):
+        pool.submit(lambda session: None)
+    with pytest.raises(ValueError):
+        outlook.session_pool(workers=0)
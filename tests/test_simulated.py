@@ -0,0 +1,23 @@
+import pytest
+
+from OutlookPy.outlookbackend import com_error
+
+
+def test_member_access_is_counted(outlook, simulated):
+    simulated.add_mail(subject="hello")
+    simulated.reset_calls()
+    assert [item.subject for item in outlook.inbox] == ["hello"]
+    assert simulated.calls[("SimulatedMailItem", "Subject")] == 1
+
+
+def test_restrict_parses_dasl(simulated):
+    simulated.add_mail(subject="Invoice 12")
+    simulated.add_mail(subject="lunch")
+    items = simulated.folder("Inbox").Items
+    restricted = items.Restrict('@SQL="urn:schemas:httpmail:subject" LIKE \'%invoice%\' AND NOT "urn:schemas:httpmail:read" = 1')
+    assert [item._subject for item in restricted._list()] == ["Invoice 12"]
+
+
+def test_jet_filters_are_refused(simulated):
+    with pytest.raises(com_error):
+        simulated.folder("Inbox").Items.Restrict("[UnRead] = True")
@@ -0,0 +1,56 @@
+import pickle
+
+import pytest
+
+from OutlookPy.outlooksnapshot import OutlookItemSnapshot, SNAPSHOT_FIELDS
+
+
+def test_snapshots_read_each_field_once(outlook, simulated):
+    simulated.add_mail(subject="hello", sender="alice@example.com", categories=["Red"], unread=False)
+    item = outlook.inbox[0]
+    simulated.reset_calls()
+    snapshot = item.snapshot()
+    assert (snapshot.subject, snapshot.sender, snapshot.unread, snapshot.categories) == ("hello", "alice@example.com", False, ("Red",))
+    assert snapshot.store_id == simulated.store_id
+    # the store and every sender probe come from one property read
+    assert simulated.calls[("SimulatedPropertyAccessor", "GetProperties")] == 1
+    assert all(count == 1 for count in simulated.calls.values())
+
+
+def test_fields_limit_what_is_read(outlook, simulated):
+    simulated.add_mail(subject="hello")
+    item = outlook.inbox[0]
+    simulated.reset_calls()
+    snapshot = item.snapshot(fields=["subject"])
+    assert snapshot.subject == "hello"
+    assert snapshot.received is None and snapshot.sender is None
+    assert ("SimulatedMailItem", "ReceivedTime") not in simulated.calls
+    with pytest.raises(ValueError):
+        item.snapshot(fields=["body"])
+
+
+def test_pickle_and_rehydrate_round_trip(outlook, simulated):
+    simulated.add_mail(subject="hello", sender="alice@example.com")
+    snapshot = outlook.inbox[0].snapshot()
+    copy = pickle.loads(pickle.dumps(snapshot))
+    assert copy == snapshot and hash(copy) == hash(snapshot)
+    assert copy.as_dict() == snapshot.as_dict()
+    with pytest.raises(AttributeError):
+        copy.subject = "changed"
+    simulated.reset_calls()
+    item = copy.rehydrate(outlook)
+    assert simulated.calls[("SimulatedNamespace", "GetItemFromID")] == 1
+    assert item.entry_id == snapshot.entry_id and item.subject == "hello"
+    # a MAPI namespace works as well as an OutlookPy
+    assert copy.rehydrate(outlook._mapi_namespace).subject == "hello"
+
+
+def test_replace_keeps_the_original(outlook, simulated):
+    simulated.add_mail(subject="hello")
+    snapshot = outlook.inbox[0].snapshot()
+    changed = snapshot.replace(subject="bye")
+    assert (snapshot.subject, changed.subject) == ("hello", "bye")
+    assert changed != snapshot and changed.entry_id == snapshot.entry_id
+    with pytest.raises(TypeError):
+        snapshot.replace(body="text")
+    assert isinstance(changed, OutlookItemSnapshot) and len(changed.as_dict()) == len(SNAPSHOT_FIELDS)
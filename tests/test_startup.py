@@ -0,0 +1,27 @@
+from OutlookPy import OutlookPy
+
+
+def test_attaching_only_gets_the_namespace(outlook, simulated):
+    simulated.reset_calls()
+    OutlookPy()
+    assert dict(simulated.calls) == {("SimulatedApplication", "GetNamespace"): 1}
+
+
+def test_root_and_identity_are_looked_up_once_on_first_use(outlook, simulated):
+    assert sorted(outlook.startup_timings) == ["attach", "namespace", "total"]
+    simulated.reset_calls()
+    outlook.inbox
+    assert simulated.calls[("SimulatedStore", "GetRootFolder")] == 1
+    assert outlook.smtp_address == "me@example.com"
+    assert sorted(outlook.startup_timings) == ["attach", "identity", "namespace", "root", "total"]
+    simulated.reset_calls()
+    outlook.inbox
+    outlook.smtp_address
+    assert simulated.total_calls == 0
+
+
+def test_startup_timings_are_a_copy(outlook):
+    timings = outlook.startup_timings
+    assert all(seconds >= 0 for seconds in timings.values())
+    timings.clear()
+    assert outlook.startup_timings
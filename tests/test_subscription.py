@@ -0,0 +1,31 @@
+def test_events_nobody_handles_are_not_wrapped(outlook, simulated):
+    subscription = outlook.subscribe(outlook.inbox, recursive=False)
+    added = []
+    subscription.on("add")(lambda folder, item: added.append(item.subject) or True)
+    mail = simulated.add_mail(subject="hello", fire=False)
+    simulated.reset_calls()
+    simulated.change(mail, subject="changed")
+    simulated._pump()
+    assert ("SimulatedMailItem", "Class") not in simulated.calls
+    simulated.add_mail(subject="new")
+    simulated._pump()
+    assert added == ["new"]
+    subscription.unsubscribe()
+
+
+def test_removed_folders_and_unsubscribing_close_the_sinks(outlook, simulated):
+    projects = simulated.add_folder("Inbox/Projects")
+    subscription = outlook.subscribe(outlook.inbox)
+    simulated._pump()
+    assert len(subscription) == 2
+    # held on to here, so only closing them stops their events
+    sinks = {folder.name: list(subscription._sinks[folder.entry_id]) for folder in subscription.folders}
+    assert projects._sinks["items"]
+    simulated.folder("Inbox")._remove_folder(projects, fire=True)
+    simulated._pump()
+    assert len(subscription) == 1
+    assert not projects._sinks["items"] and not projects._sinks["folders"]
+    inbox = simulated.folder("Inbox")
+    assert inbox._sinks["items"] and inbox._sinks["folders"]
+    subscription.unsubscribe()
+    assert not inbox._sinks["items"] and not inbox._sinks["folders"]
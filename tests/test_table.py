@@ -0,0 +1,25 @@
+from datetime import datetime
+
+
+def test_rows_come_back_in_chunks(outlook, simulated):
+    mails = simulated.populate(50, start=datetime(2026, 1, 1))
+    table = outlook.inbox.table(["subject", "received"], chunk_size=20)
+    simulated.reset_calls()
+    rows = list(table)
+    assert [row.entry_id for row in rows] == [mail._entry_id for mail in mails]
+    assert rows[0].subject == mails[0]._subject and rows[0]["received"] == mails[0]._received
+    # one call per chunk and per column, nothing per row
+    assert simulated.calls[("SimulatedTable", "GetArray")] == 3
+    assert simulated.calls[("SimulatedTable", "Columns")] == 1
+    assert simulated.calls[("SimulatedColumns", "Add")] == 3
+    assert simulated.total_calls < 15
+
+
+def test_columnar_and_restricted_tables(outlook, simulated):
+    simulated.add_mail(subject="read", unread=False)
+    unread = simulated.add_mail(subject="unread")
+    inbox = outlook.inbox
+    columns = inbox.table(["subject"], where=inbox.where(unread=True)).columnar()
+    assert columns == {"subject": ["unread"], "entry_id": [unread._entry_id]}
+    row = next(iter(inbox.table(["subject"], where=inbox.where(unread=True))))
+    assert row.item.subject == "unread" and row.as_dict()["subject"] == "unread"